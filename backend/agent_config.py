@@ -3,9 +3,24 @@ AI Market Intelligence Agent — Configuration Module
 
 Stores user-defined agent rules and sector-to-scrip mappings.
 All values are READ-ONLY during scans.  The engine never mutates config.
+
+The config is published as immutable ConfigSnapshots.  get_config()
+returns the current snapshot by reference (no copy); update_config(),
+set_capital() and the profile functions build a new snapshot with the
+next version number and swap it in atomically, so a reader holding a
+snapshot never sees a half-applied change, and caches can key on
+snapshot.version.  Use snapshot.thaw() for a mutable copy.
+
+Besides the main ("default") config, named agent profiles can run side
+by side: each profile is a set of overrides (sectors, risk, targets,
+modes) on top of the default config, and the scheduler evaluates them
+all against one shared market-data pass per cycle.
 """
 
-import copy
+import re
+import threading
+
+import metrics
 
 # ──────────────────────────────────────────────
 # SECTOR → REPRESENTATIVE NSE SCRIPS
@@ -60,25 +75,115 @@ _DEFAULT_CONFIG = {
     "capital_available": 0,           # fetched from Dhan at scan time (READ ONLY)
 }
 
-# Runtime config — mutated only through update_config()
-_config = copy.deepcopy(_DEFAULT_CONFIG)
+
+# ──────────────────────────────────────────────
+# IMMUTABLE SNAPSHOTS
+# ──────────────────────────────────────────────
+
+class _Frozen(dict):
+    """A dict that refuses mutation (nested parts of a ConfigSnapshot)."""
+
+    __slots__ = ()
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError("config snapshots are read-only; use update_config(), or thaw() for a mutable copy")
+
+    __setitem__ = __delitem__ = __ior__ = _read_only
+    clear = pop = popitem = setdefault = update = _read_only
+
+    def __copy__(self):
+        return _thaw(self)
+
+    def __deepcopy__(self, memo):
+        return _thaw(self)
+
+    def __reduce__(self):
+        return _freeze, (_thaw(self),)
+
+
+def _freeze(value):
+    if isinstance(value, dict):
+        return _Frozen({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def _thaw(value):
+    if isinstance(value, dict):
+        return {k: _thaw(v) for k, v in value.items()}
+    if isinstance(value, tuple):
+        return [_thaw(v) for v in value]
+    return value
+
+
+class ConfigSnapshot(_Frozen):
+    """
+    One immutable version of an agent config.  Reads like the config dict
+    (lists become tuples); `version` increases with every published change.
+    """
+
+    __slots__ = ("version",)
+
+    def __init__(self, values: dict, version: int):
+        dict.__init__(self, {k: _freeze(v) for k, v in values.items()})
+        self.version = version
+
+    def thaw(self) -> dict:
+        """A plain, mutable deep copy."""
+        return _thaw(self)
+
+    def __reduce__(self):
+        return ConfigSnapshot, (_thaw(self), self.version)
+
+    def __repr__(self) -> str:
+        return f"ConfigSnapshot(v{self.version}, {dict.__repr__(self)})"
+
+
+# Named agent profiles: name → validated overrides of the default config
+DEFAULT_PROFILE = "default"
+MAX_PROFILES = 10
+_PROFILE_NAME = re.compile(r"^[A-Za-z0-9_-]{1,32}$")
+
+# Published state: (current ConfigSnapshot, profile overrides).  Replaced
+# as a whole under _write_lock, never mutated, so readers take no lock.
+_write_lock = threading.Lock()
+_state = (ConfigSnapshot(_DEFAULT_CONFIG, 1), _Frozen())
+_profile_cache = (0, {})   # (version, name → ConfigSnapshot) built by get_profiles
 
 # Agent active flag (kill-switch sets this to False)
 _agent_active = True
 
+metrics.gauge("agent_config_version", "Version of the published agent config", fn=lambda: _state[0].version)
+
 
-def get_config() -> dict:
-    """Return a *copy* of the current agent configuration."""
-    return copy.deepcopy(_config)
+def _publish(values: dict | None = None, profiles: dict | None = None) -> ConfigSnapshot:
+    """Swap in the next config version (caller holds _write_lock)."""
+    global _state
+    config, current_profiles = _state
+    _state = (
+        ConfigSnapshot(config if values is None else values, config.version + 1),
+        current_profiles if profiles is None else _freeze(profiles),
+    )
+    return _state[0]
 
 
-def update_config(data: dict) -> dict:
+def get_config() -> ConfigSnapshot:
+    """Return the current agent configuration snapshot (read-only, shared)."""
+    return _state[0]
+
+
+def version() -> int:
+    """Version of the current config; changes whenever the config or a profile does."""
+    return _state[0].version
+
+
+def _validate(data: dict) -> dict:
     """
-    Merge user-supplied values into the config.
-    Returns the updated config copy.
+    The recognised, validated settings in user-supplied data.
     Raises ValueError on invalid input.
     """
-    global _config
+    values = {}
 
     VALID_SECTORS = set(SECTOR_SCRIPS.keys())
     VALID_TRADING_MODES = {"PAPER", "LIVE"}
@@ -91,50 +196,122 @@ def update_config(data: dict) -> dict:
         invalid = [s for s in sectors if s not in VALID_SECTORS]
         if invalid:
             raise ValueError(f"Invalid sectors: {invalid}. Valid: {sorted(VALID_SECTORS)}")
-        _config["allowed_sectors"] = sectors
+        values["allowed_sectors"] = sectors
 
     for key in ("max_capital_per_trade", "risk_per_trade"):
         if key in data:
             val = data[key]
             if not isinstance(val, (int, float)) or val <= 0 or val > 100:
                 raise ValueError(f"{key} must be a number between 0 and 100")
-            _config[key] = val
+            values[key] = val
 
     if "max_trades_per_day" in data:
         val = data["max_trades_per_day"]
         if not isinstance(val, int) or val <= 0 or val > 50:
             raise ValueError("max_trades_per_day must be an integer between 1 and 50")
-        _config["max_trades_per_day"] = val
+        values["max_trades_per_day"] = val
 
     if "profit_booking_rule" in data:
         rule = data["profit_booking_rule"]
         if not isinstance(rule, dict) or "type" not in rule or "value" not in rule:
             raise ValueError("profit_booking_rule must have 'type' and 'value'")
-        _config["profit_booking_rule"] = rule
+        values["profit_booking_rule"] = rule
 
     if "stop_loss_rule" in data:
         rule = data["stop_loss_rule"]
         if not isinstance(rule, dict) or "type" not in rule or "value" not in rule:
             raise ValueError("stop_loss_rule must have 'type' and 'value'")
-        _config["stop_loss_rule"] = rule
+        values["stop_loss_rule"] = rule
 
     if "trading_mode" in data:
         if data["trading_mode"] not in VALID_TRADING_MODES:
             raise ValueError(f"trading_mode must be one of {VALID_TRADING_MODES}")
-        _config["trading_mode"] = data["trading_mode"]
+        values["trading_mode"] = data["trading_mode"]
 
     if "execution_mode" in data:
         if data["execution_mode"] not in VALID_EXECUTION_MODES:
             raise ValueError(f"execution_mode must be one of {VALID_EXECUTION_MODES}")
-        _config["execution_mode"] = data["execution_mode"]
+        values["execution_mode"] = data["execution_mode"]
 
     # capital_available is read-only — silently ignore
-    return get_config()
+    return values
+
+
+def update_config(data: dict) -> ConfigSnapshot:
+    """
+    Merge user-supplied values into the config.
+    Publishes and returns the new config snapshot.
+    Raises ValueError on invalid input.
+    """
+    values = _validate(data)
+    with _write_lock:
+        return _publish({**_state[0], **values})
+
+
+def with_overrides(data: dict, base: dict | None = None) -> dict:
+    """
+    The config (or `base`) with user-supplied values applied, without
+    publishing it (backtests).  Raises ValueError on invalid input.
+    """
+    return {**(get_config() if base is None else base), **_validate(data)}
 
 
-def set_capital(amount: float):
+# ──────────────────────────────────────────────
+# AGENT PROFILES
+# ──────────────────────────────────────────────
+
+def get_profiles() -> dict:
+    """
+    Every profile's config snapshot, the default config first.  Profiles
+    see later changes to the default config in keys they do not
+    override.  Snapshots are built once per config version.
+    """
+    global _profile_cache
+    config, profiles = _state
+    cached_version, cached = _profile_cache
+    if cached_version != config.version:
+        cached = {DEFAULT_PROFILE: config}
+        for name, overrides in profiles.items():
+            cached[name] = ConfigSnapshot({**config, **overrides}, config.version)
+        _profile_cache = (config.version, cached)
+    return dict(cached)
+
+
+def set_profile(name: str, data: dict) -> ConfigSnapshot:
+    """
+    Create a named profile, or merge data into an existing one.
+    Returns the profile's config.  Raises ValueError on invalid input.
+    """
+    if name == DEFAULT_PROFILE:
+        raise ValueError(f"'{DEFAULT_PROFILE}' is the main config, not a profile name")
+    if not _PROFILE_NAME.match(name or ""):
+        raise ValueError("Profile names are 1-32 letters, digits, '-' or '_'")
+    values = _validate(data)
+    with _write_lock:
+        profiles = _state[1]
+        if name not in profiles and len(profiles) >= MAX_PROFILES:
+            raise ValueError(f"At most {MAX_PROFILES} profiles")
+        _publish(profiles={**profiles, name: {**profiles.get(name, {}), **values}})
+    return get_profiles()[name]
+
+
+def delete_profile(name: str) -> bool:
+    """Remove a named profile; False if there is none."""
+    with _write_lock:
+        profiles = _state[1]
+        if name not in profiles:
+            return False
+        _publish(profiles={k: v for k, v in profiles.items() if k != name})
+    return True
+
+
+def set_capital(amount: float) -> ConfigSnapshot:
     """Set capital_available (called internally before scan, never by user)."""
-    _config["capital_available"] = amount
+    with _write_lock:
+        config = _state[0]
+        if config["capital_available"] == amount:
+            return config   # unchanged: keep the version, so caches stay valid
+        return _publish({**config, "capital_available": amount})
 
 
 def is_agent_active() -> bool:
@@ -153,7 +330,8 @@ def deactivate_agent():
 
 
 def reset_config():
-    """Reset config to defaults."""
-    global _config, _agent_active
-    _config = copy.deepcopy(_DEFAULT_CONFIG)
+    """Reset config to defaults (and drop all profiles); the version keeps increasing."""
+    global _agent_active
+    with _write_lock:
+        _publish(_DEFAULT_CONFIG, {})
     _agent_active = True
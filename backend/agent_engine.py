@@ -4,62 +4,148 @@ AI Market Intelligence Agent — Scanning Engine
 Scans allowed sectors, computes technical indicators, and generates
 rule-validated trade SIGNALS (never decisions or advice).
 
-This module is stateless — it receives config and returns signal dicts.
+This module is stateless — it receives config and returns SignalRecords
+(signal_record.py), which read like the signal dicts of the JSON schema.
 """
 
 # import yfinance as yf  <-- Moved to scan_markets
-import pandas as pd
+import numpy as np
 from datetime import datetime
 
+import metrics
 from agent_config import SECTOR_SCRIPS
+from bar_store import Bars, BarStore
+from trading_calendar import IST
+from signal_record import RULE_CHECKS, TREND_FLAGS, SignalRecord, pack_flags
 
+# Optional override for OHLCV history: fn(symbol) -> DataFrame or Bars.
+# None means fetch from yfinance (see set_history_source).
+_history_source = None
 
-def _compute_indicators(hist: pd.DataFrame) -> dict | None:
+# Latest bars of every scanned symbol, in one fixed block of arrays
+_bars = BarStore()
+
+# Symbol → IST date its full history was last downloaded.  Later fetches
+# that day download only the last RECENT_PERIOD and append to the store.
+_full_fetch_day = {}
+RECENT_PERIOD = "5d"
+
+# Rule constants (backtest_engine and optimizer evaluate alternatives)
+RSI_RANGE = (40, 70)          # RSI band of a bullish setup
+ATR_STOP_MULTIPLE = 1.5       # ATR stop-loss distance
+MIN_RISK_REWARD = 1.5         # target is at least this multiple of the risk, and R:R must reach it
+
+BAR_CACHE = metrics.counter("agent_bar_cache_total",
+                            "History fetches served incrementally from the bar store (hit) or in full (miss)",
+                            ("result",))
+
+
+def set_history_source(fn):
+    """Route history fetches through fn(symbol) instead of yfinance (None restores it)."""
+    global _history_source
+    _history_source = fn
+
+
+def _download(symbol: str, period: str):
+    provider = "yfinance" if _history_source is None else "history_source"
+    with metrics.upstream(provider, "history") as call:
+        if _history_source is not None:
+            hist = _history_source(symbol)
+        else:
+            import yfinance as yf
+            hist = yf.Ticker(symbol).history(period=period, interval="1d")
+        if hist is None or not len(hist):
+            call.fail()     # yfinance reports errors as an empty frame
+        return hist
+
+
+def _fetch_history(symbol: str, full: bool = False) -> Bars | None:
+    """
+    Daily bars for a symbol, kept in the bar store.  The first fetch of a
+    day (or full=True) downloads one month; later ones only the newest
+    bars, merged into the stored month.
+    """
+    today = datetime.now(IST).date()
+    cached = None if full or _full_fetch_day.get(symbol) != today else _bars.get(symbol)
+    BAR_CACHE.inc(result="miss" if cached is None else "hit")
+    hist = _download(symbol, "1mo" if cached is None else RECENT_PERIOD)
+    if hist is None:
+        return None
+    if not isinstance(hist, Bars):
+        hist = Bars.from_frame(hist)
+    if cached is None:
+        _full_fetch_day[symbol] = today
+    else:
+        hist = cached.append(hist)
+    return _bars.put(symbol, hist)
+
+
+def warm(symbol: str) -> bool:
     """
-    Compute EMA-9, EMA-21, RSI-14, ATR-14, VWAP from OHLCV data.
+    Pre-open warm-up for one symbol: download its full history into the
+    bar store and compute its indicators once.  True if the symbol has
+    enough bars to be scanned.
+    """
+    return _compute_indicators(_fetch_history(symbol, full=True)) is not None
+
+
+def _ema(values: np.ndarray, span: int) -> float:
+    """Last value of an exponential moving average (pandas ewm(span, adjust=False))."""
+    alpha = 2 / (span + 1)
+    ema = float(values[0])
+    for value in values[1:].tolist():
+        ema += alpha * (value - ema)
+    return ema
+
+
+def _compute_indicators(bars: Bars) -> dict | None:
+    """
+    Compute EMA-9, EMA-21, RSI-14, ATR-14, VWAP from OHLCV bars.
     Returns dict of indicator values at the latest bar, or None on failure.
     """
-    if hist is None or len(hist) < 26:
+    if bars is None or len(bars) < 26:
         return None
 
-    close = hist["Close"]
-    high = hist["High"]
-    low = hist["Low"]
-    volume = hist["Volume"]
+    # Accumulate in float64 whatever the storage dtype
+    close = bars.close.astype(np.float64)
+    high = bars.high.astype(np.float64)
+    low = bars.low.astype(np.float64)
+    volume = bars.volume.astype(np.float64)
+    last_close = close[-1]
 
     # EMA
-    ema9 = close.ewm(span=9, adjust=False).mean()
-    ema21 = close.ewm(span=21, adjust=False).mean()
-
-    # RSI-14
-    delta = close.diff()
-    gain = delta.where(delta > 0, 0).rolling(14).mean()
-    loss = (-delta.where(delta < 0, 0)).rolling(14).mean()
-    rs = gain / loss.replace(0, float("nan"))
-    rsi = (100 - (100 / (1 + rs))).fillna(50)
-
-    # ATR-14
-    tr = pd.concat([
-        high - low,
-        (high - close.shift()).abs(),
-        (low - close.shift()).abs(),
-    ], axis=1).max(axis=1)
-    atr = tr.rolling(14).mean()
+    ema9 = _ema(close, 9)
+    ema21 = _ema(close, 21)
+
+    # RSI-14 over the last 14 price changes
+    delta = np.diff(close[-15:])
+    gain = delta.clip(min=0).mean()
+    loss = (-delta).clip(min=0).mean()
+    rsi = 100 - 100 / (1 + gain / loss) if loss > 0 else 50.0
+
+    # ATR-14 over the last 14 true ranges
+    prev_close = close[-15:-1]
+    tr = np.maximum.reduce([
+        high[-14:] - low[-14:],
+        np.abs(high[-14:] - prev_close),
+        np.abs(low[-14:] - prev_close),
+    ])
+    atr = tr.mean()
 
     # VWAP
     typical = (high + low + close) / 3
-    vwap_cum = (typical * volume).cumsum() / volume.cumsum().replace(0, float("nan"))
+    total_volume = volume.sum()
+    vwap = (typical * volume).sum() / total_volume if total_volume > 0 else last_close
 
-    last = len(hist) - 1
     return {
-        "close": float(close.iloc[last]),
-        "ema9": float(ema9.iloc[last]),
-        "ema21": float(ema21.iloc[last]),
-        "rsi": float(rsi.iloc[last]),
-        "atr": float(atr.iloc[last]) if pd.notna(atr.iloc[last]) else float(close.iloc[last] * 0.015),
-        "vwap": float(vwap_cum.iloc[last]) if pd.notna(vwap_cum.iloc[last]) else float(close.iloc[last]),
-        "volume": float(volume.iloc[last]),
-        "avg_volume": float(volume.rolling(14).mean().iloc[last]) if pd.notna(volume.rolling(14).mean().iloc[last]) else float(volume.iloc[last]),
+        "close": float(last_close),
+        "ema9": ema9,
+        "ema21": ema21,
+        "rsi": float(rsi),
+        "atr": float(atr) if np.isfinite(atr) else float(last_close * 0.015),
+        "vwap": float(vwap) if np.isfinite(vwap) else float(last_close),
+        "volume": float(volume[-1]),
+        "avg_volume": float(volume[-14:].mean()),
     }
 
 
@@ -69,7 +155,7 @@ def _detect_trend(ind: dict) -> dict:
     Returns a dict with trend info.
     """
     bullish_ema = ind["ema9"] > ind["ema21"]
-    rsi_ok = 40 <= ind["rsi"] <= 70
+    rsi_ok = RSI_RANGE[0] <= ind["rsi"] <= RSI_RANGE[1]
     above_vwap = ind["close"] > ind["vwap"]
     good_volume = ind["volume"] >= ind["avg_volume"] * 0.8
 
@@ -92,14 +178,14 @@ def _calculate_levels(close: float, atr: float, config: dict) -> dict:
     sl_pct = config["stop_loss_rule"]["value"] / 100
     target_pct = config["profit_booking_rule"]["value"] / 100
 
-    # Use ATR-based stop-loss (1.5× ATR) or percentage, whichever is tighter
-    atr_sl = close - (1.5 * atr)
+    # Use ATR-based stop-loss (ATR_STOP_MULTIPLE × ATR) or percentage, whichever is tighter
+    atr_sl = close - (ATR_STOP_MULTIPLE * atr)
     pct_sl = close * (1 - sl_pct)
     stop_loss = max(atr_sl, pct_sl)  # tighter = higher SL for long
 
     risk = close - stop_loss
-    # Target: at least 1.5× risk, or percentage target, whichever is higher
-    rr_target = close + (risk * 1.5)
+    # Target: at least MIN_RISK_REWARD × risk, or percentage target, whichever is higher
+    rr_target = close + (risk * MIN_RISK_REWARD)
     pct_target = close * (1 + target_pct)
     target = max(rr_target, pct_target)
 
@@ -137,7 +223,7 @@ def _run_rule_checks(symbol: str, sector: str, levels: dict, config: dict,
     trade_count_ok = trade_count < config["max_trades_per_day"]
 
     # R:R check
-    rr_ok = levels["risk_reward_ratio"] >= 1.5
+    rr_ok = levels["risk_reward_ratio"] >= MIN_RISK_REWARD
 
     all_pass = all([sector_allowed, risk_within_limit, capital_within_limit, trade_count_ok, rr_ok])
 
@@ -157,13 +243,13 @@ def _build_rationale(trend: dict, levels: dict, rule_result: dict) -> str:
     parts = []
 
     if trend["is_bullish"]:
-        parts.append(f"Bullish EMA crossover detected (EMA9 > EMA21). RSI at {trend.get('rsi', 'N/A'):.1f}, within 40-70 range." if 'rsi' in trend else "Bullish EMA crossover detected (EMA9 > EMA21).")
+        parts.append(f"Bullish EMA crossover detected (EMA9 > EMA21). RSI at {trend.get('rsi', 'N/A'):.1f}, within {RSI_RANGE[0]}-{RSI_RANGE[1]} range." if 'rsi' in trend else "Bullish EMA crossover detected (EMA9 > EMA21).")
     else:
         reasons = []
         if not trend["bullish_ema_crossover"]:
             reasons.append("EMA9 below EMA21")
         if not trend["rsi_in_range"]:
-            reasons.append("RSI outside 40-70 range")
+            reasons.append(f"RSI outside {RSI_RANGE[0]}-{RSI_RANGE[1]} range")
         if not trend["above_vwap"]:
             reasons.append("price below VWAP")
         parts.append(f"Trend not confirmed: {', '.join(reasons)}.")
@@ -177,102 +263,172 @@ def _build_rationale(trend: dict, levels: dict, rule_result: dict) -> str:
     return " ".join(parts)
 
 
-def scan_markets(config: dict) -> list:
+def universe(config: dict) -> list:
+    """(sector, symbol) pairs to scan, in scan order, each symbol once."""
+    pairs, seen_symbols = [], set()
+    for sector in config["allowed_sectors"]:
+        for symbol in SECTOR_SCRIPS.get(sector, []):
+            if symbol not in seen_symbols:
+                seen_symbols.add(symbol)
+                pairs.append((sector, symbol))
+    return pairs
+
+
+def shared_universe(configs) -> list:
+    """Symbols in the universe of any of the configs, in scan order, each once."""
+    symbols = {}
+    for config in configs:
+        for _, symbol in universe(config):
+            symbols.setdefault(symbol, None)
+    return list(symbols)
+
+
+def analyze(hist: Bars | None) -> dict | None:
     """
-    Scan stocks across allowed sectors, compute indicators, detect trends,
-    and generate rule-validated signals.
+    Config-independent part of a signal: indicators and trend of one
+    symbol's bars, or None when there is no bullish setup.
+    """
+    if hist is None or len(hist) < 20:
+        return None
+
+    indicators = _compute_indicators(hist)
+    if indicators is None:
+        return None
+
+    trend = _detect_trend(indicators)
+    trend["rsi"] = indicators["rsi"]
+
+    # Only generate signals for bullish setups
+    if not trend["is_bullish"]:
+        return None
+    return {"indicators": indicators, "trend": trend}
+
 
-    Returns a list of signal dicts matching the mandatory JSON schema.
+def signal_for(sector: str, symbol: str, analysis: dict | None, config: dict,
+               trade_count: int) -> SignalRecord | None:
     """
-    signals = []
-    trade_count = 0
-    seen_symbols = set()
+    Config-dependent part of a signal: levels and rule checks for an
+    analyze() result under one config.  trade_count is the number of
+    signals already QUALIFIED in this scan.
+    """
+    if analysis is None:
+        return None
+    indicators, trend = analysis["indicators"], analysis["trend"]
+
+    levels = _calculate_levels(indicators["close"], indicators["atr"], config)
+    rule_result = _run_rule_checks(symbol, sector, levels, config, trade_count)
+
+    execution_instruction = "NONE"
+    if rule_result["all_pass"]:
+        signal_status = "QUALIFIED"
+        if config["execution_mode"] == "MANUAL_CONFIRM":
+            execution_instruction = "WAIT_FOR_USER_CONFIRMATION"
+        else:
+            execution_instruction = "FORWARD_TO_EXECUTION_ENGINE"
+    else:
+        signal_status = "REJECTED"
+
+    rationale = _build_rationale(trend, levels, rule_result)
+
+    return SignalRecord(
+        signal_status, symbol, sector,
+        levels["entry_price"], levels["stop_loss"],
+        levels["target_price"], levels["risk_reward_ratio"],
+        checks=pack_flags(rule_result["checks"], RULE_CHECKS),
+        execution_instruction=execution_instruction,
+        rationale=rationale,
+        ema9=round(indicators["ema9"], 2),
+        ema21=round(indicators["ema21"], 2),
+        rsi=round(indicators["rsi"], 2),
+        atr=round(indicators["atr"], 2),
+        vwap=round(indicators["vwap"], 2),
+        volume=int(indicators["volume"]),
+        trend_score=trend["trend_score"],
+        trend_flags=pack_flags({
+            "bullish_ema": trend["bullish_ema_crossover"],
+            "rsi_ok": trend["rsi_in_range"],
+            "above_vwap": trend["above_vwap"],
+            "volume_ok": trend["volume_adequate"],
+        }, TREND_FLAGS),
+    )
+
+
+def evaluate(sector: str, symbol: str, hist: Bars | None, config: dict,
+             trade_count: int) -> SignalRecord | None:
+    """
+    Signal for one symbol's bars, or None when there is no bullish setup.
+    trade_count is the number of signals already QUALIFIED in this scan.
+    """
+    return signal_for(sector, symbol, analyze(hist), config, trade_count)
 
-    for sector in config["allowed_sectors"]:
-        scrips = SECTOR_SCRIPS.get(sector, [])
-        for symbol in scrips:
-            if symbol in seen_symbols:
-                continue
-            seen_symbols.add(symbol)
 
-            try:
-                import yfinance as yf
-                ticker = yf.Ticker(symbol)
-                hist = ticker.history(period="1mo", interval="1d")
-
-                if hist is None or hist.empty or len(hist) < 20:
-                    continue
-
-                indicators = _compute_indicators(hist)
-                if indicators is None:
-                    continue
-
-                trend = _detect_trend(indicators)
-                trend["rsi"] = indicators["rsi"]
-
-                # Only generate signals for bullish setups
-                if not trend["is_bullish"]:
-                    continue
-
-                levels = _calculate_levels(indicators["close"], indicators["atr"], config)
-                rule_result = _run_rule_checks(symbol, sector, levels, config, trade_count)
-
-                execution_instruction = "NONE"
-                if rule_result["all_pass"]:
-                    signal_status = "QUALIFIED"
-                    trade_count += 1
-                    if config["execution_mode"] == "MANUAL_CONFIRM":
-                        execution_instruction = "WAIT_FOR_USER_CONFIRMATION"
-                    else:
-                        execution_instruction = "FORWARD_TO_EXECUTION_ENGINE"
-                else:
-                    signal_status = "REJECTED"
-
-                rationale = _build_rationale(trend, levels, rule_result)
-
-                signal = {
-                    "signal_status": signal_status,
-                    "symbol": symbol.replace(".NS", ""),
-                    "ticker": symbol,
-                    "sector": sector,
-                    "entry_price": levels["entry_price"],
-                    "stop_loss": levels["stop_loss"],
-                    "target_price": levels["target_price"],
-                    "risk_reward_ratio": levels["risk_reward_ratio"],
-                    "rule_checks": rule_result["checks"],
-                    "execution_instruction": execution_instruction,
-                    "rationale": rationale,
-                    "indicators": {
-                        "ema9": round(indicators["ema9"], 2),
-                        "ema21": round(indicators["ema21"], 2),
-                        "rsi": round(indicators["rsi"], 2),
-                        "atr": round(indicators["atr"], 2),
-                        "vwap": round(indicators["vwap"], 2),
-                        "volume": int(indicators["volume"]),
-                    },
-                    "trend": {
-                        "score": trend["trend_score"],
-                        "bullish_ema": trend["bullish_ema_crossover"],
-                        "rsi_ok": trend["rsi_in_range"],
-                        "above_vwap": trend["above_vwap"],
-                        "volume_ok": trend["volume_adequate"],
-                    },
-                }
-
-                signals.append(signal)
-
-                # Stop if we have enough qualified signals
-                if trade_count >= config["max_trades_per_day"]:
-                    break
+class ProfileScan:
+    """
+    One config's pass over shared per-symbol analyses.  The symbols of
+    its universe are evaluated in its own scan order as their analyses
+    become available, so the result is the same as scanning alone.
+    """
 
+    def __init__(self, config: dict, name: str | None = None):
+        self.config = config
+        self.name = name
+        self.pairs = universe(config)
+        self.position = 0
+        self.trade_count = 0
+        self.signals = []
+
+    @property
+    def done(self) -> bool:
+        return (self.position >= len(self.pairs)
+                or self.trade_count >= self.config["max_trades_per_day"])
+
+    def advance(self, analyses: dict):
+        """Evaluate the next symbols in order while analyses[symbol] is available."""
+        while not self.done:
+            sector, symbol = self.pairs[self.position]
+            if symbol not in analyses:
+                return
+            self.position += 1
+            try:
+                signal = signal_for(sector, symbol, analyses[symbol], self.config, self.trade_count)
             except Exception as e:
                 print(f"[AgentEngine] Error scanning {symbol}: {e}")
                 continue
+            if signal is None:
+                continue
+            if self.name is not None:
+                signal["profile"] = self.name
+            self.signals.append(signal)
 
-        if trade_count >= config["max_trades_per_day"]:
-            break
+            # Stop once we have enough qualified signals
+            if signal.signal_status == "QUALIFIED":
+                self.trade_count += 1
+
+    def result(self) -> list:
+        return rank_signals(self.signals)
 
-    return rank_signals(signals)
+
+def scan_markets(config: dict) -> list:
+    """
+    Scan stocks across allowed sectors, compute indicators, detect trends,
+    and generate rule-validated signals.  (The scheduler runs the same
+    scan asynchronously for every agent profile, fetching ahead:
+    scan_pipeline.scan_profiles.)
+
+    Returns a list of SignalRecords; to_dict() gives the mandatory JSON schema.
+    """
+    scan = ProfileScan(config)
+    analyses = {}
+    for _, symbol in scan.pairs:
+        try:
+            analyses[symbol] = analyze(_fetch_history(symbol))
+        except Exception as e:
+            print(f"[AgentEngine] Error scanning {symbol}: {e}")
+            analyses[symbol] = None
+        scan.advance(analyses)
+        if scan.done:
+            break
+    return scan.result()
 
 
 def rank_signals(signals: list) -> list:
@@ -281,12 +437,12 @@ def rank_signals(signals: list) -> list:
     then by trend score (desc), then by volume (desc).
     """
     def sort_key(s):
-        status_rank = 0 if s["signal_status"] == "QUALIFIED" else 1
+        status_rank = 0 if s.signal_status == "QUALIFIED" else 1
         return (
             status_rank,
-            -s.get("risk_reward_ratio", 0),
-            -s.get("trend", {}).get("score", 0),
-            -s.get("indicators", {}).get("volume", 0),
+            -(s.risk_reward_ratio or 0),
+            -s.trend_score,
+            -s.volume,
         )
 
     return sorted(signals, key=sort_key)
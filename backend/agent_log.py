@@ -1,91 +1,366 @@
 """
 AI Market Intelligence Agent — Decision Log
 
-In-memory store for every signal generated + user decisions.
+Store for every signal generated + user decisions.
 Each entry has a unique ID, timestamp, and current status.
+
+The log is a ring buffer of the newest CAPACITY entries with a dict
+index from ID to entry, so lookups and approve/reject are O(1) and
+memory stays flat however long the process runs.  Status counters are
+maintained incrementally as entries are added, updated and evicted.
+Callbacks registered with on_evict() see each entry as it falls out of
+the buffer.
+
+Every signal, user action and scan result is also appended to the
+signal journal (signal_journal.py), so a restart keeps signals awaiting
+MANUAL_CONFIRM approval.  Startup reads only the newest segments needed
+to refill the buffer; get_log_page() reads older segments lazily when a
+client pages back past it.
+
+Entries are SignalRecords (signal_record.py); callers turn them into
+JSON with to_dict() at the API boundary.
 """
 
+import os
+import threading
 import uuid
+from collections import Counter, deque
 from datetime import datetime
 
-_log = []            # master list of all logged signals
+import columnar_store
+import signal_journal
+from signal_record import SignalRecord
+
+CAPACITY = int(os.getenv("AGENT_LOG_CAPACITY", "5000"))
+
+_lock = threading.Lock()
+_load_lock = threading.Lock()
+_loaded = False
+_log = deque()       # newest CAPACITY logged signals, oldest first
+_positions = deque() # journal (segment, line) of each entry in _log
+_by_id = {}          # id → entry (same records as in _log)
+_counts = Counter()  # signal_status / user_action → number of entries in _log
+_evicted = 0         # entries dropped from the buffer since the last clear
+_evict_hooks = []
+_late_actions = {}   # id → (journal segment, newest user_action) recorded after the entry's segment
+_segment = 0         # journal segment of the newest record written
+_indexed_from = None # lowest segment from which every newer segment's actions are in _late_actions
 _signals = []        # latest scan results (reset each scan)
+_scan_version = None # config version the latest scan ran with (None after a restart)
+
+
+def configure(data_dir: str):
+    """Point the log at another journal directory and reload from it (tests)."""
+    global _loaded
+    signal_journal.configure(data_dir)
+    with _load_lock:
+        _reset()
+        _loaded = False
+
+
+def on_evict(fn):
+    """Register fn(entry), called for every entry evicted from the buffer."""
+    _evict_hooks.append(fn)
+
+
+def _count(entry: SignalRecord, delta: int):
+    _counts[("status", entry.signal_status)] += delta
+    _counts[("action", entry.user_action)] += delta
+
+
+def _reset():
+    global _signals, _evicted, _scan_version, _segment, _indexed_from
+    with _lock:
+        _log.clear()
+        _positions.clear()
+        _by_id.clear()
+        _counts.clear()
+        _late_actions.clear()
+        _segment = 0
+        _indexed_from = None
+        _evicted = 0
+        _signals = []
+        _scan_version = None
+
+
+# ── Journal replay ────────────────────────────
+
+def _parse_segment(segment: int) -> tuple:
+    """(entries, actions, scan) of one journal segment; folds its late actions in."""
+    global _indexed_from
+    entries, actions, scan = [], {}, None
+    for line, record in enumerate(signal_journal.read(segment)):
+        op = record.get("op")
+        if op == "signal":
+            entries.append(((segment, line), record["entry"]))
+        elif op == "action":
+            actions[record["id"]] = record["action"]
+        elif op == "scan":
+            scan = record["ids"]
+
+    logged = {entry["id"] for _, entry in entries}
+    with _lock:
+        for signal_id, action in actions.items():
+            known = _late_actions.get(signal_id)
+            if signal_id not in logged and (known is None or known[0] < segment):
+                _late_actions[signal_id] = (segment, action)
+        if _indexed_from is None or segment == _indexed_from - 1:
+            _indexed_from = segment
+    return entries, actions, scan
+
+
+def _index_actions_above(segment: int):
+    """
+    Fold in the late actions of every segment newer than `segment`.  Each
+    segment is read for this at most once, so paging deep into the
+    journal costs O(1) segment reads per page, not O(history).
+    """
+    with _lock:
+        indexed_from = _indexed_from
+    for newer in reversed(signal_journal.segments()):
+        if indexed_from is not None and newer >= indexed_from:
+            continue
+        if newer <= segment:
+            break
+        _parse_segment(newer)
+
+
+def _segment_entries(segment: int) -> tuple:
+    """
+    Signals logged in one journal segment, oldest first, as (position,
+    entry) with the newest known user_action applied, plus the segment's
+    last scan result IDs (or None).  Actions for entries of older
+    segments are remembered in _late_actions until the journal deletes
+    the segment they were recorded in; the caller must already have
+    indexed the newer segments' actions (_index_actions_above).
+    """
+    entries, actions, scan = _parse_segment(segment)
+    result = []
+    with _lock:
+        for position, entry in entries:
+            record = SignalRecord.from_dict(entry)
+            late = _late_actions.get(record.id)
+            record.user_action = late[1] if late else actions.get(record.id, record.user_action)
+            result.append((position, record))
+    return result, scan
+
 
+def _load():
+    """Refill the buffer from the newest journal segments (first use only)."""
+    global _loaded, _signals
+    if _loaded:
+        return
+    with _load_lock:
+        if _loaded:
+            return
+        loaded, scan = [], None
+        for segment in reversed(signal_journal.segments()):
+            entries, segment_scan = _segment_entries(segment)
+            if scan is None:
+                scan = segment_scan
+            loaded[:0] = entries
+            if len(loaded) >= CAPACITY:
+                break
+        loaded = loaded[-CAPACITY:] if CAPACITY else []
 
-def log_signal(signal: dict) -> dict:
+        with _lock:
+            for position, entry in loaded:
+                _log.append(entry)
+                _positions.append(position)
+                _by_id[entry.id] = entry
+                _count(entry, 1)
+            _signals = [_by_id[i] for i in scan or () if i in _by_id]
+        if loaded:
+            print(f"[AgentLog] Restored {len(loaded)} signals from the journal")
+        _loaded = True
+
+
+def _journal(record: dict) -> tuple | None:
+    """
+    Append a record to the signal journal; its (segment, line) position,
+    or None if the write failed.  Caller holds _lock, so buffer order and
+    journal order always agree.
+    """
+    global _segment
+    try:
+        position = signal_journal.append(record)
+    except OSError as e:
+        print(f"[AgentLog] Journal write error: {e}")
+        return None
+    if position[0] != _segment:
+        _segment = position[0]
+        _forget_actions_before(_segment - signal_journal.RETAIN_SEGMENTS + 1)
+    return position
+
+
+def _forget_actions_before(segment: int):
+    """Drop late actions recorded in segments the journal has rotated away. Caller holds _lock."""
+    for signal_id in [i for i, (s, _) in _late_actions.items() if s < segment]:
+        del _late_actions[signal_id]
+
+
+def _unjournaled_position() -> tuple:
+    """
+    Cursor position for an entry the journal missed: just after the newest
+    entry and before the next journal line, so it stays unique and ordered.
+    Caller holds _lock.
+    """
+    last = _positions[-1] if _positions else (_segment, -1)
+    return (*last[:2], (last[2] if len(last) > 2 else 0) + 1)
+
+
+# ── Public API ────────────────────────────────
+
+def log_signal(signal: SignalRecord | dict) -> SignalRecord:
     """
-    Append a signal dict to the log with a unique ID and timestamp.
-    Returns the enriched signal dict.
+    Append a signal to the log with a unique ID and timestamp.
+    A SignalRecord is logged as is (not copied); a dict is converted.
+    Returns the logged record.
     """
-    entry = {
-        "id": str(uuid.uuid4())[:8],
-        "timestamp": datetime.now().isoformat(),
-        "user_action": None,       # None | APPROVED | REJECTED_BY_USER
-        **signal,
-    }
-    _log.append(entry)
+    global _evicted
+    _load()
+    entry = signal if isinstance(signal, SignalRecord) else SignalRecord.from_dict(signal)
+    entry.id = entry.id or str(uuid.uuid4())[:8]
+    entry.timestamp = entry.timestamp or datetime.now().isoformat()
+    record = {"op": "signal", "entry": entry.to_dict()}
+    evicted = []
+    with _lock:
+        position = _journal(record)
+        _log.append(entry)
+        _positions.append(position or _unjournaled_position())
+        _by_id[entry.id] = entry
+        _count(entry, 1)
+        while len(_log) > CAPACITY:
+            old = _log.popleft()
+            _positions.popleft()
+            if _by_id.get(old.id) is old:
+                del _by_id[old.id]
+            _count(old, -1)
+            _evicted += 1
+            evicted.append(old)
+    for old in evicted:
+        for fn in _evict_hooks:
+            fn(old)
     return entry
 
 
-def store_scan_results(signals: list):
-    """Replace cached scan results with the latest batch."""
-    global _signals
+def store_scan_results(signals: list, config_version: int | None = None):
+    """
+    Replace cached scan results with the latest batch, produced under
+    agent config version `config_version` (see scan_config_version()).
+    """
+    global _signals, _scan_version
+    _load()
     _signals = list(signals)
+    _scan_version = config_version
+    with _lock:
+        _journal({"op": "scan", "ids": [s["id"] for s in _signals]})
+    columnar_store.append("signals", _signals)
+    columnar_store.flush_if_due()
 
 
 def get_signals() -> list:
     """Return cached signals from the last scan."""
+    _load()
     return list(_signals)
 
 
+def scan_config_version() -> int | None:
+    """
+    Config version of the cached scan results; when it differs from
+    agent_config.version() the results predate a config change.  None
+    for results restored from the journal (versions restart with the
+    process).
+    """
+    return _scan_version
+
+
 def get_log(limit: int = 50) -> list:
     """Return the last N log entries (newest first)."""
-    return list(reversed(_log[-limit:]))
+    return get_log_page(limit)[0]
 
 
-def update_signal_status(signal_id: str, action: str) -> dict | None:
+def get_log_page(limit: int = 50, before: tuple | None = None) -> tuple:
+    """
+    Log entries newest first, strictly older than the `before` cursor (a
+    (segment, line) journal position; None: the newest).  Served from the
+    buffer, then from older journal segments read on demand.
+    Returns (entries, next_cursor); next_cursor is None on the last page.
+    """
+    _load()
+    limit = max(limit, 0)
+    page = []
+    with _lock:
+        for position, entry in zip(reversed(_positions), reversed(_log)):
+            if len(page) > limit:
+                break
+            if before is None or position < tuple(before):
+                page.append((position, entry))
+        oldest = _positions[0] if _positions else None
+
+    if len(page) <= limit and oldest is not None:
+        cursor = min(tuple(before), oldest) if before is not None else oldest
+        # Later actions for older entries must be known before they are read
+        _index_actions_above(cursor[0])
+        for segment in reversed([s for s in signal_journal.segments() if s <= cursor[0]]):
+            entries, _ = _segment_entries(segment)
+            for position, entry in reversed(entries):
+                if position < cursor:
+                    page.append((position, entry))
+                    if len(page) > limit:
+                        break
+            if len(page) > limit:
+                break
+
+    next_cursor = page[limit - 1][0] if len(page) > limit and limit else None
+    return [entry for _, entry in page[:limit]], next_cursor
+
+
+def update_signal_status(signal_id: str, action: str) -> SignalRecord | None:
     """
     Update user_action for a signal by ID.
     action: 'APPROVED' or 'REJECTED_BY_USER'
     Returns updated entry or None if not found.
     """
-    for entry in reversed(_log):
-        if entry["id"] == signal_id:
-            entry["user_action"] = action
-            # Also update in cached signals
-            for sig in _signals:
-                if sig.get("id") == signal_id:
-                    sig["user_action"] = action
-            return entry
-    return None
+    _load()
+    with _lock:
+        entry = _by_id.get(signal_id)
+        if entry is None:
+            return None
+        _counts[("action", entry.user_action)] -= 1
+        entry.user_action = action
+        _counts[("action", action)] += 1
+        position = _journal({"op": "action", "id": signal_id, "action": action})
+        _late_actions[signal_id] = (position[0] if position else _segment, action)
+    # Cached scan results share the entry records, so they see the change too
+    return entry
 
 
-def get_signal_by_id(signal_id: str) -> dict | None:
+def get_signal_by_id(signal_id: str) -> SignalRecord | None:
     """Find a signal in the log by its ID."""
-    for entry in reversed(_log):
-        if entry["id"] == signal_id:
-            return entry
-    return None
+    _load()
+    return _by_id.get(signal_id)
 
 
 def clear_all():
     """Kill-switch: wipe all signals and log entries."""
-    global _log, _signals
-    _log = []
-    _signals = []
+    global _loaded
+    with _load_lock:
+        signal_journal.clear()
+        _reset()
+        _loaded = True
 
 
 def get_stats() -> dict:
     """Return summary statistics of the log."""
-    total = len(_log)
-    qualified = sum(1 for s in _log if s.get("signal_status") == "QUALIFIED")
-    rejected = sum(1 for s in _log if s.get("signal_status") == "REJECTED")
-    approved = sum(1 for s in _log if s.get("user_action") == "APPROVED")
-    user_rejected = sum(1 for s in _log if s.get("user_action") == "REJECTED_BY_USER")
-    return {
-        "total_signals": total,
-        "qualified": qualified,
-        "rejected": rejected,
-        "user_approved": approved,
-        "user_rejected": user_rejected,
-    }
+    _load()
+    with _lock:
+        return {
+            "total_signals": len(_log),
+            "qualified": _counts[("status", "QUALIFIED")],
+            "rejected": _counts[("status", "REJECTED")],
+            "user_approved": _counts[("action", "APPROVED")],
+            "user_rejected": _counts[("action", "REJECTED_BY_USER")],
+            "evicted": _evicted,
+            "capacity": CAPACITY,
+        }
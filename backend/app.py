@@ -22,7 +22,16 @@ API_SECRET_KEY = os.getenv('API_SECRET_KEY')
 if not API_SECRET_KEY or API_SECRET_KEY == 'change-me-to-a-strong-random-secret':
     print("WARNING: API_SECRET_KEY not set or is default. Set a strong secret in .env file")
 
-if not client_id or not access_token:
+if os.getenv('DHAN_FAKE', 'false').lower() == 'true':
+    # Offline mode: in-process fake broker + simulated feed (see fake_dhan.py)
+    import fake_dhan
+    dhan = fake_dhan.install(
+        latency=float(os.getenv('DHAN_FAKE_LATENCY', '0')),
+        failure_rate=float(os.getenv('DHAN_FAKE_FAILURE_RATE', '0')),
+    )
+    dhan.feed.start()
+    print("FakeDhan client initialized (offline mode)", flush=True)
+elif not client_id or not access_token:
     print("WARNING: Dhan API credentials not found. Set DHAN_CLIENT_ID and DHAN_ACCESS_TOKEN in .env file")
     dhan = None
 else:
@@ -692,28 +701,39 @@ import agent_log
 import trade_store
 import auto_executor
 import auto_scheduler
+import backtest_engine
+import metrics
+import optimizer
 # print("DEBUG: After agent imports")
 
+# Count and time every Dhan API call (calls, errors, latency per method) for /metrics
+dhan = metrics.instrument(dhan, "dhan")
+
+@app.route('/metrics', methods=['GET'])
+@require_auth
+def prometheus_metrics():
+    """Agent, scheduler, upstream and trade-store metrics in Prometheus text format."""
+    return metrics.render(), 200, {"Content-Type": metrics.CONTENT_TYPE}
+
 @app.route('/api/agent/config', methods=['GET'])
 @require_auth
 def get_agent_config():
     """Return current agent configuration with live Dhan balance."""
     try:
-        config = agent_config.get_config()
-        config["agent_active"] = agent_config.is_agent_active()
-        config["available_sectors"] = sorted(agent_config.SECTOR_SCRIPS.keys())
-
         # Fetch live balance from Dhan so it reflects immediately
         if dhan:
             try:
                 fund_response = dhan.get_fund_limits()
                 if fund_response.get('status') == 'success':
-                    capital = fund_response.get('data', {}).get('availabelBalance', 0)
-                    agent_config.set_capital(capital)
-                    config["capital_available"] = capital
+                    agent_config.set_capital(fund_response.get('data', {}).get('availabelBalance', 0))
             except Exception as e:
                 print(f"[Agent Config] Could not fetch Dhan balance: {e}")
 
+        snapshot = agent_config.get_config()
+        config = dict(snapshot)
+        config["config_version"] = snapshot.version
+        config["agent_active"] = agent_config.is_agent_active()
+        config["available_sectors"] = sorted(agent_config.SECTOR_SCRIPS.keys())
         return jsonify({"status": "success", "data": config})
     except Exception as e:
         print(f"Agent config error: {e}")
@@ -727,7 +747,9 @@ def update_agent_config():
         data = request.get_json()
         if not data:
             return jsonify({"error": "Invalid JSON body"}), 400
-        updated = agent_config.update_config(data)
+        snapshot = agent_config.update_config(data)
+        updated = dict(snapshot)
+        updated["config_version"] = snapshot.version
         updated["agent_active"] = agent_config.is_agent_active()
         return jsonify({"status": "success", "message": "Configuration updated", "data": updated})
     except ValueError as ve:
@@ -736,6 +758,44 @@ def update_agent_config():
         print(f"Agent configure error: {e}")
         return jsonify({"error": "An internal server error occurred"}), 500
 
+@app.route('/api/agent/profiles', methods=['GET'])
+@require_auth
+def get_agent_profiles():
+    """Return every agent profile's full config (the main config is 'default')."""
+    try:
+        return jsonify({"status": "success", "data": agent_config.get_profiles()})
+    except Exception as e:
+        print(f"Agent profiles error: {e}")
+        return jsonify({"error": "An internal server error occurred"}), 500
+
+@app.route('/api/agent/profiles/<name>', methods=['POST'])
+@require_auth
+def set_agent_profile(name):
+    """Create or update a named agent profile (overrides of the main config)."""
+    try:
+        data = request.get_json()
+        if not isinstance(data, dict):
+            return jsonify({"error": "Invalid JSON body"}), 400
+        profile = agent_config.set_profile(name, data)
+        return jsonify({"status": "success", "message": f"Profile '{name}' saved", "data": profile})
+    except ValueError as ve:
+        return jsonify({"status": "failure", "error": str(ve)}), 400
+    except Exception as e:
+        print(f"Agent profile error: {e}")
+        return jsonify({"error": "An internal server error occurred"}), 500
+
+@app.route('/api/agent/profiles/<name>', methods=['DELETE'])
+@require_auth
+def delete_agent_profile(name):
+    """Remove a named agent profile."""
+    try:
+        if not agent_config.delete_profile(name):
+            return jsonify({"status": "failure", "error": f"No profile '{name}'"}), 404
+        return jsonify({"status": "success", "message": f"Profile '{name}' deleted"})
+    except Exception as e:
+        print(f"Agent profile error: {e}")
+        return jsonify({"error": "An internal server error occurred"}), 500
+
 @app.route('/api/agent/scan', methods=['POST'])
 @require_auth
 @rate_limit(max_calls=5, period_seconds=60)
@@ -745,19 +805,17 @@ def agent_scan():
         if not agent_config.is_agent_active():
             return jsonify({"status": "failure", "error": "Agent is deactivated. Use kill switch reset to reactivate."}), 403
 
-        config = agent_config.get_config()
-
         # Fetch real capital from Dhan if available
         if dhan:
             try:
                 fund_response = dhan.get_fund_limits()
                 if fund_response.get('status') == 'success':
-                    capital = fund_response.get('data', {}).get('availabelBalance', 0)
-                    agent_config.set_capital(capital)
-                    config["capital_available"] = capital
+                    agent_config.set_capital(fund_response.get('data', {}).get('availabelBalance', 0))
             except Exception as e:
                 print(f"[Agent] Could not fetch capital from Dhan: {e}")
 
+        config = agent_config.get_config()
+
         # Run the scan
         signals = agent_engine.scan_markets(config)
 
@@ -768,7 +826,7 @@ def agent_scan():
             logged_signals.append(logged)
 
         # Cache results
-        agent_log.store_scan_results(logged_signals)
+        agent_log.store_scan_results(logged_signals, config.version)
 
         # Auto-execute qualified signals when in AUTO_RULED mode
         auto_executed = 0
@@ -792,7 +850,7 @@ def agent_scan():
             "qualified": sum(1 for s in logged_signals if s["signal_status"] == "QUALIFIED"),
             "rejected": sum(1 for s in logged_signals if s["signal_status"] == "REJECTED"),
             "auto_executed": auto_executed,
-            "signals": logged_signals,
+            "signals": [s.to_dict() for s in logged_signals],
             "config_snapshot": {
                 "trading_mode": config["trading_mode"],
                 "execution_mode": config["execution_mode"],
@@ -807,14 +865,17 @@ def agent_scan():
 @app.route('/api/agent/signals', methods=['GET'])
 @require_auth
 def get_agent_signals():
-    """Return cached signals from the last scan."""
+    """Return cached signals from the last scan; stale if the agent config has changed since."""
     try:
         signals = agent_log.get_signals()
         stats = agent_log.get_stats()
+        version = agent_log.scan_config_version()
         return jsonify({
             "status": "success",
-            "signals": signals,
+            "signals": [s.to_dict() for s in signals],
             "stats": stats,
+            "config_version": version,
+            "stale": version != agent_config.version(),
         })
     except Exception as e:
         print(f"Agent signals error: {e}")
@@ -823,14 +884,27 @@ def get_agent_signals():
 @app.route('/api/agent/log', methods=['GET'])
 @require_auth
 def get_agent_log():
-    """Return the full decision log."""
+    """
+    Return the decision log, newest first.
+
+    Pass the returned next_cursor as ?before= to page back; older pages
+    are read from the on-disk signal journal.
+    """
     try:
         limit = request.args.get('limit', 50, type=int)
-        log_entries = agent_log.get_log(limit)
+        before = request.args.get('before')
+        if before:
+            # segment.line, plus .n for entries the journal could not record
+            parts = before.split('.')
+            if len(parts) not in (2, 3) or not all(p.lstrip('-').isdigit() for p in parts):
+                return jsonify({"error": "Invalid cursor"}), 400
+            before = tuple(int(p) for p in parts)
+        log_entries, next_cursor = agent_log.get_log_page(limit, before or None)
         stats = agent_log.get_stats()
         return jsonify({
             "status": "success",
-            "log": log_entries,
+            "log": [e.to_dict() for e in log_entries],
+            "next_cursor": ".".join(str(p) for p in next_cursor) if next_cursor else None,
             "stats": stats,
         })
     except Exception as e:
@@ -854,7 +928,7 @@ def approve_signal(signal_id):
         return jsonify({
             "status": "success",
             "message": f"Signal {signal_id} approved",
-            "signal": updated,
+            "signal": updated.to_dict(),
         })
     except Exception as e:
         print(f"Approve signal error: {e}")
@@ -873,7 +947,7 @@ def reject_signal(signal_id):
         return jsonify({
             "status": "success",
             "message": f"Signal {signal_id} rejected",
-            "signal": updated,
+            "signal": updated.to_dict(),
         })
     except Exception as e:
         print(f"Reject signal error: {e}")
@@ -884,8 +958,8 @@ def reject_signal(signal_id):
 def agent_kill_switch():
     """Emergency kill switch — deactivate agent, stop auto-trading, close positions."""
     try:
-        # Stop auto-scheduler first
-        auto_scheduler.stop_scheduler()
+        # Stop new entries first (without waiting for the cycle to wind down)
+        auto_scheduler.stop_scheduler(wait=False)
 
         # Close all open positions
         config = agent_config.get_config()
@@ -991,11 +1065,32 @@ def force_scan_cycle():
 @app.route('/api/agent/trades', methods=['GET'])
 @require_auth
 def get_agent_trades():
-    """Get trade history from persistent store."""
+    """
+    Get trade history from persistent store, newest entry first.
+    Keyset-paginated: pass the returned next_cursor as ?cursor= for the
+    next page.  Optional filters: status, sector, symbol.
+    """
     try:
-        limit = request.args.get('limit', 100, type=int)
-        trades = trade_store.get_all_trades(limit)
-        return jsonify({"status": "success", "data": {"trades": trades, "total": len(trades)}})
+        limit = max(1, request.args.get('limit', 100, type=int))
+        cursor = request.args.get('cursor')
+        if cursor:
+            entry_time, sep, trade_id = cursor.rpartition('|')
+            if not sep or not trade_id:
+                return jsonify({"error": "Invalid cursor"}), 400
+            cursor = (entry_time, trade_id)
+
+        status = request.args.get('status')
+        trades, next_cursor = trade_store.get_trades_page(
+            cursor, limit,
+            status=status.upper() if status else None,
+            sector=request.args.get('sector') or None,
+            symbol=request.args.get('symbol') or None,
+        )
+        return jsonify({"status": "success", "data": {
+            "trades": trades,
+            "total": len(trades),
+            "next_cursor": "|".join(next_cursor) if next_cursor else None,
+        }})
     except Exception as e:
         print(f"Agent trades error: {e}")
         return jsonify({"error": "An internal server error occurred"}), 500
@@ -1025,6 +1120,115 @@ def get_trades_summary():
         return jsonify({"error": "An internal server error occurred"}), 500
 
 
+# ===========================
+# BACKTEST ENDPOINT
+# ===========================
+
+def _backtest_options(data: dict, profile: dict) -> tuple:
+    """
+    (config, backtest_engine.run() options) of a backtest request body
+    for a profile's config.  Raises ValueError for invalid values.
+    """
+    config = agent_config.with_overrides(data.get('config') or {}, profile)
+
+    for key in ('start', 'end'):
+        if data.get(key):
+            try:
+                datetime.strptime(data[key], '%Y-%m-%d')
+            except (TypeError, ValueError):
+                raise ValueError("start and end must be dates in YYYY-MM-DD format")
+    symbols = data.get('symbols')
+    if symbols is not None and not (isinstance(symbols, list) and all(isinstance(s, str) for s in symbols)):
+        raise ValueError("symbols must be a list of tickers")
+    try:
+        lookback = int(data.get('lookback', backtest_engine.LOOKBACK))
+        capital = float(data['capital']) if data.get('capital') is not None else None
+    except (TypeError, ValueError):
+        raise ValueError("lookback and capital must be numbers")
+    if capital is not None and capital <= 0:
+        raise ValueError("capital must be positive")
+
+    return config, {
+        "period": data.get('period', '5y'), "lookback": lookback, "capital": capital,
+        "start": data.get('start'), "end": data.get('end'), "symbols": symbols,
+    }
+
+@app.route('/api/backtest', methods=['POST'])
+@require_auth
+@rate_limit(max_calls=5, period_seconds=60)
+def run_backtest():
+    """
+    Replay the agent's rules over historical daily bars.
+
+    JSON body (all optional): profile (default 'default'), config
+    (overrides of that profile), period (1y/2y/5y/10y/max, default 5y),
+    start/end (YYYY-MM-DD entry window), lookback (bars per scan),
+    capital, symbols (subset of the universe).
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        if not isinstance(data, dict):
+            return jsonify({"error": "Invalid JSON body"}), 400
+        profiles = agent_config.get_profiles()
+        name = data.get('profile', agent_config.DEFAULT_PROFILE)
+        if name not in profiles:
+            return jsonify({"status": "failure", "error": f"No profile '{name}'"}), 404
+        config, options = _backtest_options(data, profiles[name])
+        result = backtest_engine.run(config, **options)
+        result["run"]["profile"] = name
+        return jsonify({"status": "success", "data": result})
+    except ValueError as ve:
+        return jsonify({"status": "failure", "error": str(ve)}), 400
+    except Exception as e:
+        print(f"Backtest error: {e}")
+        return jsonify({"error": "An internal server error occurred"}), 500
+
+@app.route('/api/backtest/optimize', methods=['POST'])
+@require_auth
+@rate_limit(max_calls=2, period_seconds=60)
+def optimize_rules():
+    """
+    Backtest a grid (or random sample) of rule parameters and rank them.
+
+    JSON body: the /api/backtest options, plus space ({parameter: [values]}
+    overriding optimizer.SPACE), samples and seed (random search),
+    sort_by (sharpe_ratio/total_pnl/win_rate/max_drawdown), top and
+    min_trades.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        if not isinstance(data, dict):
+            return jsonify({"error": "Invalid JSON body"}), 400
+        profiles = agent_config.get_profiles()
+        name = data.get('profile', agent_config.DEFAULT_PROFILE)
+        if name not in profiles:
+            return jsonify({"status": "failure", "error": f"No profile '{name}'"}), 404
+        config, options = _backtest_options(data, profiles[name])
+        space = data.get('space')
+        if space is not None and not isinstance(space, dict):
+            return jsonify({"error": "space must map parameter names to lists of values"}), 400
+        try:
+            samples = int(data['samples']) if data.get('samples') is not None else None
+            seed = int(data['seed']) if data.get('seed') is not None else None
+            top = int(data.get('top', 20))
+            min_trades = int(data.get('min_trades', optimizer.MIN_TRADES))
+        except (TypeError, ValueError):
+            return jsonify({"error": "samples, seed, top and min_trades must be integers"}), 400
+
+        result = optimizer.optimize(
+            config, space=space, samples=samples, seed=seed,
+            sort_by=data.get('sort_by', 'sharpe_ratio'), top=top, min_trades=min_trades,
+            workers=optimizer.HTTP_WORKERS, **options,
+        )
+        result["run"]["profile"] = name
+        return jsonify({"status": "success", "data": result})
+    except ValueError as ve:
+        return jsonify({"status": "failure", "error": str(ve)}), 400
+    except Exception as e:
+        print(f"Optimizer error: {e}")
+        return jsonify({"error": "An internal server error occurred"}), 500
+
+
 # ===========================
 # REPORTS ENDPOINT
 # ===========================
@@ -1032,30 +1236,40 @@ def get_trades_summary():
 @app.route('/api/reports', methods=['GET'])
 @require_auth
 def get_reports():
-    """Get performance reports from trade history."""
+    """
+    Get performance reports from trade history.
+    Window: the last ?days=N days including today (default 30) or a custom
+    ?start=YYYY-MM-DD&end=YYYY-MM-DD (inclusive).  daily_pnl covers the
+    whole history unless start or end is given.
+    """
     try:
         days = request.args.get('days', 30, type=int)
+        if days < 1:
+            return jsonify({"error": "days must be at least 1"}), 400
+        today = datetime.now().date()
+        try:
+            end = datetime.strptime(request.args['end'], '%Y-%m-%d').date() if 'end' in request.args else today
+            start = (datetime.strptime(request.args['start'], '%Y-%m-%d').date() if 'start' in request.args
+                     else end - timedelta(days=days - 1))
+        except ValueError:
+            return jsonify({"error": "start and end must be dates in YYYY-MM-DD format"}), 400
+        if start > end:
+            return jsonify({"error": "start must not be after end"}), 400
+
+        start_date, end_date = start.isoformat(), end.isoformat()
         summary = trade_store.get_trades_summary()
-        trades = trade_store.get_trades_by_date_range(days)
-        all_closed = trade_store.get_closed_trades(200)
-
-        # Daily P&L breakdown
-        daily_pnl = {}
-        for t in all_closed:
-            exit_date = t.get("exit_time", "")[:10]
-            if exit_date:
-                if exit_date not in daily_pnl:
-                    daily_pnl[exit_date] = 0
-                daily_pnl[exit_date] += t.get("pnl", 0)
-
-        daily_pnl_list = [{"date": d, "pnl": round(v, 2)} for d, v in sorted(daily_pnl.items())]
+        trades = trade_store.get_trades_between(start_date, end_date)
 
         return jsonify({
             "status": "success",
             "data": {
                 "summary": summary,
+                "window": {"start": start_date, "end": end_date,
+                           **trade_store.get_window_stats(start_date, end_date)},
                 "trades": trades,
-                "daily_pnl": daily_pnl_list,
+                "daily_pnl": (trade_store.get_daily_pnl(start_date, end_date)
+                              if 'start' in request.args or 'end' in request.args
+                              else trade_store.get_daily_pnl()),
             }
         })
     except Exception as e:
@@ -1127,5 +1341,6 @@ if __name__ == '__main__':
     # print("DEBUG: Entering main")
     print("Starting Satfin Python Backend on port 5001...", flush=True)
     print(f"Dhan API: {'Connected' if dhan else 'Not configured'}")
+    trade_store.roll_over()
     debug_mode = os.getenv('FLASK_DEBUG', 'false').lower() == 'true'
     app.run(debug=debug_mode, port=5001)
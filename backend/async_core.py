@@ -0,0 +1,50 @@
+"""
+Autonomous Trading Agent — Async Execution Core
+
+Scheduler cycles run as coroutines on one asyncio event loop (owned by
+auto_scheduler).  yfinance, dhanhq and trade_store calls block, so
+coroutines hand them to run_blocking(), which runs them on one shared,
+bounded thread pool of IO_WORKERS threads.  Any number of fetches and
+orders can be in flight as tasks while at most IO_WORKERS OS threads
+block; the rest simply wait their turn without a thread of their own.
+"""
+
+import asyncio
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+
+IO_WORKERS = int(os.getenv("IO_WORKERS", "16"))
+
+_pool = None
+_pool_lock = threading.Lock()
+
+metrics.gauge("agent_io_pool_queued", "Blocking calls waiting for a free I/O pool thread",
+              fn=lambda: _pool._work_queue.qsize() if _pool is not None else 0)
+metrics.gauge("agent_io_pool_workers", "Size of the bounded I/O thread pool", fn=lambda: IO_WORKERS)
+
+
+def _executor() -> ThreadPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=IO_WORKERS, thread_name_prefix="io")
+        return _pool
+
+
+async def run_blocking(fn, *args, **kwargs):
+    """Await fn(*args, **kwargs) run on the bounded I/O pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor(), functools.partial(fn, *args, **kwargs))
+
+
+def shutdown():
+    """Drop queued calls and release the pool (running calls finish on their own)."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
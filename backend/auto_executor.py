@@ -3,13 +3,22 @@ Autonomous Trading Agent — Auto Execution Engine
 
 Connects signal generation to order placement (Dhan API for LIVE, simulated for PAPER).
 Monitors open positions and auto-exits at target/stop-loss.
+
+The scheduler's event loop monitors with check_and_exit_positions_async,
+which runs the same price / broker calls concurrently (async_core pool).
 """
 
+import asyncio
 import math
 # import yfinance as yf  <-- Moved to functions
 from datetime import datetime
 
+import metrics
 import trade_store
+from async_core import run_blocking
+
+POSITIONS_CLOSED = metrics.counter("agent_positions_closed_total", "Positions auto-closed, by exit reason",
+                                   ("reason",))
 
 
 # Dhan security ID mapping for common NSE stocks
@@ -76,6 +85,36 @@ SECURITY_IDS = {
     "SAIL.NS": "2963",
 }
 
+# Optional override for live prices: fn(ticker) -> float.
+# None means fetch from yfinance (see set_price_source).
+_price_source = None
+
+
+def set_price_source(fn):
+    """Route price lookups through fn(ticker) instead of yfinance (None restores it)."""
+    global _price_source
+    _price_source = fn
+
+
+def unresolved_security_ids(tickers) -> list:
+    """Tickers with no Dhan security ID (LIVE orders for them would fail)."""
+    return [t for t in tickers if not SECURITY_IDS.get(t)]
+
+
+def _get_last_price(ticker: str) -> float | None:
+    """Latest traded price for a ticker, or None if unavailable."""
+    provider = "yfinance" if _price_source is None else "price_source"
+    with metrics.upstream(provider, "price") as call:
+        if _price_source is not None:
+            price = _price_source(ticker)
+        else:
+            import yfinance as yf
+            hist = yf.Ticker(ticker).history(period="1d")
+            price = None if hist.empty else float(hist["Close"].iloc[-1])
+        if price is None:
+            call.fail()
+        return price
+
 
 def execute_signal(signal: dict, config: dict, dhan_client) -> dict | None:
     """
@@ -107,6 +146,7 @@ def execute_signal(signal: dict, config: dict, dhan_client) -> dict | None:
 
     trading_mode = config.get("trading_mode", "PAPER")
     order_id = None
+    order_status = "TRADED"
     security_id = SECURITY_IDS.get(ticker, "")
 
     if trading_mode == "LIVE" and dhan_client:
@@ -130,6 +170,7 @@ def execute_signal(signal: dict, config: dict, dhan_client) -> dict | None:
 
             if response.get("status") == "success":
                 order_id = response.get("data", {}).get("orderId")
+                order_status = response.get("data", {}).get("orderStatus") or "TRANSIT"
                 print(f"[AutoExecutor] LIVE order placed: {ticker} qty={quantity} order_id={order_id}")
             else:
                 print(f"[AutoExecutor] LIVE order failed for {ticker}: {response.get('remarks', response)}")
@@ -152,6 +193,7 @@ def execute_signal(signal: dict, config: dict, dhan_client) -> dict | None:
         "quantity": quantity,
         "security_id": security_id,
         "order_id": order_id,
+        "order_status": order_status,
         "stop_loss": stop_loss,
         "target_price": target_price,
         "risk_reward_ratio": signal.get("risk_reward_ratio", 0),
@@ -161,6 +203,141 @@ def execute_signal(signal: dict, config: dict, dhan_client) -> dict | None:
     return trade
 
 
+# Dhan order states after which an order can no longer change
+FINAL_ORDER_STATUSES = {"TRADED", "REJECTED", "CANCELLED", "EXPIRED"}
+
+
+def reconcile_orders(dhan_client) -> list:
+    """
+    Reconcile open LIVE trades against the broker's order book and trade book.
+
+    Makes exactly one get_order_list and one get_trade_book call, indexes both
+    by order ID, and applies every fill/rejection to trade_store in one bulk
+    update — O(orders) per cycle instead of polling each order.
+
+    Filled orders get their real average fill price and quantity.  Orders the
+    broker rejected, cancelled or expired without a fill are marked REJECTED
+    so they are never monitored or counted as positions.
+
+    Returns the list of updated trades.
+    """
+    if not dhan_client:
+        return []
+
+    pending = {
+        t["order_id"]: t for t in trade_store.get_open_trades()
+        if t.get("trading_mode") == "LIVE" and t.get("order_id")
+        and (t.get("fill_price") is None or t.get("order_status") not in FINAL_ORDER_STATUSES)
+    }
+    if not pending:
+        return []
+
+    try:
+        order_response = dhan_client.get_order_list()
+        trade_response = dhan_client.get_trade_book()
+    except Exception as e:
+        print(f"[AutoExecutor] Reconciliation fetch error: {e}")
+        return []
+
+    if order_response.get("status") != "success":
+        print(f"[AutoExecutor] Reconciliation: order book unavailable: {order_response.get('remarks')}")
+        return []
+
+    orders = {str(o.get("orderId")): o for o in order_response.get("data") or []}
+
+    # Aggregate fills per order: total quantity and notional for the average price
+    fills = {}
+    if trade_response.get("status") == "success":
+        for fill in trade_response.get("data") or []:
+            oid = str(fill.get("orderId"))
+            if oid not in pending:
+                continue
+            qty = fill.get("tradedQuantity", 0) or 0
+            agg = fills.setdefault(oid, [0, 0.0])
+            agg[0] += qty
+            agg[1] += qty * (fill.get("tradedPrice", 0) or 0)
+
+    updates = {}
+    for oid, trade in pending.items():
+        order = orders.get(str(oid))
+        if order is None:
+            continue
+
+        status = order.get("orderStatus", "")
+        filled_qty, notional = fills.get(str(oid), (0, 0.0))
+        if not filled_qty:
+            filled_qty = order.get("filledQty", 0) or 0
+            notional = filled_qty * (order.get("averageTradedPrice", 0) or 0)
+
+        change = {"order_status": status}
+        if filled_qty > 0 and notional > 0:
+            fill_price = round(notional / filled_qty, 2)
+            change.update({
+                "fill_price": fill_price,
+                "filled_quantity": filled_qty,
+                "entry_price": fill_price,
+                "quantity": filled_qty,
+            })
+        elif status in FINAL_ORDER_STATUSES:
+            change.update({
+                "status": "REJECTED",
+                "reject_reason": order.get("omsErrorDescription") or status,
+            })
+
+        if any(trade.get(k) != v for k, v in change.items()):
+            updates[trade["trade_id"]] = change
+
+    if not updates:
+        return []
+
+    # Only trades still OPEN: the monitor may have closed one since the read above
+    updated = trade_store.update_trades(updates, expect_status="OPEN")
+    print(f"[AutoExecutor] Reconciled {len(updated)} of {len(pending)} pending orders")
+    return updated
+
+
+def _exit_reason(trade: dict, current_price: float) -> str | None:
+    """TARGET_HIT / STOP_LOSS_HIT if the price crossed a level, else None."""
+    if current_price >= trade.get("target_price", 0):
+        return "TARGET_HIT"
+    if current_price <= trade.get("stop_loss", 0):
+        return "STOP_LOSS_HIT"
+    return None
+
+
+def _exit_position(dhan_client, trade: dict, current_price: float, exit_reason: str,
+                   trading_mode: str) -> dict | None:
+    """Sell (LIVE) or simulate the exit (PAPER) and close the trade in the store."""
+    ticker = trade.get("symbol", "")
+    if trading_mode == "LIVE" and dhan_client:
+        security_id = trade.get("security_id", "")
+        if security_id:
+            try:
+                dhan_client.place_order(
+                    security_id=security_id,
+                    exchange_segment="NSE_EQ",
+                    transaction_type="SELL",
+                    quantity=trade.get("quantity", 1),
+                    order_type="MARKET",
+                    product_type="INTRADAY",
+                    price=0,
+                    trigger_price=0,
+                    validity="DAY",
+                )
+                print(f"[AutoExecutor] LIVE exit: {ticker} reason={exit_reason}")
+            except Exception as e:
+                print(f"[AutoExecutor] LIVE exit error for {ticker}: {e}")
+                return None
+    else:
+        print(f"[AutoExecutor] PAPER exit: {ticker} @ {current_price} reason={exit_reason}")
+
+    # Close trade in store
+    closed = trade_store.close_trade(trade["trade_id"], current_price, exit_reason)
+    if closed:
+        POSITIONS_CLOSED.inc(reason=exit_reason)
+    return closed
+
+
 def check_and_exit_positions(dhan_client, config: dict) -> list:
     """
     Monitor all open trades and auto-exit at target/stop-loss.
@@ -180,49 +357,13 @@ def check_and_exit_positions(dhan_client, config: dict) -> list:
 
         try:
             # Fetch current price
-            import yfinance as yf
-            stock = yf.Ticker(ticker)
-            hist = stock.history(period="1d")
-            if hist.empty:
+            current_price = _get_last_price(ticker)
+            if current_price is None:
                 continue
-            current_price = float(hist["Close"].iloc[-1])
-
-            target = trade.get("target_price", 0)
-            sl = trade.get("stop_loss", 0)
-            trade_id = trade["trade_id"]
-
-            exit_reason = None
-            if current_price >= target:
-                exit_reason = "TARGET_HIT"
-            elif current_price <= sl:
-                exit_reason = "STOP_LOSS_HIT"
 
+            exit_reason = _exit_reason(trade, current_price)
             if exit_reason:
-                # Exit the position
-                if trading_mode == "LIVE" and dhan_client:
-                    security_id = trade.get("security_id", "")
-                    if security_id:
-                        try:
-                            dhan_client.place_order(
-                                security_id=security_id,
-                                exchange_segment="NSE_EQ",
-                                transaction_type="SELL",
-                                quantity=trade.get("quantity", 1),
-                                order_type="MARKET",
-                                product_type="INTRADAY",
-                                price=0,
-                                trigger_price=0,
-                                validity="DAY",
-                            )
-                            print(f"[AutoExecutor] LIVE exit: {ticker} reason={exit_reason}")
-                        except Exception as e:
-                            print(f"[AutoExecutor] LIVE exit error for {ticker}: {e}")
-                            continue
-                else:
-                    print(f"[AutoExecutor] PAPER exit: {ticker} @ {current_price} reason={exit_reason}")
-
-                # Close trade in store
-                closed_trade = trade_store.close_trade(trade_id, current_price, exit_reason)
+                closed_trade = _exit_position(dhan_client, trade, current_price, exit_reason, trading_mode)
                 if closed_trade:
                     closed.append(closed_trade)
 
@@ -233,6 +374,35 @@ def check_and_exit_positions(dhan_client, config: dict) -> list:
     return closed
 
 
+async def check_and_exit_positions_async(dhan_client, config: dict) -> list:
+    """
+    check_and_exit_positions for the scheduler's event loop: every open
+    position's price is fetched concurrently, and the exits run
+    concurrently, all through the bounded async_core pool.
+    """
+    open_trades = [t for t in await run_blocking(trade_store.get_open_trades) if t.get("symbol")]
+    if not open_trades:
+        return []
+    trading_mode = config.get("trading_mode", "PAPER")
+
+    async def monitor(trade):
+        ticker = trade["symbol"]
+        try:
+            current_price = await run_blocking(_get_last_price, ticker)
+            if current_price is None:
+                return None
+            exit_reason = _exit_reason(trade, current_price)
+            if exit_reason:
+                return await run_blocking(_exit_position, dhan_client, trade, current_price,
+                                          exit_reason, trading_mode)
+        except Exception as e:
+            print(f"[AutoExecutor] Price check error for {ticker}: {e}")
+        return None
+
+    results = await asyncio.gather(*(monitor(t) for t in open_trades))
+    return [t for t in results if t]
+
+
 def close_all_positions(dhan_client, config: dict, reason: str = "KILL_SWITCH") -> list:
     """
     Emergency close all open positions (kill switch).
@@ -247,10 +417,9 @@ def close_all_positions(dhan_client, config: dict, reason: str = "KILL_SWITCH")
 
         # Try to get current price for P&L calculation
         try:
-            import yfinance as yf
-            stock = yf.Ticker(ticker)
-            hist = stock.history(period="1d")
-            current_price = float(hist["Close"].iloc[-1]) if not hist.empty else trade["entry_price"]
+            current_price = _get_last_price(ticker)
+            if current_price is None:
+                current_price = trade["entry_price"]
         except Exception:
             current_price = trade["entry_price"]
 
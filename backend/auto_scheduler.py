@@ -1,14 +1,42 @@
 """
 Autonomous Trading Agent — Background Auto-Scan Scheduler
 
-Runs a background thread that periodically:
+Runs an asyncio event loop on one background thread that periodically:
 1. Scans markets for signals
 2. Auto-executes qualified signals
-3. Monitors open positions for target/stop-loss exit
-
-Only trades during NSE market hours (9:15 AM - 3:30 PM IST).
+3. Reconciles LIVE orders against the broker's order book
+4. Monitors open positions for target/stop-loss exit
+
+Within a cycle these run as overlapping tasks (scan_pipeline.py):
+history is prefetched while the scan consumes it, orders are placed
+while later signals are still being logged, and steps 3-4 run alongside
+everything else.  Blocking yfinance / dhanhq / store calls go through
+async_core's bounded thread pool.
+
+start_scheduler / stop_scheduler / get_status are safe to call from any
+thread (the Flask request threads).  Stopping stops the scan and order
+dispatch at once: no order is entered after stop_scheduler() returns,
+though orders already being placed finish first.  Unless called with
+wait=False (the kill switch), it then waits up to STOP_TIMEOUT seconds
+for the loop to exit.
+
+Only trades during NSE sessions (trading_calendar.py): 9:15 AM - 3:30 PM
+IST on weekdays, skipping exchange holidays, plus special sessions such
+as Muhurat trading.
+
+Cycles are aligned to bar closes: with a 5-minute interval they fire at
+09:20:05, 09:25:05, ... 15:30:05 IST (BAR_CLOSE_DELAY seconds after each
+bar closes, so the scan sees the fresh bar).  After the last tick of a
+session the scheduler sleeps straight through to the first tick of the
+next one, however many nights, weekends and holidays lie in between.  The next tick is computed
+from the wall clock, never by sleeping for the interval, so cycle time
+does not accumulate as drift.  A cycle that runs past the next tick is
+an overrun: if the newest missed tick is less than half an interval
+old, one catch-up cycle runs at once for it; older missed ticks are
+skipped (a late scan of a stale bar is no use) and counted.
 """
 
+import asyncio
 import threading
 import time
 from datetime import datetime, timezone, timedelta
@@ -17,162 +45,514 @@ import agent_config
 import agent_engine
 import agent_log
 import auto_executor
+import columnar_store
+import metrics
+import scan_pipeline
 import trade_store
+import trading_calendar
+from async_core import run_blocking, shutdown as shutdown_io_pool
 
 # IST timezone offset
 IST = timezone(timedelta(hours=5, minutes=30))
 
-# Market hours
-MARKET_OPEN_HOUR = 9
-MARKET_OPEN_MIN = 15
-MARKET_CLOSE_HOUR = 15
-MARKET_CLOSE_MIN = 30
+BAR_CLOSE_DELAY = 5  # seconds after a bar closes before scanning it
+CLOCK_RECHECK = 600  # longest single sleep; the wall clock is re-read after it
+WARMUP_LEAD = 300    # seconds before a session opens to start warming up
+STOP_TIMEOUT = 15    # seconds stop_scheduler waits for in-flight orders and the loop to exit
 
-# Scheduler state
+# Scheduler state (written under _state_lock; read by get_status from any thread)
+_state_lock = threading.Lock()
 _scheduler_thread = None
 _scheduler_running = False
 _scan_interval = 300  # 5 minutes default
 _last_scan_time = None
 _last_scan_result = None
 _dhan_client = None
+_loop = None          # the scheduler's event loop
+_stop = None          # asyncio.Event on _loop, set by stop_scheduler
+_next_tick_time = None
+_timing = {}
+_warmup = {"ready": False, "session": None}
+_warm_capital = False  # capital fetched by the warm-up, not yet used by a cycle
+_halt = threading.Event()          # set by stop_scheduler: no new entries from then on
+_orders_cond = threading.Condition()  # guards _orders_in_flight
+_orders_in_flight = 0
+
+CYCLES = metrics.counter("agent_cycles_total", "Scheduler cycles run, by outcome", ("result",))
+CYCLE_SECONDS = metrics.histogram("agent_cycle_seconds", "Wall time of scheduler cycles")
+TICK_LATENESS = metrics.histogram("agent_tick_lateness_seconds", "Delay from a bar-close tick to its cycle starting")
+OVERRUNS = metrics.counter("agent_scheduler_overruns_total", "Cycles that ran past the next tick")
+SKIPPED_TICKS = metrics.counter("agent_scheduler_skipped_ticks_total", "Ticks skipped after overruns")
+SIGNALS = metrics.counter("agent_signals_total", "Signals generated by scheduler cycles", ("profile", "status"))
+ORDERS = metrics.counter("agent_orders_total", "Auto-executed orders, by trading mode and outcome",
+                         ("mode", "result"))
+ORDER_SECONDS = metrics.histogram("agent_order_seconds", "Time to place an auto-executed order", ("mode",))
+WARMUP_SECONDS = metrics.gauge("agent_warmup_seconds", "Duration of the last pre-open warm-up")
+metrics.gauge("agent_open_positions", "Open positions in the trade store",
+              fn=lambda: len(trade_store.get_open_trades()))
+metrics.gauge("agent_trades_today", "Trades entered today", fn=lambda: trade_store.get_today_trade_count())
+metrics.gauge("agent_scheduler_running", "1 while the auto-trading scheduler runs", fn=lambda: _scheduler_running)
+metrics.gauge("agent_warmup_ready", "1 once the warm-up for the next session has finished",
+              fn=lambda: _warmup.get("ready", False))
 
 
 def _is_market_hours() -> bool:
-    """Check if current time is within NSE market hours (IST)."""
-    now = datetime.now(IST)
-    market_open = now.replace(hour=MARKET_OPEN_HOUR, minute=MARKET_OPEN_MIN, second=0)
-    market_close = now.replace(hour=MARKET_CLOSE_HOUR, minute=MARKET_CLOSE_MIN, second=0)
-    # Also check weekday (0=Monday, 6=Sunday)
-    if now.weekday() >= 5:
-        return False
-    return market_open <= now <= market_close
-
-
-def _run_cycle():
-    """Execute one scan + execute + monitor cycle."""
-    global _last_scan_time, _last_scan_result
-
-    config = agent_config.get_config()
+    """Check if NSE is in session now (trading calendar, IST)."""
+    return trading_calendar.is_open()
+
+
+async def _run_cycle(stopping=lambda: False, scan_markets: bool = True):
+    """Execute one scan + execute + monitor cycle (only the monitor unless scan_markets)."""
+    start = time.perf_counter()
+    try:
+        await _cycle(stopping, scan_markets)
+    except Exception:
+        CYCLES.inc(result="error")
+        raise
+    else:
+        CYCLES.inc(result="ok")
+    finally:
+        CYCLE_SECONDS.observe(time.perf_counter() - start)
+
+
+async def _cycle(stopping, scan_markets: bool):
+    global _last_scan_time, _last_scan_result, _warm_capital
+
+    profiles = await run_blocking(agent_config.get_profiles)
+    config = profiles[agent_config.DEFAULT_PROFILE]
+
+    # Move trades settled on earlier days into the archive (no-op after the first cycle of a day)
+    await run_blocking(trade_store.roll_over)
+
+    cycle_stats = scan_pipeline.CycleMetrics()
+
+    # Positions are monitored (and LIVE orders reconciled) alongside the
+    # whole scan; trades entered this cycle are first checked next cycle
+    monitor = asyncio.create_task(scan_pipeline.timed(cycle_stats.stage("monitor"), _monitor_positions)(config))
+
+    logged_signals, qualified, by_profile, executed = [], [], {}, 0
+    try:
+        if not scan_markets:
+            # The session has closed (its last bar came in): only reconcile and exit positions
+            print(f"[Scheduler] Market closed, monitoring positions at {datetime.now(IST).strftime('%H:%M:%S IST')}")
+        else:
+            # Market data starts streaming in while capital is fetched
+            print(f"[Scheduler] Running market scan at {datetime.now(IST).strftime('%H:%M:%S IST')}")
+            scans = [
+                agent_engine.ProfileScan(profile, None if name == agent_config.DEFAULT_PROFILE else name)
+                for name, profile in profiles.items()
+            ]
+            if _warm_capital:
+                capital, _warm_capital = None, False   # the warm-up just fetched it
+            else:
+                capital = asyncio.create_task(_capital_into(scans))
+            # Step 1: Scan markets as bars arrive, once for all agent profiles
+            await scan_pipeline.scan_profiles(scans, cycle_stats, ready=capital, stopping=stopping)
+
+            # Step 2: Log signals, handing each executable one to the executor as it is logged.
+            # The daily trade limit of the default config caps the whole account.
+            work = asyncio.Queue(maxsize=scan_pipeline.QUEUE_SIZE)
+            executor = None
+            if any(p.get("execution_mode") == "AUTO_RULED" for p in profiles.values()):
+                limit = {
+                    "today": await run_blocking(trade_store.get_today_trade_count),
+                    "max": config.get("max_trades_per_day", 3),
+                }
+                execute = scan_pipeline.timed(cycle_stats.stage("execute"), lambda item: _execute(*item, limit))
+                executor = asyncio.create_task(scan_pipeline.consume(work, execute))
+
+            ordered = set()
+            try:
+                for scan in scans:
+                    signals = scan.result()
+                    profile_qualified = 0
+                    for sig in signals:
+                        logged = agent_log.log_signal(sig)
+                        logged_signals.append(logged)
+                        if logged.signal_status != "QUALIFIED":
+                            continue
+                        profile_qualified += 1
+                        # One order per scrip per cycle, however many profiles qualify it
+                        if executor is not None and not stopping() and logged.ticker not in ordered \
+                                and logged.execution_instruction == "FORWARD_TO_EXECUTION_ENGINE":
+                            ordered.add(logged.ticker)
+                            await work.put((logged, scan.config))   # waits while the executor is QUEUE_SIZE behind
+                    name = scan.name or agent_config.DEFAULT_PROFILE
+                    by_profile[name] = {"signals": len(signals), "qualified": profile_qualified}
+                    SIGNALS.inc(profile_qualified, profile=name, status="QUALIFIED")
+                    SIGNALS.inc(len(signals) - profile_qualified, profile=name, status="REJECTED")
+            finally:
+                if executor is not None:
+                    await work.put(None)
+            agent_log.store_scan_results(logged_signals, scans[0].config.version)
+
+            qualified = [s for s in logged_signals if s["signal_status"] == "QUALIFIED"]
+            print(f"[Scheduler] Scan complete: {len(logged_signals)} signals, {len(qualified)} qualified"
+                  + (f" across {len(scans)} profiles" if len(scans) > 1 else ""))
+
+            executed = len(await executor) if executor is not None else 0
+            print(f"[Scheduler] Auto-executed {executed} trades")
+    finally:
+        # Steps 3-4 ran on the monitor task
+        reconciled, closed = await monitor
+    if closed:
+        print(f"[Scheduler] Auto-closed {len(closed)} positions")
 
-    # Fetch real capital from Dhan
-    if _dhan_client:
+    # Persist this cycle's signals and closes to the columnar history
+    await run_blocking(columnar_store.flush)
+
+    with _state_lock:
+        _last_scan_time = datetime.now().isoformat()
+        _last_scan_result = {
+            "scan_time": _last_scan_time,
+            "total_signals": len(logged_signals),
+            "qualified": len(qualified),
+            "profiles": by_profile,
+            "executed": executed,
+            "orders_reconciled": len(reconciled),
+            "positions_closed": len(closed),
+            "pipeline": cycle_stats.report(),
+        }
+
+
+async def _refresh_capital():
+    """Fetch real capital from Dhan and publish it into the config; True if fetched."""
+    if not _dhan_client:
+        return False
+    try:
+        fund_response = await run_blocking(_dhan_client.get_fund_limits)
+        if fund_response.get("status") == "success":
+            capital = fund_response.get("data", {}).get("availabelBalance", 0)
+            await run_blocking(agent_config.set_capital, capital)
+            return True
+    except Exception as e:
+        print(f"[Scheduler] Could not fetch capital: {e}")
+    return False
+
+
+async def _capital_into(scans: list):
+    """Refresh capital, then move each scan onto its profile's new config snapshot."""
+    if await _refresh_capital():
+        profiles = await run_blocking(agent_config.get_profiles)
+        for scan in scans:
+            scan.config = profiles.get(scan.name or agent_config.DEFAULT_PROFILE, scan.config)
+
+
+def _preimport():
+    import pandas  # noqa: F401
+    try:
+        import yfinance  # noqa: F401
+    except ImportError:
+        pass
+
+
+async def _warm_up(session_open: datetime):
+    """Pre-open warm-up for the session opening at `session_open`."""
+    global _warm_capital
+    with _state_lock:
+        _warmup.clear()
+        _warmup.update(ready=False, session=session_open.isoformat(), started_at=datetime.now(IST).isoformat())
+    print(f"[Scheduler] Warming up for the {session_open.strftime('%a %H:%M')} session")
+    started = time.perf_counter()
+
+    await run_blocking(_preimport)
+    profiles = await run_blocking(agent_config.get_profiles)
+    symbols = agent_engine.shared_universe(profiles.values())
+
+    async def warm(symbol):
         try:
-            fund_response = _dhan_client.get_fund_limits()
-            if fund_response.get("status") == "success":
-                capital = fund_response.get("data", {}).get("availabelBalance", 0)
-                agent_config.set_capital(capital)
-                config["capital_available"] = capital
+            return await run_blocking(agent_engine.warm, symbol)
         except Exception as e:
-            print(f"[Scheduler] Could not fetch capital: {e}")
-
-    # Step 1: Scan markets
-    print(f"[Scheduler] Running market scan at {datetime.now(IST).strftime('%H:%M:%S IST')}")
-    signals = agent_engine.scan_markets(config)
-
-    # Log signals
-    logged_signals = []
-    for sig in signals:
-        logged = agent_log.log_signal(sig)
-        logged_signals.append(logged)
-    agent_log.store_scan_results(logged_signals)
-
-    qualified = [s for s in logged_signals if s["signal_status"] == "QUALIFIED"]
-    print(f"[Scheduler] Scan complete: {len(signals)} signals, {len(qualified)} qualified")
-
-    # Step 2: Auto-execute qualified signals
-    executed = 0
-    if config.get("execution_mode") == "AUTO_RULED":
-        today_count = trade_store.get_today_trade_count()
-        max_trades = config.get("max_trades_per_day", 3)
-
-        for sig in qualified:
-            if today_count >= max_trades:
-                print(f"[Scheduler] Max trades/day ({max_trades}) reached, skipping remaining")
-                break
-
-            if sig.get("execution_instruction") == "FORWARD_TO_EXECUTION_ENGINE":
-                trade = auto_executor.execute_signal(sig, config, _dhan_client)
-                if trade:
-                    agent_log.update_signal_status(sig["id"], "AUTO_EXECUTED")
-                    executed += 1
-                    today_count += 1
-
-    print(f"[Scheduler] Auto-executed {executed} trades")
+            print(f"[Scheduler] Warm-up error for {symbol}: {e}")
+            return False
+
+    capital = asyncio.create_task(_refresh_capital())
+    warmed = await asyncio.gather(*(warm(s) for s in symbols))
+    _warm_capital = await capital
+
+    unresolved = auto_executor.unresolved_security_ids(symbols)
+    if unresolved:
+        print(f"[Scheduler] No security ID for {len(unresolved)} scrips: {', '.join(unresolved[:5])}")
+
+    seconds = round(time.perf_counter() - started, 3)
+    WARMUP_SECONDS.set(seconds)
+    with _state_lock:
+        _warmup.update(
+            ready=True,
+            symbols=len(symbols),
+            symbols_ready=sum(warmed),
+            unresolved_ids=unresolved,
+            seconds=seconds,
+            finished_at=datetime.now(IST).isoformat(),
+        )
+    print(f"[Scheduler] Warm-up done in {seconds}s: {sum(warmed)}/{len(symbols)} scrips ready")
+
+
+def _begin_order() -> bool:
+    """Count an order as in flight, unless the scheduler is stopping."""
+    global _orders_in_flight
+    with _orders_cond:
+        if _halt.is_set():
+            return False
+        _orders_in_flight += 1
+        return True
+
+
+def _end_order():
+    global _orders_in_flight
+    with _orders_cond:
+        _orders_in_flight -= 1
+        _orders_cond.notify_all()
+
+
+async def _execute(sig, config: dict, limit: dict):
+    """Execute stage: place one qualified signal's order within the daily trade limit."""
+    if limit["today"] >= limit["max"]:
+        print(f"[Scheduler] Max trades/day ({limit['max']}) reached, skipping {sig.ticker}")
+        return None
+    # Reserve the slot before awaiting, so concurrent orders never exceed the limit
+    limit["today"] += 1
+    mode = config.get("trading_mode", "PAPER")
+    if not _begin_order():
+        limit["today"] -= 1
+        print(f"[Scheduler] Stopping, not entering {sig.ticker}")
+        return None
+    try:
+        with ORDER_SECONDS.time(mode=mode):
+            trade = await run_blocking(auto_executor.execute_signal, sig, config, _dhan_client)
+    except Exception:
+        limit["today"] -= 1
+        ORDERS.inc(mode=mode, result="error")
+        raise
+    finally:
+        _end_order()
+    ORDERS.inc(mode=mode, result="placed" if trade else "failed")
+    if trade:
+        agent_log.update_signal_status(sig.id, "AUTO_EXECUTED")
+    else:
+        limit["today"] -= 1
+    return trade
+
+
+async def _monitor_positions(config: dict) -> tuple:
+    """Monitor stage: reconcile LIVE orders, then exit positions at target/stop-loss."""
+    # Step 3: Reconcile LIVE orders against the broker's order/trade book
+    reconciled = []
+    if config.get("trading_mode") == "LIVE":
+        reconciled = await run_blocking(auto_executor.reconcile_orders, _dhan_client)
+
+    # Step 4: Monitor and exit open positions
+    closed = await auto_executor.check_and_exit_positions_async(_dhan_client, config)
+    return reconciled, closed
+
+
+def _next_tick(after: datetime, interval: int) -> datetime:
+    """First bar-close tick strictly after `after` (IST), in this or a later session."""
+    after = after.astimezone(IST)
+    session = trading_calendar.next_session(after)
+    while session is not None:
+        market_open, market_close, _ = session
+        first = market_open + timedelta(seconds=BAR_CLOSE_DELAY)
+        k = max(1, int((after - first).total_seconds() // interval) + 1)
+        tick = first + timedelta(seconds=k * interval)
+        if tick <= market_close + timedelta(seconds=BAR_CLOSE_DELAY):
+            return tick
+        session = trading_calendar.next_session(market_close)
+    raise RuntimeError("no trading session within the calendar horizon")
+
+
+def _session_of(tick: datetime) -> tuple | None:
+    """
+    The session whose bar a tick scans: the one in progress just before
+    that bar closed (a session's last tick falls BAR_CLOSE_DELAY s after
+    its close).
+    """
+    return trading_calendar.next_session(tick - timedelta(seconds=BAR_CLOSE_DELAY, microseconds=1))
+
+
+def _ticks_between(start: datetime, end: datetime, interval: int) -> list:
+    """Ticks strictly after `start` up to and including `end`."""
+    ticks = []
+    tick = _next_tick(start, interval)
+    while tick <= end:
+        ticks.append(tick)
+        tick = _next_tick(tick, interval)
+    return ticks
+
+
+async def _wait_until(when: datetime) -> bool:
+    """Wait until `when` (re-reading the clock every CLOCK_RECHECK s); False if stopped first."""
+    while not _stop.is_set():
+        remaining = (when - datetime.now(IST)).total_seconds()
+        if remaining <= 0:
+            return True
+        try:
+            await asyncio.wait_for(_stop.wait(), timeout=min(remaining, CLOCK_RECHECK))
+        except asyncio.TimeoutError:
+            pass
+    return False
 
-    # Step 3: Monitor and exit open positions
-    closed = auto_executor.check_and_exit_positions(_dhan_client, config)
-    if closed:
-        print(f"[Scheduler] Auto-closed {len(closed)} positions")
 
-    _last_scan_time = datetime.now().isoformat()
-    _last_scan_result = {
-        "scan_time": _last_scan_time,
-        "total_signals": len(signals),
-        "qualified": len(qualified),
-        "executed": executed,
-        "positions_closed": len(closed),
-    }
+async def _unless_stopped(coro):
+    """Await coro, cancelling it (and its queued pool calls) if the scheduler stops first."""
+    task = asyncio.create_task(coro)
+    stop = asyncio.create_task(_stop.wait())
+    await asyncio.wait({task, stop}, return_when=asyncio.FIRST_COMPLETED)
+    stop.cancel()
+    if not task.done():
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        return None
+    return task.result()
 
 
-def _scheduler_loop():
-    """Main scheduler loop running in background thread."""
-    global _scheduler_running
+async def _scheduler_main():
+    """Main scheduler coroutine, run on the scheduler thread's event loop."""
+    global _next_tick_time
 
     print("[Scheduler] Auto-trading loop started")
 
-    while _scheduler_running:
+    tick = _next_tick(datetime.now(IST), _scan_interval)
+    while not _stop.is_set():
+        _next_tick_time = tick.isoformat()
+        if (tick - datetime.now(IST)).total_seconds() > _scan_interval:
+            _, _, name = _session_of(tick)
+            print(f"[Scheduler] Market closed, next scan at {tick.strftime('%a %d %b %H:%M:%S IST')} ({name} session)")
+
+        # Warm up once per session, WARMUP_LEAD s before it opens (at once if that has passed)
+        session_open = _session_of(tick)[0]
+        if _warmup.get("session") != session_open.isoformat():
+            if not await _wait_until(session_open - timedelta(seconds=WARMUP_LEAD)):
+                break
+            if agent_config.is_agent_active():
+                try:
+                    await _unless_stopped(_warm_up(session_open))
+                except Exception as e:
+                    print(f"[Scheduler] Warm-up failed: {e}")
+
+        if not await _wait_until(tick):
+            break
+
+        started = datetime.now(IST)
+        if (started - tick).total_seconds() > _scan_interval:
+            # The tick went stale while waiting (e.g. on a slow warm-up): never scan an old bar
+            _timing["skipped_ticks"] += 1
+            SKIPPED_TICKS.inc()
+            print(f"[Scheduler] Skipped the stale {tick.strftime('%a %H:%M:%S')} tick")
+            tick = _next_tick(started, _scan_interval)
+            continue
+        _timing["ticks"] += 1
+        _timing["last_late_ms"] = round((started - tick).total_seconds() * 1000)
+        _timing["max_late_ms"] = max(_timing["max_late_ms"], _timing["last_late_ms"])
+        TICK_LATENESS.observe(max((started - tick).total_seconds(), 0))
         try:
-            if not agent_config.is_agent_active():
-                print("[Scheduler] Agent deactivated, pausing...")
-                time.sleep(10)
-                continue
-
-            if _is_market_hours():
-                _run_cycle()
+            if agent_config.is_agent_active():
+                # The tick just after the close scans no new bar: it only exits positions
+                await _run_cycle(stopping=_stop.is_set, scan_markets=trading_calendar.is_open(tick))
             else:
-                now = datetime.now(IST)
-                print(f"[Scheduler] Outside market hours ({now.strftime('%H:%M IST')}), waiting...")
-
-            # Sleep in small increments to allow quick shutdown
-            for _ in range(int(_scan_interval)):
-                if not _scheduler_running:
-                    break
-                time.sleep(1)
-
+                print("[Scheduler] Agent deactivated, skipping this bar")
         except Exception as e:
             print(f"[Scheduler] Error in cycle: {e}")
-            time.sleep(30)
 
+        finished = datetime.now(IST)
+        _timing["last_cycle_seconds"] = round((finished - started).total_seconds(), 3)
+
+        missed = _ticks_between(tick, finished, _scan_interval)
+        if not missed:
+            tick = _next_tick(finished, _scan_interval)
+            continue
+
+        # Overrun: the cycle ran past one or more ticks
+        _timing["overruns"] += 1
+        OVERRUNS.inc()
+        newest = missed[-1]
+        if (finished - newest).total_seconds() < _scan_interval / 2:
+            _timing["catch_ups"] += 1
+            _timing["skipped_ticks"] += len(missed) - 1
+            SKIPPED_TICKS.inc(len(missed) - 1)
+            tick = newest
+            print(f"[Scheduler] Cycle overran by {len(missed)} tick(s), catching up on {newest.strftime('%H:%M:%S')}")
+        else:
+            _timing["skipped_ticks"] += len(missed)
+            SKIPPED_TICKS.inc(len(missed))
+            tick = _next_tick(finished, _scan_interval)
+            print(f"[Scheduler] Cycle overran, skipped {len(missed)} tick(s)")
+
+    _next_tick_time = None
     print("[Scheduler] Auto-trading loop stopped")
 
 
+def _run_loop(loop: asyncio.AbstractEventLoop):
+    """Scheduler thread: run _scheduler_main, then cancel leftovers, close the loop and release the I/O pool."""
+    global _scheduler_running
+    asyncio.set_event_loop(loop)
+    try:
+        loop.run_until_complete(_scheduler_main())
+    finally:
+        pending = asyncio.all_tasks(loop)
+        for task in pending:
+            task.cancel()
+        loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+        loop.run_until_complete(loop.shutdown_asyncgens())
+        loop.close()
+        # Drop calls still queued for the I/O pool; the next start creates a new pool
+        shutdown_io_pool()
+        with _state_lock:
+            _scheduler_running = False
+
+
 def start_scheduler(dhan_client=None, interval: int = 300):
     """Start the background auto-trading scheduler."""
-    global _scheduler_thread, _scheduler_running, _scan_interval, _dhan_client
+    global _scheduler_thread, _scheduler_running, _scan_interval, _dhan_client, _loop, _stop
 
-    if _scheduler_running:
-        return {"status": "already_running"}
+    with _state_lock:
+        if _scheduler_running:
+            return {"status": "already_running"}
 
-    _dhan_client = dhan_client
-    _scan_interval = max(60, interval)  # minimum 1 minute
-    _scheduler_running = True
+        _dhan_client = dhan_client
+        _scan_interval = max(60, interval)  # minimum 1 minute
+        _scheduler_running = True
+        _halt.clear()
+        _timing.update(ticks=0, overruns=0, skipped_ticks=0, catch_ups=0,
+                       last_late_ms=None, max_late_ms=0, last_cycle_seconds=None)
 
-    _scheduler_thread = threading.Thread(target=_scheduler_loop, daemon=True)
-    _scheduler_thread.start()
+        _loop = asyncio.new_event_loop()
+        _stop = asyncio.Event()
+        _scheduler_thread = threading.Thread(target=_run_loop, args=(_loop,), daemon=True,
+                                             name="scheduler")
+        _scheduler_thread.start()
 
     return {"status": "started", "interval": _scan_interval}
 
 
-def stop_scheduler():
-    """Stop the background auto-trading scheduler."""
-    global _scheduler_running
-
-    if not _scheduler_running:
-        return {"status": "not_running"}
+def stop_scheduler(wait: bool = True):
+    """
+    Stop the background auto-trading scheduler.  No new entries are placed
+    once this returns: it waits only for orders already being placed.  With
+    wait, it then also waits (up to STOP_TIMEOUT s) for the loop to exit;
+    without, the in-flight cycle winds down in the background.
+    """
+    with _orders_cond:
+        _halt.set()
+        if not _orders_cond.wait_for(lambda: not _orders_in_flight, timeout=STOP_TIMEOUT):
+            print(f"[Scheduler] {_orders_in_flight} orders still in flight after {STOP_TIMEOUT}s")
+
+    with _state_lock:
+        if not _scheduler_running or _loop is None or _loop.is_closed():
+            return {"status": "not_running"}
+        loop, stop, thread = _loop, _stop, _scheduler_thread
+        try:
+            loop.call_soon_threadsafe(stop.set)
+        except RuntimeError:
+            return {"status": "not_running"}   # the loop closed meanwhile
 
-    _scheduler_running = False
+    if not wait:
+        print("[Scheduler] Stop signal sent, no new entries will be placed")
+        return {"status": "stopping"}
     print("[Scheduler] Stop signal sent, waiting for current cycle to finish...")
-
+    thread.join(STOP_TIMEOUT)
+    if thread.is_alive():
+        return {"status": "stopping"}
     return {"status": "stopped"}
 
 
@@ -181,12 +561,27 @@ def get_status() -> dict:
     open_trades = trade_store.get_open_trades()
     today_count = trade_store.get_today_trade_count()
 
+    with _state_lock:
+        state = {
+            "running": _scheduler_running,
+            "scan_interval": _scan_interval,
+            "last_scan_time": _last_scan_time,
+            "last_scan_result": _last_scan_result,
+            "next_scan_time": _next_tick_time,
+            "timing": dict(_timing),
+            "warmup": dict(_warmup),
+        }
+    now = datetime.now(IST)
+    upcoming = trading_calendar.next_session(now)
     return {
-        "running": _scheduler_running,
-        "scan_interval": _scan_interval,
-        "last_scan_time": _last_scan_time,
-        "last_scan_result": _last_scan_result,
+        **state,
         "market_hours": _is_market_hours(),
+        "holiday": trading_calendar.holiday(now.date()),
+        "next_session": {
+            "open": upcoming[0].isoformat(),
+            "close": upcoming[1].isoformat(),
+            "name": upcoming[2],
+        } if upcoming else None,
         "open_positions": len(open_trades),
         "trades_today": today_count,
     }
@@ -196,5 +591,12 @@ def force_run_now():
     """Force an immediate scan cycle (for testing outside market hours)."""
     if not agent_config.is_agent_active():
         return {"error": "Agent is not active"}
-    _run_cycle()
+    with _state_lock:
+        loop = _loop if _scheduler_running and _loop is not None and not _loop.is_closed() else None
+    if loop is not None:
+        # Run on the scheduler's own loop so cycles share its tasks and pool
+        asyncio.run_coroutine_threadsafe(_run_cycle(), loop).result()
+    else:
+        _halt.clear()   # a manual cycle after stop_scheduler may enter again
+        asyncio.run(_run_cycle())
     return {"status": "success", "result": _last_scan_result}
@@ -0,0 +1,460 @@
+"""
+AI Market Intelligence Agent — Backtest Engine
+
+Replays the scanning engine's rules over years of daily bars.  Each bar
+close is one scan: the indicators of agent_engine._compute_indicators
+over the LOOKBACK bars ending there, the trend of _detect_trend, the
+levels of _calculate_levels and the hard limits of _run_rule_checks
+(max_trades_per_day counted in scan order across the universe).  A
+QUALIFIED signal enters at the bar's close, sized like
+auto_executor.execute_signal, and exits at the first later bar that
+reaches its target or stop-loss.
+
+Everything is computed on (symbols × bars) NumPy arrays instead of per
+symbol and per bar:
+
+  Panel     aligned OHLCV of the universe, NaN where a symbol has no bar
+  prepare   config-independent indicators and trend mask
+            (the vectorized analyze())
+  simulate  config-dependent levels, rule checks, entries and exits
+            (the vectorized signal_for() plus the executor and monitor)
+  score     the summary statistics of simulate() without building the
+            trade list (parameter sweeps: optimizer.py)
+  run       download history, prepare and simulate in one call
+
+The rule constants of agent_engine (RSI band, ATR stop multiple, minimum
+R:R) can be overridden per run through `rules` to evaluate alternatives.
+
+The EMAs are the pandas ewm(adjust=False) recurrence seeded at the first
+bar of the window, written as a fixed weight vector over the window so a
+whole panel is one matrix product.  Exits are found for all trades at
+once by searching forward in growing blocks of bars.  When a bar reaches
+both levels the stop-loss is assumed to fill first; a bar opening past a
+level fills at the open.
+
+Capital is fixed for the run (no compounding); trades still open at the
+last bar are reported as OPEN and left out of the statistics.
+"""
+
+import asyncio
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+import agent_engine
+from async_core import run_blocking
+from bar_store import WINDOW, Bars
+from trade_stats import TradeStats
+from trading_calendar import IST
+
+PERIODS = ("1y", "2y", "5y", "10y", "max")   # yfinance history spans accepted by run()
+LOOKBACK = WINDOW        # bars behind each scan: the most the live bar store keeps
+MIN_LOOKBACK = 26        # _compute_indicators needs at least this many
+DEFAULT_CAPITAL = 1_000_000   # when the config has no capital (no broker balance yet)
+
+# agent_engine's rule constants, by the names simulate() accepts in `rules`
+RULES = {
+    "rsi_low": agent_engine.RSI_RANGE[0],
+    "rsi_high": agent_engine.RSI_RANGE[1],
+    "atr_multiplier": agent_engine.ATR_STOP_MULTIPLE,
+    "min_risk_reward": agent_engine.MIN_RISK_REWARD,
+}
+TRADE_LIMIT = 1000       # newest trades returned in full by run()
+
+_cache = {}              # (symbol, period) → (IST date downloaded, Bars)
+_cache_lock = threading.Lock()
+
+
+class Panel:
+    """
+    OHLCV of several symbols on one shared time axis: float64 arrays of
+    shape (symbols, bars), NaN where a symbol has no bar on that day.
+    """
+
+    def __init__(self, pairs: list, history: dict):
+        self.pairs = [(sector, symbol) for sector, symbol in pairs if history.get(symbol) is not None]
+        symbols = [symbol for _, symbol in self.pairs]
+        self.time = np.unique(np.concatenate([history[s].time for s in symbols])) if symbols \
+            else np.zeros(0, dtype=np.int64)
+        shape = (len(symbols), len(self.time))
+        for name in ("open", "high", "low", "close", "volume"):
+            setattr(self, name, np.full(shape, np.nan))
+        for row, symbol in enumerate(symbols):
+            bars = history[symbol]
+            cols = np.searchsorted(self.time, bars.time)
+            for name in ("open", "high", "low", "close", "volume"):
+                getattr(self, name)[row, cols] = getattr(bars, name)
+        self.days = [datetime.fromtimestamp(int(t), IST).date().isoformat() for t in self.time]
+
+    @classmethod
+    def from_arrays(cls, pairs: list, days: list, arrays: dict) -> "Panel":
+        """A panel over existing (symbols, bars) arrays, e.g. views of shared memory."""
+        panel = cls.__new__(cls)
+        panel.pairs = list(pairs)
+        panel.days = list(days)
+        for name in ("time", "open", "high", "low", "close", "volume"):
+            setattr(panel, name, arrays.get(name))
+        return panel
+
+    @property
+    def shape(self) -> tuple:
+        return self.close.shape
+
+
+def _windows(values: np.ndarray, n: int) -> np.ndarray:
+    """(symbols, bars - n + 1, n) view of every n-bar window."""
+    return sliding_window_view(values, n, axis=-1)
+
+
+def _rolling_mean(values: np.ndarray, n: int) -> np.ndarray:
+    """Mean of the n bars ending at each bar (NaN for the first n - 1)."""
+    out = np.full(values.shape, np.nan)
+    if values.shape[-1] >= n:
+        out[..., n - 1:] = _windows(values, n).mean(axis=-1)
+    return out
+
+
+def _ema_weights(span: int, n: int) -> np.ndarray:
+    """Weights of an n-bar window in agent_engine._ema (first bar is the seed)."""
+    alpha = 2 / (span + 1)
+    weights = alpha * (1 - alpha) ** np.arange(n - 1, -1, -1, dtype=np.float64)
+    weights[0] = (1 - alpha) ** (n - 1)
+    return weights
+
+
+def prepare(panel: Panel, lookback: int = LOOKBACK) -> dict:
+    """
+    Indicators at every bar of a panel, each over the `lookback` bars
+    ending there (as the live scan sees them), and the `trend` mask of
+    _detect_trend's EMA and VWAP conditions (the RSI band is a rule,
+    applied by simulate).  Arrays are (symbols, bars); bars without a
+    full window of data are NaN and never in trend.
+    """
+    if lookback < MIN_LOOKBACK:
+        raise ValueError(f"lookback must be at least {MIN_LOOKBACK} bars")
+    close, high, low, volume = panel.close, panel.high, panel.low, panel.volume
+    shape = panel.shape
+    ready = np.zeros(shape, dtype=bool)
+    ema9 = np.full(shape, np.nan)
+    ema21 = np.full(shape, np.nan)
+    vwap = np.full(shape, np.nan)
+    if shape[1] >= lookback:
+        gaps = np.isnan(close) | np.isnan(high) | np.isnan(low) | np.isnan(volume)
+        ready[:, lookback - 1:] = ~_windows(gaps, lookback).any(axis=-1)
+
+        closes = _windows(close, lookback)
+        ema9[:, lookback - 1:] = closes @ _ema_weights(9, lookback)
+        ema21[:, lookback - 1:] = closes @ _ema_weights(21, lookback)
+
+        typical = (high + low + close) / 3
+        total_volume = _windows(volume, lookback).sum(axis=-1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            vwap[:, lookback - 1:] = np.where(
+                total_volume > 0,
+                _windows(typical * volume, lookback).sum(axis=-1) / total_volume,
+                close[:, lookback - 1:],
+            )
+
+    # RSI-14 over the last 14 price changes
+    delta = np.full(shape, np.nan)
+    delta[:, 1:] = np.diff(close, axis=1)
+    gain = _rolling_mean(np.clip(delta, 0, None), 14)
+    loss = _rolling_mean(np.clip(-delta, 0, None), 14)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rsi = np.where(loss > 0, 100 - 100 / (1 + gain / loss), 50.0)
+
+    # ATR-14 over the last 14 true ranges
+    prev_close = np.full(shape, np.nan)
+    prev_close[:, 1:] = close[:, :-1]
+    tr = np.maximum.reduce([high - low, np.abs(high - prev_close), np.abs(low - prev_close)])
+    atr = _rolling_mean(tr, 14)
+    atr = np.where(np.isfinite(atr), atr, close * 0.015)
+
+    trend = ready & (ema9 > ema21) & (close > vwap)
+    return {
+        "lookback": lookback,
+        "close": close,
+        "ema9": ema9,
+        "ema21": ema21,
+        "rsi": rsi,
+        "atr": atr,
+        "vwap": vwap,
+        "trend": trend,
+    }
+
+
+def _first_exits(panel: Panel, rows: np.ndarray, cols: np.ndarray,
+                 stop: np.ndarray, target: np.ndarray) -> np.ndarray:
+    """
+    Bar index of each trade's exit (the first bar after its entry whose
+    low reaches the stop or high reaches the target), -1 if none.
+    """
+    bars = panel.shape[1]
+    exits = np.full(len(rows), -1)
+    pending = np.arange(len(rows))
+    offset, block = 1, 8
+    while len(pending):
+        at = cols[pending, None] + offset + np.arange(block)
+        inside = at < bars
+        at = np.minimum(at, bars - 1)
+        row = rows[pending, None]
+        hit = inside & ((panel.low[row, at] <= stop[pending, None]) | (panel.high[row, at] >= target[pending, None]))
+        found = hit.any(axis=1)
+        exits[pending[found]] = at[found, hit[found].argmax(axis=1)]
+        pending = pending[~found & (cols[pending] + offset + block < bars)]
+        offset += block
+        block *= 2
+    return exits
+
+
+def _window(panel: Panel, start: str | None, end: str | None) -> np.ndarray:
+    """Bars whose day lies from start to end (YYYY-MM-DD, inclusive)."""
+    days = np.array(panel.days, dtype="U10")
+    in_window = np.ones(len(days), dtype=bool)
+    if start:
+        in_window &= days >= start
+    if end:
+        in_window &= days <= end
+    return in_window
+
+
+def _trades(panel: Panel, prepared: dict, config: dict, capital: float, rules: dict,
+            in_window: np.ndarray) -> dict:
+    """Arrays describing every trade of one config, entry day first, then scan order."""
+    close, atr = prepared["close"], prepared["atr"]
+    bullish = prepared["trend"] & (prepared["rsi"] >= rules["rsi_low"]) & (prepared["rsi"] <= rules["rsi_high"])
+
+    # _calculate_levels
+    sl_pct = config["stop_loss_rule"]["value"] / 100
+    target_pct = config["profit_booking_rule"]["value"] / 100
+    stop_loss = np.maximum(close - rules["atr_multiplier"] * atr, close * (1 - sl_pct))
+    risk = close - stop_loss
+    target = np.maximum(close + risk * rules["min_risk_reward"], close * (1 + target_pct))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        risk_reward = np.where(risk > 0, np.round((target - close) / np.where(risk > 0, risk, 1), 2), 0)
+    entry_price = np.round(close, 2)
+
+    # _run_rule_checks, every symbol of the panel being in an allowed sector
+    sector_allowed = np.array([sector in config["allowed_sectors"] for sector, _ in panel.pairs], dtype=bool)
+    passing = bullish & sector_allowed[:, None] & in_window[None, :] & (risk_reward >= rules["min_risk_reward"])
+    if capital > 0:
+        passing &= np.round(risk, 2) <= capital * (config["risk_per_trade"] / 100)
+        passing &= entry_price <= capital * (config["max_capital_per_trade"] / 100)
+
+    # trade_count_ok: the day's scan qualifies signals in universe order up to the cap
+    qualified = passing & (np.cumsum(passing, axis=0) <= config["max_trades_per_day"])
+
+    cols, rows = np.nonzero(qualified.T)
+    entries = entry_price[rows, cols]
+    stops = np.round(stop_loss[rows, cols], 2)
+    targets = np.round(target[rows, cols], 2)
+    exits = _first_exits(panel, rows, cols, stops, targets)
+
+    closed = exits >= 0
+    at = np.where(closed, exits, 0)
+    opens = panel.open[rows, at]
+    hit_stop = closed & ((opens <= stops) | ((panel.low[rows, at] <= stops) & (opens < targets)))
+    exit_price = np.where(opens <= stops, opens, np.where(opens >= targets, opens,
+                                                          np.where(hit_stop, stops, targets)))
+    max_trade_capital = capital * config["max_capital_per_trade"] / 100
+    return {
+        "setups": int((bullish & in_window[None, :]).sum()),
+        "rows": rows,
+        "cols": cols,
+        "entry": entries,
+        "stop": stops,
+        "target": targets,
+        "risk_reward": risk_reward[rows, cols],
+        "quantity": np.maximum(1, np.floor(max_trade_capital / entries)).astype(np.int64),
+        "exit": exits,
+        "exit_price": np.round(exit_price, 2),
+        "hit_stop": hit_stop,
+    }
+
+
+def _close_order(exits: np.ndarray) -> np.ndarray:
+    """Indices of the closed trades in the order they closed."""
+    return np.lexsort((np.arange(len(exits)), exits))[np.count_nonzero(exits < 0):]
+
+
+def simulate(panel: Panel, prepared: dict, config: dict, capital: float | None = None,
+             start: str | None = None, end: str | None = None, rules: dict | None = None) -> dict:
+    """
+    Trades of one config over a prepared panel, entering only on days
+    from start to end (YYYY-MM-DD, inclusive), under agent_engine's rule
+    constants with any of `rules` (see RULES) overridden.  Returns the
+    closed-trade summary (trade_store.get_trades_summary() shape), daily
+    P&L and the trades, oldest entry first.
+    """
+    if capital is None:
+        capital = config["capital_available"] or DEFAULT_CAPITAL
+    t = _trades(panel, prepared, config, capital, {**RULES, **(rules or {})}, _window(panel, start, end))
+    exits = t["exit"]
+
+    trades = []
+    columns = zip(t["rows"].tolist(), t["cols"].tolist(), t["entry"].tolist(), t["quantity"].tolist(),
+                  t["stop"].tolist(), t["target"].tolist(), t["risk_reward"].tolist(), exits.tolist(),
+                  t["exit_price"].tolist(), t["hit_stop"].tolist())
+    for i, (row, col, entry, qty, stop, target_price, rr, exit_at, price, stopped) in enumerate(columns):
+        sector, symbol = panel.pairs[row]
+        trade = {
+            "trade_id": f"BT-{i + 1}",
+            "symbol": symbol,
+            "display_symbol": symbol.replace(".NS", ""),
+            "sector": sector,
+            "entry_time": panel.days[col],
+            "entry_price": entry,
+            "quantity": qty,
+            "stop_loss": stop,
+            "target_price": target_price,
+            "risk_reward_ratio": rr,
+            "status": "OPEN",
+            "exit_price": None,
+            "exit_time": None,
+            "exit_reason": None,
+            "pnl": None,
+            "pnl_percent": None,
+            "bars_held": None,
+        }
+        if exit_at >= 0:
+            trade.update(
+                status="CLOSED",
+                exit_price=price,
+                exit_time=panel.days[exit_at],
+                exit_reason="STOP_LOSS_HIT" if stopped else "TARGET_HIT",
+                pnl=round((price - entry) * qty, 2),
+                pnl_percent=round((price - entry) / entry * 100, 2),
+                bars_held=exit_at - col,
+            )
+        trades.append(trade)
+
+    stats = TradeStats()
+    for i in _close_order(exits).tolist():
+        stats.add(trades[i])       # in close order, for the drawdown
+    open_count = len(trades) - stats.count
+
+    return {
+        "summary": {
+            **stats.summary(open_count),
+            "setups": t["setups"],
+            "qualified": len(trades),
+        },
+        "daily_pnl": stats.daily.series(),
+        "trades": trades,
+    }
+
+
+def score(panel: Panel, prepared: dict, config: dict, capital: float | None = None,
+          start: str | None = None, end: str | None = None, rules: dict | None = None) -> dict:
+    """
+    The headline numbers of simulate()'s summary (same definitions as
+    TradeStats), computed on the trade arrays without building the trades.
+    """
+    if capital is None:
+        capital = config["capital_available"] or DEFAULT_CAPITAL
+    t = _trades(panel, prepared, config, capital, {**RULES, **(rules or {})}, _window(panel, start, end))
+    order = _close_order(t["exit"])
+    pnl = np.round((t["exit_price"][order] - t["entry"][order]) * t["quantity"][order], 2)
+    count = len(pnl)
+    result = {
+        "total_trades": count,
+        "open_trades": len(t["exit"]) - count,
+        "setups": t["setups"],
+        "wins": 0,
+        "win_rate": 0,
+        "total_pnl": 0,
+        "avg_pnl": 0,
+        "sharpe_ratio": 0,
+        "max_drawdown": 0,
+    }
+    if not count:
+        return result
+
+    cumulative = np.cumsum(pnl)
+    peak = np.maximum.accumulate(np.maximum(cumulative, 0))
+    avg = float(pnl.mean())
+    std = float(pnl.std(ddof=1)) if count > 1 else 1
+    wins = int(np.count_nonzero(pnl > 0))
+    result.update(
+        wins=wins,
+        win_rate=round(wins / count * 100, 1),
+        total_pnl=round(float(pnl.sum()), 2),
+        avg_pnl=round(avg, 2),
+        sharpe_ratio=round(avg / std, 2) if std > 0 else 0,
+        max_drawdown=round(float((peak - cumulative).max()), 2),
+    )
+    return result
+
+
+def _history(symbol: str, period: str) -> Bars | None:
+    """Daily bars of one symbol over `period`, downloaded at most once a day."""
+    today = datetime.now(IST).date()
+    with _cache_lock:
+        cached = _cache.get((symbol, period))
+    if cached is not None and cached[0] == today:
+        return cached[1]
+    try:
+        hist = agent_engine._download(symbol, period)
+    except Exception as e:
+        print(f"[Backtest] Could not download {symbol}: {e}")
+        return None
+    if hist is None or not len(hist):
+        return None
+    bars = hist if isinstance(hist, Bars) else Bars.from_frame(hist, np.float64)
+    with _cache_lock:
+        _cache[(symbol, period)] = (today, bars)
+    return bars
+
+
+async def _load(symbols: list, period: str) -> dict:
+    bars = await asyncio.gather(*(run_blocking(_history, symbol, period) for symbol in symbols))
+    return dict(zip(symbols, bars))
+
+
+def load(pairs: list, period: str = "5y") -> Panel:
+    """Panel of the (sector, symbol) pairs' daily bars, downloaded concurrently."""
+    if period not in PERIODS:
+        raise ValueError(f"period must be one of {PERIODS}")
+    return Panel(pairs, asyncio.run(_load([symbol for _, symbol in pairs], period)))
+
+
+def run(config: dict, period: str = "5y", lookback: int = LOOKBACK, capital: float | None = None,
+        start: str | None = None, end: str | None = None, symbols: list | None = None) -> dict:
+    """
+    Backtest a config over its universe (or the given symbols of it):
+    download `period` of daily bars, then prepare and simulate.
+    """
+    started = time.perf_counter()
+    pairs = agent_engine.universe(config)
+    if symbols:
+        wanted = set(symbols)
+        pairs = [(sector, symbol) for sector, symbol in pairs if symbol in wanted]
+    panel = load(pairs, period)
+    loaded = time.perf_counter()
+    result = simulate(panel, prepare(panel, lookback), config, capital, start, end)
+    finished = time.perf_counter()
+
+    trades = result["trades"]
+    result["trades"] = trades[-TRADE_LIMIT:]
+    result["run"] = {
+        "period": period,
+        "lookback": lookback,
+        "capital": capital if capital is not None else (config["capital_available"] or DEFAULT_CAPITAL),
+        "start": start or (panel.days[0] if panel.days else None),
+        "end": end or (panel.days[-1] if panel.days else None),
+        "symbols": len(panel.pairs),
+        "missing_symbols": [symbol for _, symbol in pairs if symbol not in {s for _, s in panel.pairs}],
+        "bars": panel.shape[1],
+        "trades_total": len(trades),
+        "load_seconds": round(loaded - started, 3),
+        "simulate_seconds": round(finished - loaded, 3),
+    }
+    return result
+
+
+def clear_cache():
+    with _cache_lock:
+        _cache.clear()
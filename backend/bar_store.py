@@ -0,0 +1,162 @@
+"""
+AI Market Intelligence Agent — Compact Bar Store
+
+OHLCV history as contiguous NumPy arrays instead of one pandas DataFrame
+per symbol (seven float64 columns plus a datetime index, of which the
+engine only needs the last row of indicators).
+
+  Bars      one symbol's bars: int64 epoch-second times and one array per
+            field; slicing returns zero-copy views.
+  BarStore  fixed-capacity (symbols × WINDOW) arrays allocated once, so a
+            whole-universe scan reuses the same memory every cycle.
+
+Prices and volume use BAR_DTYPE (float32 by default, float64 on request).
+float32 keeps ~7 significant digits: ample for prices at 0.01 and for
+volume-average comparisons, while halving the footprint.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+FIELDS = ("open", "high", "low", "close", "volume")
+
+DTYPE = np.dtype(os.getenv("BAR_DTYPE", "float32"))
+WINDOW = 64          # bars kept per symbol (indicators need 26)
+CAPACITY = 2048      # symbols held by the default store
+
+
+class Bars:
+    """One symbol's OHLCV bars, oldest first, as parallel NumPy arrays."""
+
+    __slots__ = ("time",) + FIELDS
+
+    def __init__(self, time: np.ndarray, open: np.ndarray, high: np.ndarray,
+                 low: np.ndarray, close: np.ndarray, volume: np.ndarray):
+        self.time = time
+        self.open = open
+        self.high = high
+        self.low = low
+        self.close = close
+        self.volume = volume
+
+    @classmethod
+    def from_frame(cls, frame, dtype=None) -> "Bars":
+        """
+        Convert a yfinance-style DataFrame (Open/High/Low/Close/Volume
+        columns on a DatetimeIndex).
+        """
+        dtype = np.dtype(dtype or DTYPE)
+        # .values is naive UTC datetime64 for tz-aware indexes too, on every pandas version
+        stamps = np.asarray(frame.index.values)
+        if stamps.dtype.kind != "M":
+            raise TypeError(f"Bars need a DatetimeIndex, not {type(frame.index).__name__}")
+        time = stamps.astype("datetime64[s]").astype(np.int64)
+        return cls(time, *(
+            frame[name.capitalize()].to_numpy(dtype=dtype) for name in FIELDS
+        ))
+
+    def __len__(self) -> int:
+        return len(self.close)
+
+    def __getitem__(self, key: slice) -> "Bars":
+        """Zero-copy view of a range of bars."""
+        if not isinstance(key, slice):
+            raise TypeError("Bars only support slicing")
+        return Bars(self.time[key], *(getattr(self, name)[key] for name in FIELDS))
+
+    def copy(self) -> "Bars":
+        return Bars(self.time.copy(), *(getattr(self, name).copy() for name in FIELDS))
+
+    def tail(self, n: int) -> "Bars":
+        return self[max(len(self) - n, 0):]
+
+    def append(self, newer: "Bars") -> "Bars":
+        """
+        These bars followed by `newer` (a copy); bars at or after newer's
+        first time are replaced by it, so a re-fetched last bar updates.
+        """
+        if not len(newer):
+            return self
+        keep = int(np.searchsorted(self.time, newer.time[0], side="left"))
+        return Bars(
+            np.concatenate([self.time[:keep], newer.time]),
+            *(np.concatenate([getattr(self, name)[:keep], getattr(newer, name).astype(getattr(self, name).dtype)])
+              for name in FIELDS),
+        )
+
+    @property
+    def nbytes(self) -> int:
+        return self.time.nbytes + sum(getattr(self, name).nbytes for name in FIELDS)
+
+
+class BarStore:
+    """
+    The latest WINDOW bars of up to `capacity` symbols in preallocated
+    (capacity × window) arrays.  put() copies a symbol's bars into its
+    row (the least recently stored symbol gives up its row when full);
+    get() returns Bars views into the row.  Once a row has been given up,
+    another thread may still be reading a view of it, so from then on
+    put() and get() return copies instead.
+    """
+
+    def __init__(self, capacity: int = CAPACITY, window: int = WINDOW, dtype=None):
+        self.capacity = capacity
+        self.window = window
+        self.dtype = np.dtype(dtype or DTYPE)
+        self._time = np.zeros((capacity, window), dtype=np.int64)
+        self._fields = {name: np.zeros((capacity, window), dtype=self.dtype) for name in FIELDS}
+        self._length = np.zeros(capacity, dtype=np.int32)
+        self._rows = OrderedDict()     # symbol → row, least recently stored first
+        self._evicting = False         # a row has been (or will be) reused for another symbol
+        self._lock = threading.Lock()
+
+    def put(self, symbol: str, bars: Bars) -> Bars:
+        """Store the newest `window` bars of a symbol; returns the stored view."""
+        bars = bars.tail(self.window)
+        n = len(bars)
+        with self._lock:
+            row = self._rows.pop(symbol, None)
+            if row is None:
+                if len(self._rows) < self.capacity:
+                    row = len(self._rows)
+                else:
+                    _, row = self._rows.popitem(last=False)
+                    self._evicting = True
+            self._rows[symbol] = row
+            self._time[row, :n] = bars.time
+            for name in FIELDS:
+                self._fields[name][row, :n] = getattr(bars, name)
+            self._length[row] = n
+            return self._view(row, n)
+
+    def get(self, symbol: str) -> Bars | None:
+        with self._lock:
+            row = self._rows.get(symbol)
+            if row is None:
+                return None
+            return self._view(row, int(self._length[row]))
+
+    def _view(self, row: int, n: int) -> Bars:
+        view = Bars(self._time[row, :n], *(self._fields[name][row, :n] for name in FIELDS))
+        return view.copy() if self._evicting else view
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self._rows
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def clear(self):
+        with self._lock:
+            if self._rows:
+                self._evicting = True      # views of the old rows may still be held
+            self._rows.clear()
+            self._length[:] = 0
+
+    @property
+    def nbytes(self) -> int:
+        """Fixed memory footprint of the store's arrays."""
+        return self._time.nbytes + self._length.nbytes + sum(a.nbytes for a in self._fields.values())
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Backtest Engine Benchmark — vectorized replay vs per-bar scans
+
+Backtests the default config on synthetic daily bars (--years × 252
+bars for --symbols symbols, some listing late) with backtest_engine, and
+replays the same days through the scalar engine: agent_engine.analyze()
+on each symbol's trailing window and a ProfileScan per day, with exits
+found by walking forward bar by bar.  Checks that both produce the same
+trades.
+
+  python bench_backtest.py
+  python bench_backtest.py --years 10 --symbols 60
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+import agent_config
+import agent_engine
+import backtest_engine
+from bar_store import Bars
+
+
+def make_history(pairs: list, bars: int, seed: int = 11) -> dict:
+    rng = np.random.default_rng(seed)
+    start = 1_500_000_000 - 1_500_000_000 % 86400
+    history = {}
+    for i, (_, symbol) in enumerate(pairs):
+        skip = int(rng.integers(0, bars // 3)) if i % 5 == 4 else 0   # listed later
+        n = bars - skip
+        close = rng.uniform(50, 3000) * np.exp(np.cumsum(rng.normal(0.0004, 0.018, n)))
+        open = close * np.exp(rng.normal(0, 0.006, n))
+        high = np.maximum(open, close) * (1 + rng.uniform(0, 0.015, n))
+        low = np.minimum(open, close) * (1 - rng.uniform(0, 0.015, n))
+        history[symbol] = Bars(
+            (np.arange(skip, bars, dtype=np.int64)) * 86400 + start,
+            open, high, low, close, rng.integers(10_000, 5_000_000, n).astype(float),
+        )
+    return history
+
+
+def scalar_replay(panel, history: dict, config: dict, lookback: int) -> list:
+    """(symbol, entry day, entry, stop, target, exit day, exit price) per trade (ranked within a day)."""
+    trades = []
+    for t, day_time in enumerate(panel.time):
+        scan = agent_engine.ProfileScan(config)
+        scan.pairs = panel.pairs
+        analyses = {}
+        for _, symbol in panel.pairs:
+            bars = history[symbol]
+            end = int(np.searchsorted(bars.time, day_time, side="right"))
+            window = bars[end - lookback:end] if end >= lookback and bars.time[end - 1] == day_time else None
+            analyses[symbol] = agent_engine.analyze(window)
+        scan.advance(analyses)
+        for signal in scan.result():
+            if signal.signal_status == "QUALIFIED":
+                trades.append((signal.ticker, t, signal.entry_price, signal.stop_loss, signal.target_price))
+
+    replayed = []
+    for symbol, t, entry, stop, target in trades:
+        row = [s for _, s in panel.pairs].index(symbol)
+        exit_day, price = None, None
+        for k in range(t + 1, panel.shape[1]):
+            low, high, open = panel.low[row, k], panel.high[row, k], panel.open[row, k]
+            if low <= stop or high >= target:
+                exit_day = k
+                if open <= stop or open >= target:
+                    price = open
+                else:
+                    price = stop if low <= stop else target
+                break
+        replayed.append((symbol, t, entry, stop, target, exit_day,
+                         None if price is None else round(float(price), 2)))
+    return replayed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the vectorized backtest engine")
+    parser.add_argument("--years", type=float, default=5)
+    parser.add_argument("--symbols", type=int, default=60)
+    parser.add_argument("--lookback", type=int, default=backtest_engine.LOOKBACK)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--no-check", action="store_true", help="skip the (slow) scalar replay")
+    args = parser.parse_args()
+
+    config = agent_config.with_overrides({"max_trades_per_day": 5})
+    config["capital_available"] = 1_000_000
+    pairs = agent_engine.universe(config)
+    while len(pairs) < args.symbols:
+        pairs += [(sector, f"{symbol[:-3]}{len(pairs)}.NS") for sector, symbol in pairs]
+    pairs = pairs[:args.symbols]
+    history = make_history(pairs, int(args.years * 252))
+
+    times = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        panel = backtest_engine.Panel(pairs, history)
+        prepared = backtest_engine.prepare(panel, args.lookback)
+        result = backtest_engine.simulate(panel, prepared, config)
+        times.append(time.perf_counter() - start)
+
+    summary = result["summary"]
+    print(f"{panel.shape[0]} symbols × {panel.shape[1]} bars: {summary['setups']} setups, "
+          f"{summary['qualified']} trades ({summary['open_trades']} open), win rate {summary['win_rate']}%")
+    print(f"  vectorized backtest  {min(times) * 1000:8.1f} ms")
+
+    if not args.no_check:
+        start = time.perf_counter()
+        expected = scalar_replay(panel, history, config, args.lookback)
+        scalar = time.perf_counter() - start
+        days = {d: i for i, d in enumerate(panel.days)}
+        got = [(t["symbol"], days[t["entry_time"]], t["entry_price"], t["stop_loss"], t["target_price"],
+                days.get(t["exit_time"]), t["exit_price"]) for t in result["trades"]]
+        print(f"  per-bar scalar scans {scalar * 1000:8.1f} ms  ({scalar / min(times):.0f}x slower)")
+        assert sorted(got) == sorted(expected), f"trades differ: {len(got)} vs {len(expected)}"
+        print(f"  {len(got)} trades identical to the scalar replay")
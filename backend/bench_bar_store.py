@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Bar Store Benchmark — per-symbol DataFrames vs BarStore
+
+Holds the same synthetic daily history for a whole universe as one
+yfinance-shaped DataFrame per symbol (float64 OHLCV + Dividends/Splits,
+datetime index) and in a BarStore, then reports memory and the time to
+compute every symbol's indicators from each.
+
+  python bench_bar_store.py --symbols 2000 --bars 60
+  python bench_bar_store.py --symbols 2000 --dtype float64
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+import agent_engine
+from bar_store import Bars, BarStore
+
+
+def make_frames(symbols: int, bars: int, seed: int = 7) -> dict:
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range(end=pd.Timestamp.now().normalize(), periods=bars, tz="Asia/Kolkata")
+    frames = {}
+    for i in range(symbols):
+        close = rng.uniform(50, 3000) * np.exp(np.cumsum(rng.normal(0, 0.015, bars)))
+        frames[f"SYM{i}.NS"] = pd.DataFrame({
+            "Open": close * rng.uniform(0.99, 1.01, bars),
+            "High": close * 1.01,
+            "Low": close * 0.99,
+            "Close": close,
+            "Volume": rng.integers(10_000, 5_000_000, bars).astype(float),
+            "Dividends": 0.0,
+            "Splits": 0.0,
+        }, index=index)
+    return frames
+
+
+def frame_indicators(hist: pd.DataFrame) -> dict:
+    """The pre-BarStore pandas indicator pipeline (same maths as the engine)."""
+    close, high, low, volume = hist["Close"], hist["High"], hist["Low"], hist["Volume"]
+    ema9 = close.ewm(span=9, adjust=False).mean()
+    ema21 = close.ewm(span=21, adjust=False).mean()
+    delta = close.diff()
+    gain = delta.where(delta > 0, 0).rolling(14).mean()
+    loss = (-delta.where(delta < 0, 0)).rolling(14).mean()
+    rsi = (100 - (100 / (1 + gain / loss.replace(0, float("nan"))))).fillna(50)
+    tr = pd.concat([high - low, (high - close.shift()).abs(), (low - close.shift()).abs()], axis=1).max(axis=1)
+    atr = tr.rolling(14).mean()
+    vwap = ((high + low + close) / 3 * volume).cumsum() / volume.cumsum()
+    return {"ema9": ema9.iloc[-1], "ema21": ema21.iloc[-1], "rsi": rsi.iloc[-1],
+            "atr": atr.iloc[-1], "vwap": vwap.iloc[-1]}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the bar store")
+    parser.add_argument("--symbols", type=int, default=2000)
+    parser.add_argument("--bars", type=int, default=60)
+    parser.add_argument("--dtype", default="float32", choices=["float32", "float64"])
+    args = parser.parse_args()
+
+    frames = make_frames(args.symbols, args.bars)
+    frame_bytes = sum(f.memory_usage(index=True, deep=True).sum() for f in frames.values())
+
+    store = BarStore(capacity=args.symbols, window=args.bars, dtype=args.dtype)
+    start = time.perf_counter()
+    for symbol, frame in frames.items():
+        store.put(symbol, Bars.from_frame(frame, args.dtype))
+    load = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for frame in frames.values():
+        frame_indicators(frame)
+    pandas_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for symbol in frames:
+        agent_engine._compute_indicators(store.get(symbol))
+    numpy_time = time.perf_counter() - start
+
+    print(f"{args.symbols} symbols × {args.bars} bars ({args.dtype} store)")
+    print(f"  DataFrames     {frame_bytes / 1e6:8.2f} MB   indicators {pandas_time:6.2f} s")
+    print(f"  BarStore       {store.nbytes / 1e6:8.2f} MB   indicators {numpy_time:6.2f} s   (load {load:.2f} s)")
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Rule Optimizer Benchmark — in-process sweep vs shared-memory process pool
+
+Runs optimizer.optimize() on synthetic daily bars (bench_backtest's
+generator) for a random sample of --combinations parameter sets, once
+in-process and once on a --workers process pool, and checks that both
+rank the same results.  Also reports how many bytes each task would
+pickle if it carried the arrays instead of mapping shared memory.
+
+  python bench_optimizer.py
+  python bench_optimizer.py --combinations 4800 --workers 8
+"""
+
+import argparse
+import pickle
+import time
+
+import agent_config
+import agent_engine
+import backtest_engine
+import optimizer
+from bench_backtest import make_history
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the rule parameter optimizer")
+    parser.add_argument("--years", type=float, default=5)
+    parser.add_argument("--symbols", type=int, default=60)
+    parser.add_argument("--combinations", type=int, default=500)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    config = agent_config.with_overrides({"max_trades_per_day": 5})
+    config["capital_available"] = 1_000_000
+    pairs = agent_engine.universe(config)
+    while len(pairs) < args.symbols:
+        pairs += [(sector, f"{symbol[:-3]}{len(pairs)}.NS") for sector, symbol in pairs]
+    pairs = pairs[:args.symbols]
+    history = make_history(pairs, int(args.years * 252))
+    agent_engine.set_history_source(history.get)
+    symbols = [symbol for _, symbol in pairs]
+
+    def run(workers):
+        backtest_engine.clear_cache()
+        return optimizer.optimize(config, samples=args.combinations, seed=1, symbols=symbols,
+                                  top=args.combinations, min_trades=0, workers=workers)
+
+    start = time.perf_counter()
+    serial = run(1)
+    t_serial = time.perf_counter() - start
+    start = time.perf_counter()
+    pooled = run(args.workers)
+    t_pooled = time.perf_counter() - start
+    assert serial["results"] == pooled["results"], "pooled results differ"
+
+    info = pooled["run"]
+    per_task = len(pickle.dumps(optimizer.combinations(samples=1, seed=1)[0]))
+    print(f"{info['combinations']} combinations over {info['symbols']} symbols × {info['bars']} bars")
+    print(f"  in-process      {t_serial:7.2f} s  ({serial['run']['search_seconds'] / info['combinations'] * 1000:.1f} ms "
+          f"per combination)")
+    print(f"  {args.workers} workers       {t_pooled:7.2f} s  (search {info['search_seconds']:.2f} s, "
+          f"includes spawning the pool)")
+    print(f"  shared arrays   {info['shared_bytes'] / 1e6:7.1f} MB mapped once per worker; "
+          f"{per_task} bytes pickled per task")
+    best = pooled["results"][0]
+    print(f"  best Sharpe     {best['sharpe_ratio']} ({best['total_trades']} trades, "
+          f"win rate {best['win_rate']}%) vs baseline {pooled['baseline']['sharpe_ratio']}")
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Agent Profiles Benchmark — one scan per profile vs one shared data pass
+
+Scans the configured universe for N agent profiles (different sectors,
+risk and targets) twice: as N independent scan_markets() runs, and as
+one scan_pipeline.scan_profiles() pass that fetches and analyses each
+symbol once.  History comes from synthetic bars; --fetch-ms adds a
+per-download delay to stand in for the network.  Also checks that every
+profile gets the same signals either way.
+
+  python bench_profiles.py --profiles 5
+  python bench_profiles.py --profiles 5 --fetch-ms 20
+"""
+
+import argparse
+import asyncio
+import time
+
+import numpy as np
+
+import agent_config
+import agent_engine
+import scan_pipeline
+from bar_store import Bars
+
+SECTOR_SETS = [
+    ["NIFTY50", "BANKNIFTY", "IT", "PHARMA", "AUTO", "FMCG", "ENERGY", "METAL"],
+    ["IT", "NIFTY50"],
+    ["BANKNIFTY", "ENERGY", "METAL"],
+    ["PHARMA", "FMCG", "AUTO"],
+    ["METAL", "IT", "BANKNIFTY", "NIFTY50"],
+]
+
+
+def make_bars(symbols: list, bars: int, seed: int = 7) -> dict:
+    rng = np.random.default_rng(seed)
+    history = {}
+    for symbol in symbols:
+        close = rng.uniform(50, 3000) * np.exp(np.cumsum(rng.normal(0.004, 0.012, bars)))
+        history[symbol] = Bars(
+            np.arange(bars, dtype=np.int64) * 86400,
+            close * 0.998, close * 1.01, close * 0.99, close,
+            rng.integers(10_000, 5_000_000, bars).astype(float),
+        )
+    return history
+
+
+def make_profiles(count: int) -> list:
+    profiles = []
+    for i in range(count):
+        config = agent_config.get_config().thaw()
+        config.update(
+            allowed_sectors=SECTOR_SETS[i % len(SECTOR_SETS)],
+            risk_per_trade=1 + i % 3,
+            max_trades_per_day=50,
+            profit_booking_rule={"type": "target_percent", "value": 2 + i % 4},
+            stop_loss_rule={"type": "fixed_percent", "value": 1 + 0.5 * (i % 3)},
+            capital_available=5_000_000,
+        )
+        profiles.append(config)
+    return profiles
+
+
+def signatures(signals: list) -> list:
+    return [(s.ticker, s.signal_status, s.entry_price, s.stop_loss, s.target_price) for s in signals]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark shared-pass agent profiles")
+    parser.add_argument("--profiles", type=int, default=5)
+    parser.add_argument("--bars", type=int, default=30)
+    parser.add_argument("--fetch-ms", type=float, default=0.0)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    profiles = make_profiles(args.profiles)
+    history = make_bars(agent_engine.shared_universe(profiles), args.bars)
+
+    def source(symbol):
+        if args.fetch_ms:
+            time.sleep(args.fetch_ms / 1000)
+        return history[symbol]
+
+    agent_engine.set_history_source(source)
+
+    def separate():
+        return [agent_engine.scan_markets(config) for config in profiles]
+
+    def shared(count=len(profiles)):
+        scans = [agent_engine.ProfileScan(config, f"p{i}") for i, config in enumerate(profiles[:count])]
+        asyncio.run(scan_pipeline.scan_profiles(scans, scan_pipeline.CycleMetrics()))
+        return [scan.result() for scan in scans]
+
+    def best(fn, *fn_args):
+        times = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            result = fn(*fn_args)
+            times.append(time.perf_counter() - start)
+        return min(times), result
+
+    t_separate, a = best(separate)
+    t_shared, b = best(shared)
+    t_one, _ = best(shared, 1)
+    assert [signatures(x) for x in a] == [signatures(x) for x in b], "profile results differ"
+
+    symbols = len(history)
+    print(f"{args.profiles} profiles over {symbols} symbols "
+          f"({sum(map(len, a))} signals, fetch {args.fetch_ms:g} ms)")
+    print(f"  separate scans    {t_separate * 1000:8.1f} ms")
+    print(f"  shared data pass  {t_shared * 1000:8.1f} ms  ({t_separate / t_shared:.1f}x faster)")
+    if args.profiles > 1:
+        extra = (t_shared - t_one) / (args.profiles - 1)
+        print(f"  one profile       {t_one * 1000:8.1f} ms;  each extra profile +{extra * 1000:.2f} ms "
+              f"({extra / t_one:.0%} of a full scan)")
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Signal Record Benchmark — nested dicts vs SignalRecord
+
+Builds the same synthetic signals in the old layout (engine dict with
+nested indicators / trend / rule_checks dicts, copied into a log entry
+dict) and as SignalRecords, and reports retained memory (tracemalloc)
+and build / to_dict() times.
+
+  python bench_signal_record.py --signals 200000
+"""
+
+import argparse
+import gc
+import random
+import time
+import tracemalloc
+import uuid
+from datetime import datetime
+
+from signal_record import RULE_CHECKS, TREND_FLAGS, SignalRecord, pack_flags
+
+SECTORS = ["NIFTY50", "BANKNIFTY", "IT", "PHARMA", "AUTO", "FMCG", "ENERGY", "METAL"]
+TICKERS = [f"SYM{i}.NS" for i in range(2000)]
+
+
+def make_fields(n: int, seed: int = 7) -> list:
+    """n tuples of raw scan values (what scan_markets computes per symbol)."""
+    rng = random.Random(seed)
+    rows = []
+    for _ in range(n):
+        entry = round(rng.uniform(100, 3000), 2)
+        checks = {name: rng.random() < 0.9 for name in RULE_CHECKS}
+        trend = {name: rng.random() < 0.7 for name in TREND_FLAGS}
+        rows.append((
+            "QUALIFIED" if all(checks.values()) else "REJECTED",
+            rng.choice(TICKERS), rng.choice(SECTORS),
+            entry, round(entry * 0.98, 2), round(entry * 1.03, 2), round(rng.uniform(1, 3), 2),
+            checks, trend, sum(trend.values()),
+            [round(entry * rng.uniform(0.95, 1.05), 2) for _ in range(5)], rng.randint(10_000, 5_000_000),
+        ))
+    return rows
+
+
+def _rationale(rr: float) -> str:
+    return f"Bullish EMA crossover detected (EMA9 > EMA21). RSI at 55.0, within 40-70 range. R:R ratio = {rr}."
+
+
+def build_dicts(rows: list) -> list:
+    """The pre-SignalRecord layout: engine dict, then agent_log's enriched copy."""
+    log = []
+    for status, ticker, sector, entry, sl, target, rr, checks, trend, score, ind, volume in rows:
+        signal = {
+            "signal_status": status,
+            "symbol": ticker.replace(".NS", ""),
+            "ticker": ticker,
+            "sector": sector,
+            "entry_price": entry,
+            "stop_loss": sl,
+            "target_price": target,
+            "risk_reward_ratio": rr,
+            "rule_checks": dict(checks),
+            "execution_instruction": "NONE",
+            "rationale": _rationale(rr),
+            "indicators": {
+                "ema9": ind[0], "ema21": ind[1], "rsi": ind[2], "atr": ind[3], "vwap": ind[4],
+                "volume": volume,
+            },
+            "trend": {"score": score, **trend},
+        }
+        log.append({
+            "id": str(uuid.uuid4())[:8],
+            "timestamp": datetime.now().isoformat(),
+            "user_action": None,
+            **signal,
+        })
+    return log
+
+
+def build_records(rows: list) -> list:
+    log = []
+    for status, ticker, sector, entry, sl, target, rr, checks, trend, score, ind, volume in rows:
+        record = SignalRecord(
+            status, ticker, sector, entry, sl, target, rr,
+            checks=pack_flags(checks, RULE_CHECKS),
+            execution_instruction="NONE",
+            rationale=_rationale(rr),
+            ema9=ind[0], ema21=ind[1], rsi=ind[2], atr=ind[3], vwap=ind[4], volume=volume,
+            trend_score=score,
+            trend_flags=pack_flags(trend, TREND_FLAGS),
+        )
+        record.id = str(uuid.uuid4())[:8]
+        record.timestamp = datetime.now().isoformat()
+        log.append(record)
+    return log
+
+
+def measure(name: str, build, rows: list):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    log = build(rows)
+    elapsed = time.perf_counter() - start
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"  {name:<14} {retained / 1e6:9.1f} MB  {retained / len(rows):7.0f} B/signal  build {elapsed:6.2f} s")
+    return log, retained
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark signal record memory")
+    parser.add_argument("--signals", type=int, default=200_000)
+    args = parser.parse_args()
+
+    rows = make_fields(args.signals)
+    print(f"{args.signals} signals (retained memory, tracemalloc)")
+    dicts, dict_bytes = measure("nested dicts", build_dicts, rows)
+    del dicts
+    records, record_bytes = measure("SignalRecord", build_records, rows)
+    print(f"  saving         {(1 - record_bytes / dict_bytes) * 100:9.1f} %")
+
+    sample = records[:10_000]
+    start = time.perf_counter()
+    for record in sample:
+        record.to_dict()
+    print(f"  to_dict()      {(time.perf_counter() - start) / len(sample) * 1e6:9.1f} µs/signal (API boundary)")
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Trade Store Benchmark — JSON vs SQLite vs journal backends
+
+Seeds each backend with the same synthetic history and times the public
+trade_store operations the app and scheduler call.
+
+  python bench_trade_store.py --trades 100000 --ops 20
+  python bench_trade_store.py --trades 100000 --concurrent 8 --seconds 5
+
+--archive rolls settled history into the trade archive first, so the
+hot partition holds only open trades (history queries then read archives).
+
+--concurrent N runs N API-style reader threads against one writer thread
+(save + close in a loop) and reports reader latency and throughput.
+"""
+
+import argparse
+import json
+import random
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+import trade_db
+import trade_journal
+import trade_store
+
+SECTORS = ["NIFTY50", "BANKNIFTY", "IT", "PHARMA", "AUTO", "FMCG", "ENERGY", "METAL"]
+
+
+def make_history(n: int, open_count: int = 5, seed: int = 7) -> list:
+    """n synthetic trades spread over the last ~3 years, the newest `open_count` still OPEN."""
+    rng = random.Random(seed)
+    now = datetime.now()
+    trades = []
+    for i in range(n):
+        entry_time = now - timedelta(minutes=(n - i) * 15)
+        entry = round(rng.uniform(100, 3000), 2)
+        qty = rng.randint(1, 50)
+        trade = {
+            "trade_id": f"{i:08x}",
+            "signal_id": f"s{i}",
+            "symbol": "TCS.NS",
+            "display_symbol": "TCS",
+            "sector": rng.choice(SECTORS),
+            "entry_price": entry,
+            "quantity": qty,
+            "stop_loss": round(entry * 0.985, 2),
+            "target_price": round(entry * 1.03, 2),
+            "trading_mode": "PAPER",
+            "entry_time": entry_time.isoformat(),
+            "status": "OPEN",
+            "exit_price": None, "exit_time": None, "exit_reason": None,
+            "pnl": None, "pnl_percent": None,
+        }
+        if i < n - open_count:
+            exit_price = round(entry * (1 + rng.gauss(0.002, 0.015)), 2)
+            trade.update({
+                "status": "CLOSED",
+                "exit_price": exit_price,
+                "exit_time": (entry_time + timedelta(minutes=10)).isoformat(),
+                "exit_reason": "TARGET_HIT" if exit_price > entry else "STOP_LOSS_HIT",
+                "pnl": round((exit_price - entry) * qty, 2),
+                "pnl_percent": round((exit_price - entry) / entry * 100, 2),
+            })
+        trades.append(trade)
+    return trades
+
+
+def _time(fn, repeat: int) -> float:
+    """Mean milliseconds per call."""
+    start = time.perf_counter()
+    for i in range(repeat):
+        fn(i)
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def bench_backend(backend: str, history: list, ops: int, archive: bool = False) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        trade_store.configure(data_dir=tmp, backend=backend)
+
+        start = time.perf_counter()
+        _seed(backend, history)
+        seed_s = time.perf_counter() - start
+
+        # First call loads the in-memory index from the backend
+        start = time.perf_counter()
+        trade_store.get_today_trade_count()
+        load_s = time.perf_counter() - start
+
+        roll_s = 0.0
+        if archive:
+            start = time.perf_counter()
+            trade_store.roll_over()
+            roll_s = time.perf_counter() - start
+            trade_store.configure(data_dir=tmp)
+            start = time.perf_counter()
+            trade_store.get_today_trade_count()
+            load_s = time.perf_counter() - start
+
+        saved = []
+
+        def save(i):
+            saved.append(trade_store.save_trade({
+                "symbol": "INFY.NS", "sector": "IT", "entry_price": 1500.0, "quantity": 2,
+                "stop_loss": 1480.0, "target_price": 1550.0,
+            }))
+
+        results = {"seed (s)": seed_s, "roll over (s)": roll_s, "load index (s)": load_s}
+        results["save_trade"] = _time(save, ops)
+        results["update_trade"] = _time(lambda i: trade_store.update_trade(saved[i]["trade_id"], {"note": i}), ops)
+        results["close_trade"] = _time(lambda i: trade_store.close_trade(saved[i]["trade_id"], 1520.0, "BENCH"), ops)
+        results["get_open_trades"] = _time(lambda i: trade_store.get_open_trades(), ops)
+        results["get_today_trade_count"] = _time(lambda i: trade_store.get_today_trade_count(), ops)
+        results["get_all_trades(100)"] = _time(lambda i: trade_store.get_all_trades(100), ops)
+        results["get_closed_trades(100)"] = _time(lambda i: trade_store.get_closed_trades(100), ops)
+        pages = {}
+
+        def page(i):
+            trades, pages["cursor"] = trade_store.get_trades_page(pages.get("cursor"), 100, sector="IT")
+
+        results["get_trades_page(100, sector)"] = _time(page, ops)
+        results["get_trades_by_date_range(7)"] = _time(lambda i: trade_store.get_trades_by_date_range(7), ops)
+        week_ago = (datetime.now() - timedelta(days=7)).strftime("%Y-%m-%d")
+        results["get_window_stats(7d)"] = _time(lambda i: trade_store.get_window_stats(week_ago), ops)
+        results["get_daily_pnl(all)"] = _time(lambda i: trade_store.get_daily_pnl(), ops)
+        results["get_trades_summary"] = _time(lambda i: trade_store.get_trades_summary(), max(1, ops // 4))
+    return results
+
+
+def _seed(backend: str, history: list):
+    if backend == "json":
+        with open(trade_store.TRADES_FILE, "w") as f:
+            json.dump(history, f, indent=2)
+    elif backend == "journal":
+        trade_journal.write_snapshot(history, 0)
+    else:
+        trade_db.upsert_trades(history)
+
+
+def bench_concurrent(backend: str, history: list, readers: int, seconds: float,
+                     think_ms: float = 1.0) -> dict:
+    """
+    Reader latency/throughput while a writer saves and closes trades
+    continuously.  Each reader pauses `think_ms` between requests, like an
+    API thread serving clients.
+    """
+    reads = [
+        lambda: trade_store.get_trades_summary(),
+        lambda: trade_store.get_all_trades(100),
+        lambda: trade_store.get_open_trades(),
+        lambda: trade_store.get_closed_trades(50),
+        lambda: trade_store.get_today_trade_count(),
+    ]
+    with tempfile.TemporaryDirectory() as tmp:
+        trade_store.configure(data_dir=tmp, backend=backend)
+        _seed(backend, history)
+        trade_store.get_today_trade_count()
+
+        stop = threading.Event()
+        latencies = [[] for _ in range(readers)]
+        writes = [0]
+
+        def writer():
+            while not stop.is_set():
+                trade = trade_store.save_trade({
+                    "symbol": "INFY.NS", "sector": "IT", "entry_price": 1500.0, "quantity": 2,
+                    "stop_loss": 1480.0, "target_price": 1550.0,
+                })
+                trade_store.close_trade(trade["trade_id"], 1520.0, "BENCH")
+                writes[0] += 2
+
+        def reader(n):
+            out = latencies[n]
+            i = n
+            while not stop.is_set():
+                start = time.perf_counter()
+                reads[i % len(reads)]()
+                out.append(time.perf_counter() - start)
+                i += 1
+                time.sleep(think_ms / 1000)
+
+        threads = [threading.Thread(target=writer)] + [
+            threading.Thread(target=reader, args=(n,)) for n in range(readers)
+        ]
+        for t in threads:
+            t.start()
+        time.sleep(seconds)
+        stop.set()
+        for t in threads:
+            t.join()
+
+    lat = sorted(x for per in latencies for x in per)
+    return {
+        "reads/s": len(lat) / seconds,
+        "writes/s": writes[0] / seconds,
+        "read p50 (ms)": lat[len(lat) // 2] * 1000 if lat else 0,
+        "read p99 (ms)": lat[int(len(lat) * 0.99)] * 1000 if lat else 0,
+        "read p99.9 (ms)": lat[int(len(lat) * 0.999)] * 1000 if lat else 0,
+        "read max (ms)": lat[-1] * 1000 if lat else 0,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark trade_store backends")
+    parser.add_argument("--trades", type=int, default=100_000)
+    parser.add_argument("--ops", type=int, default=20, help="calls per timed operation")
+    parser.add_argument("--backends", default="json,sqlite,journal")
+    parser.add_argument("--archive", action="store_true", help="roll settled trades into the archive first")
+    parser.add_argument("--concurrent", type=int, default=0, help="reader threads (concurrent mode)")
+    parser.add_argument("--seconds", type=float, default=5.0, help="concurrent mode duration")
+    parser.add_argument("--think-ms", type=float, default=1.0, help="concurrent mode reader pause")
+    args = parser.parse_args()
+
+    history = make_history(args.trades)
+    backends = args.backends.split(",")
+    if args.concurrent:
+        table = {b: bench_concurrent(b, history, args.concurrent, args.seconds, args.think_ms) for b in backends}
+        title = f"{args.concurrent} readers + 1 writer for {args.seconds:g}s"
+    else:
+        table = {b: bench_backend(b, history, args.ops, args.archive) for b in backends}
+        title = f"{args.ops} ops each (ms/op)"
+
+    print("=" * 72)
+    print(f"TRADE STORE BENCHMARK: {args.trades:,} trades, {title}")
+    print("=" * 72)
+    print(f"{'operation':32}" + "".join(f"{b:>14}" for b in backends))
+    for op in table[backends[0]]:
+        print(f"{op:32}" + "".join(f"{table[b][op]:>14.3f}" for b in backends))
@@ -0,0 +1,314 @@
+"""
+Autonomous Trading Agent — Columnar History Store
+
+Typed, day-partitioned columnar copies of closed trades and logged
+signals for offline analytics.  Every column is a NumPy .npy file, so
+pandas / NumPy can memory-map years of history without parsing JSON:
+
+  data/columnar/<table>/date=YYYY-MM-DD/part-<lo>-<hi>/<column>.npy
+
+Rows are streamed in with append(), buffered, and written as a new part
+on flush() (the scheduler flushes after every cycle; flush_if_due()
+flushes once FLUSH_ROWS rows or FLUSH_SECONDS have built up).  append()
+never writes, so callers can buffer rows while holding their own locks.  Parts are published with an atomic
+directory rename.  Once a day holds more than MAX_PARTS parts they are
+merged into one whose name covers the merged range, and readers skip
+any part whose range lies inside another, so a reader racing a merge
+never sees a row twice.
+
+Closed trades are partitioned by exit day and signals by scan day.  A
+signal is recorded as generated; later user decisions are not
+back-filled.  Enabled with COLUMNAR_EXPORT=true; export_trades()
+(or `python columnar_store.py export-trades`) rebuilds the trades table
+from trade_store at any time.
+"""
+
+import atexit
+import glob
+import os
+import shutil
+import threading
+import time
+
+import numpy as np
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data", "columnar")
+
+ENABLED = os.getenv("COLUMNAR_EXPORT", "false").lower() == "true"
+FLUSH_ROWS = 1000        # flush once this many rows are buffered
+FLUSH_SECONDS = 60       # ... or the oldest buffered row is this old
+MAX_PARTS = 16           # merge a day's parts beyond this many
+
+# Column name → (dtype kind, path into the source dict).  Kinds:
+# "str" (fixed-width unicode), "f8", "i8", "bool", "time" (datetime64[us]).
+TABLES = {
+    "trades": {
+        "partition": ("exit_time",),
+        "columns": {
+            "trade_id": ("str", ("trade_id",)),
+            "signal_id": ("str", ("signal_id",)),
+            "symbol": ("str", ("symbol",)),
+            "sector": ("str", ("sector",)),
+            "trading_mode": ("str", ("trading_mode",)),
+            "exit_reason": ("str", ("exit_reason",)),
+            "entry_time": ("time", ("entry_time",)),
+            "exit_time": ("time", ("exit_time",)),
+            "entry_price": ("f8", ("entry_price",)),
+            "exit_price": ("f8", ("exit_price",)),
+            "quantity": ("i8", ("quantity",)),
+            "stop_loss": ("f8", ("stop_loss",)),
+            "target_price": ("f8", ("target_price",)),
+            "risk_reward_ratio": ("f8", ("risk_reward_ratio",)),
+            "pnl": ("f8", ("pnl",)),
+            "pnl_percent": ("f8", ("pnl_percent",)),
+        },
+    },
+    "signals": {
+        "partition": ("timestamp",),
+        "columns": {
+            "id": ("str", ("id",)),
+            "timestamp": ("time", ("timestamp",)),
+            "ticker": ("str", ("ticker",)),
+            "sector": ("str", ("sector",)),
+            "signal_status": ("str", ("signal_status",)),
+            "execution_instruction": ("str", ("execution_instruction",)),
+            "entry_price": ("f8", ("entry_price",)),
+            "stop_loss": ("f8", ("stop_loss",)),
+            "target_price": ("f8", ("target_price",)),
+            "risk_reward_ratio": ("f8", ("risk_reward_ratio",)),
+            "ema9": ("f8", ("indicators", "ema9")),
+            "ema21": ("f8", ("indicators", "ema21")),
+            "rsi": ("f8", ("indicators", "rsi")),
+            "atr": ("f8", ("indicators", "atr")),
+            "vwap": ("f8", ("indicators", "vwap")),
+            "volume": ("i8", ("indicators", "volume")),
+            "trend_score": ("i8", ("trend", "score")),
+            "bullish_ema": ("bool", ("trend", "bullish_ema")),
+            "rsi_ok": ("bool", ("trend", "rsi_ok")),
+            "above_vwap": ("bool", ("trend", "above_vwap")),
+            "volume_ok": ("bool", ("trend", "volume_ok")),
+            "sector_allowed": ("bool", ("rule_checks", "sector_allowed")),
+            "risk_within_limit": ("bool", ("rule_checks", "risk_within_limit")),
+            "capital_within_limit": ("bool", ("rule_checks", "capital_within_limit")),
+            "trade_count_ok": ("bool", ("rule_checks", "trade_count_ok")),
+            "risk_reward_ok": ("bool", ("rule_checks", "risk_reward_ok")),
+        },
+    },
+}
+
+_lock = threading.Lock()      # guards the buffers and all writes
+_buffers = {table: [] for table in TABLES}
+_oldest = None                # time.time() of the oldest buffered row
+_last_seq = 0
+
+
+def configure(data_dir: str | None = None, enabled: bool | None = None):
+    """Point the store at another directory and/or switch it on (tests, exports)."""
+    global DATA_DIR, ENABLED
+    if data_dir is not None:
+        DATA_DIR = data_dir
+    if enabled is not None:
+        ENABLED = enabled
+
+
+def _next_seq() -> int:
+    """Unique, increasing part sequence number (time-based, survives restarts)."""
+    global _last_seq
+    _last_seq = max(_last_seq + 1, time.time_ns())
+    return _last_seq
+
+
+def _get(row: dict, path: tuple):
+    for key in path:
+        if not hasattr(row, "get"):   # dicts and SignalRecords
+            return None
+        row = row.get(key)
+    return row
+
+
+def _column(kind: str, values: list) -> np.ndarray:
+    if kind == "str":
+        return np.array(["" if v is None else str(v) for v in values], dtype=str)
+    if kind == "f8":
+        return np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+    if kind == "i8":
+        return np.array([0 if v is None else v for v in values], dtype=np.int64)
+    if kind == "bool":
+        return np.array([bool(v) for v in values], dtype=bool)
+    return np.array([v or "NaT" for v in values], dtype="datetime64[us]")
+
+
+# ── Writes ────────────────────────────────────
+
+def append(table: str, rows: list):
+    """Buffer rows for `table` (written by the next flush)."""
+    global _oldest
+    if not ENABLED or not rows:
+        return
+    with _lock:
+        _buffers[table].extend(rows)
+        if _oldest is None:
+            _oldest = time.time()
+
+
+def flush_if_due():
+    """Flush when the buffer is large or old enough."""
+    if not ENABLED:
+        return
+    with _lock:
+        due = _oldest is not None and (
+            sum(len(b) for b in _buffers.values()) >= FLUSH_ROWS or time.time() - _oldest >= FLUSH_SECONDS)
+    if due:
+        flush()
+
+
+def flush():
+    """Write every buffered row as new parts, one per table and day."""
+    global _oldest
+    with _lock:
+        for table, rows in _buffers.items():
+            if not rows:
+                continue
+            _buffers[table] = []
+            try:
+                _write_rows(table, rows)
+            except OSError as e:
+                print(f"[Columnar] Could not write {len(rows)} {table} rows: {e}")
+        _oldest = None
+
+
+def _write_rows(table: str, rows: list):
+    """Split rows by partition day and write one part per day. Caller holds _lock."""
+    spec = TABLES[table]
+    by_day = {}
+    for row in rows:
+        day = (_get(row, spec["partition"]) or "")[:10]
+        if day:
+            by_day.setdefault(day, []).append(row)
+    for day, day_rows in by_day.items():
+        columns = {
+            name: _column(kind, [_get(r, path) for r in day_rows])
+            for name, (kind, path) in spec["columns"].items()
+        }
+        seq = _next_seq()
+        _write_part(table, day, seq, seq, columns)
+        _maybe_merge(table, day)
+
+
+def _day_dir(table: str, day: str) -> str:
+    return os.path.join(DATA_DIR, table, f"date={day}")
+
+
+def _write_part(table: str, day: str, lo: int, hi: int, columns: dict):
+    """Write the columns to a temp directory and publish it with one rename."""
+    final = os.path.join(_day_dir(table, day), f"part-{lo:020d}-{hi:020d}")
+    tmp = final + ".tmp"
+    os.makedirs(tmp, exist_ok=True)
+    for name, values in columns.items():
+        np.save(os.path.join(tmp, f"{name}.npy"), values)
+    os.rename(tmp, final)
+
+
+def _maybe_merge(table: str, day: str):
+    """Merge a day's parts into one once there are more than MAX_PARTS."""
+    parts = _parts(table, day)
+    if len(parts) <= MAX_PARTS:
+        return
+    names = list(TABLES[table]["columns"])
+    merged = {
+        name: np.concatenate([np.load(os.path.join(path, f"{name}.npy")) for _, _, path in parts])
+        for name in names
+    }
+    _write_part(table, day, parts[0][0], parts[-1][1], merged)
+    for _, _, path in parts:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def export_trades(trades: list) -> int:
+    """Rebuild the trades table from scratch from `trades` (closed ones only)."""
+    closed = [t for t in trades if t.get("status") == "CLOSED"]
+    with _lock:
+        shutil.rmtree(os.path.join(DATA_DIR, "trades"), ignore_errors=True)
+        _buffers["trades"] = []
+        _write_rows("trades", closed)
+    return len(closed)
+
+
+# ── Reads ─────────────────────────────────────
+
+def _parts(table: str, day: str) -> list:
+    """(lo, hi, path) of the visible parts of one day partition, oldest first."""
+    found = []
+    for path in glob.glob(os.path.join(_day_dir(table, day), "part-*")):
+        if path.endswith(".tmp"):
+            continue
+        _, lo, hi = os.path.basename(path).split("-")
+        found.append((int(lo), int(hi), path))
+    # Widest range first at each start, then drop parts already covered by a merge
+    found.sort(key=lambda p: (p[0], -p[1]))
+    visible, covered = [], -1
+    for lo, hi, path in found:
+        if hi <= covered:
+            continue
+        visible.append((lo, hi, path))
+        covered = hi
+    return visible
+
+
+def days(table: str) -> list:
+    """Partition days present for `table`, oldest first."""
+    paths = glob.glob(os.path.join(DATA_DIR, table, "date=*"))
+    return sorted(os.path.basename(p)[len("date="):] for p in paths)
+
+
+def iter_parts(table: str, start: str | None = None, end: str | None = None,
+               columns: list | None = None, mmap: bool = True):
+    """
+    Yield one {column: ndarray} dict per part for days between start and
+    end (YYYY-MM-DD, inclusive).  With mmap=True the arrays are read-only
+    memory maps — nothing is loaded until it is touched.
+    """
+    names = columns or list(TABLES[table]["columns"])
+    for day in days(table):
+        if (start and day < start) or (end and day > end):
+            continue
+        for _, _, path in _parts(table, day):
+            try:
+                yield {
+                    name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r" if mmap else None)
+                    for name in names
+                }
+            except FileNotFoundError:
+                continue   # merged away while we were listing
+
+
+def read(table: str, start: str | None = None, end: str | None = None,
+         columns: list | None = None) -> dict:
+    """Concatenated {column: ndarray} for days between start and end (inclusive)."""
+    names = columns or list(TABLES[table]["columns"])
+    parts = list(iter_parts(table, start, end, names))
+    if not parts:
+        return {name: _column(TABLES[table]["columns"][name][0], []) for name in names}
+    return {name: np.concatenate([p[name] for p in parts]) for name in names}
+
+
+def read_frame(table: str, start: str | None = None, end: str | None = None,
+               columns: list | None = None):
+    """read() as a pandas DataFrame."""
+    import pandas as pd
+    return pd.DataFrame(read(table, start, end, columns))
+
+
+atexit.register(flush)
+
+
+if __name__ == "__main__":
+    import sys
+
+    import trade_store
+
+    if sys.argv[1:] == ["export-trades"]:
+        count = export_trades(trade_store.get_all_trades(limit=10**9))
+        print(f"[Columnar] Exported {count} closed trades to {os.path.join(DATA_DIR, 'trades')}")
+    else:
+        print("usage: python columnar_store.py export-trades")
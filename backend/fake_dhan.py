@@ -0,0 +1,397 @@
+"""
+Autonomous Trading Agent — Fake Dhan Broker & Tick Feed
+
+In-process stand-in for the dhanhq client so the scheduler, executor and
+app can be exercised (and load-tested) offline without a real account.
+Responses mirror the dhanhq shape: {"status", "remarks", "data"}.
+
+Latency and failures are injectable per client:
+  latency / jitter   — seconds slept before every call
+  failure_rate       — probability of a {"status": "failure"} response
+  error_rate         — probability of raising ConnectionError
+  reject_rate        — probability that a placed order is REJECTED
+"""
+
+import itertools
+import random
+import threading
+import time
+from datetime import datetime
+
+from auto_executor import SECURITY_IDS
+
+
+# Reverse lookup: Dhan security ID → yfinance ticker
+TICKERS_BY_SECURITY_ID = {sid: ticker for ticker, sid in SECURITY_IDS.items()}
+
+DEFAULT_START_PRICE = 1000.0
+
+
+class TickFeed:
+    """
+    Simulated market feed: a seeded random walk per ticker.
+
+    Call tick() to advance every price by one step, or start() to tick
+    in a background thread every `tick_interval` seconds.  Subscribers
+    receive (ticker, price, timestamp) for every tick.
+    """
+
+    def __init__(self, tickers=None, tick_interval: float = 1.0,
+                 volatility: float = 0.002, seed: int | None = None):
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._prices = {}
+        for ticker in (tickers if tickers is not None else SECURITY_IDS.keys()):
+            self._prices[ticker] = round(self._rng.uniform(100, 3000), 2)
+        self._tick_interval = tick_interval
+        self._volatility = volatility
+        self._subscribers = []
+        self._thread = None
+        self._running = False
+
+    def subscribe(self, callback):
+        """Register callback(ticker, price, timestamp) for every tick."""
+        self._subscribers.append(callback)
+
+    def last_price(self, ticker: str) -> float:
+        with self._lock:
+            if ticker not in self._prices:
+                self._prices[ticker] = DEFAULT_START_PRICE
+            return self._prices[ticker]
+
+    def set_price(self, ticker: str, price: float):
+        """Pin a ticker to a price (e.g. to force a target or stop-loss hit)."""
+        with self._lock:
+            self._prices[ticker] = round(price, 2)
+
+    def tick(self):
+        """Advance every ticker by one random-walk step and notify subscribers."""
+        now = datetime.now().isoformat()
+        with self._lock:
+            for ticker, price in self._prices.items():
+                step = self._rng.gauss(0, self._volatility)
+                self._prices[ticker] = round(max(0.05, price * (1 + step)), 2)
+            snapshot = list(self._prices.items())
+        for callback in self._subscribers:
+            for ticker, price in snapshot:
+                callback(ticker, price, now)
+
+    def history(self, ticker: str, bars: int = 30):
+        """
+        Synthetic daily OHLCV bars ending at the current price, shaped like
+        yfinance's Ticker.history() so agent_engine can consume it directly.
+        """
+        import pandas as pd
+
+        rng = random.Random(f"{ticker}:{bars}")
+        close = self.last_price(ticker)
+        rows = []
+        for _ in range(bars):
+            high = close * (1 + abs(rng.gauss(0, 0.008)))
+            low = close * (1 - abs(rng.gauss(0, 0.008)))
+            open_ = rng.uniform(low, high)
+            rows.append((open_, high, low, close, float(rng.randint(100_000, 5_000_000))))
+            close = close / (1 + rng.gauss(0.001, 0.012))
+        rows.reverse()
+
+        index = pd.bdate_range(end=datetime.now().date(), periods=bars)
+        return pd.DataFrame(rows, index=index, columns=["Open", "High", "Low", "Close", "Volume"])
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+
+    def _loop(self):
+        while self._running:
+            self.tick()
+            time.sleep(self._tick_interval)
+
+
+class FakeDhan:
+    """
+    Drop-in replacement for the dhanhq client methods used by the app:
+    place_order, cancel_order, modify_order, get_fund_limits,
+    get_positions, get_holdings, get_order_list and get_trade_book.
+
+    MARKET orders fill immediately at the feed price; LIMIT orders fill
+    at their limit price.  All state is kept in memory and guarded by a
+    single lock, so the client is safe to share across threads.
+    """
+
+    def __init__(self, feed: TickFeed | None = None, balance: float = 1_000_000.0,
+                 latency: float = 0.0, jitter: float = 0.0,
+                 failure_rate: float = 0.0, error_rate: float = 0.0,
+                 reject_rate: float = 0.0, seed: int | None = None):
+        self.feed = feed or TickFeed(seed=seed)
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.error_rate = error_rate
+        self.reject_rate = reject_rate
+
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._order_ids = itertools.count(1)
+        self._trade_ids = itertools.count(1)
+        self._balance = balance
+        self._utilized = 0.0
+        self._orders = {}       # orderId → order dict
+        self._trades = []       # executed fills
+        self._positions = {}    # (securityId, productType) → position dict
+        self._holdings = {}     # securityId → holding dict
+        self.call_counts = {}
+
+    # ── Injection helpers ─────────────────────
+
+    def _simulate_call(self, name: str) -> dict | None:
+        """Apply latency and failure injection. Returns a failure response or None."""
+        with self._lock:
+            self.call_counts[name] = self.call_counts.get(name, 0) + 1
+            roll = self._rng.random()
+            delay = self.latency + (self._rng.uniform(0, self.jitter) if self.jitter else 0)
+
+        if delay > 0:
+            time.sleep(delay)
+        if roll < self.error_rate:
+            raise ConnectionError(f"FakeDhan: injected network error in {name}")
+        if roll < self.error_rate + self.failure_rate:
+            return _failure("DH-905", f"Injected failure in {name}")
+        return None
+
+    # ── Orders ────────────────────────────────
+
+    def place_order(self, security_id, exchange_segment, transaction_type, quantity,
+                    order_type, product_type, price, trigger_price=0,
+                    validity="DAY", **kwargs) -> dict:
+        failure = self._simulate_call("place_order")
+        if failure:
+            return failure
+
+        ticker = TICKERS_BY_SECURITY_ID.get(str(security_id), str(security_id))
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+        with self._lock:
+            order_id = str(next(self._order_ids))
+            rejected = self._rng.random() < self.reject_rate
+            order = {
+                "orderId": order_id,
+                "securityId": str(security_id),
+                "tradingSymbol": ticker.replace(".NS", ""),
+                "exchangeSegment": exchange_segment,
+                "transactionType": transaction_type,
+                "orderType": order_type,
+                "productType": product_type,
+                "validity": validity,
+                "quantity": int(quantity),
+                "filledQty": 0,
+                "pendingQty": int(quantity),
+                "price": price,
+                "triggerPrice": trigger_price,
+                "averageTradedPrice": 0,
+                "orderStatus": "PENDING",
+                "omsErrorDescription": "",
+                "createTime": now,
+                "updateTime": now,
+            }
+            self._orders[order_id] = order
+
+            if rejected:
+                order["orderStatus"] = "REJECTED"
+                order["omsErrorDescription"] = "Injected rejection"
+            elif order_type == "MARKET" or price:
+                fill_price = self.feed.last_price(ticker) if order_type == "MARKET" else float(price)
+                self._fill(order, fill_price, now)
+
+        return {"status": "success", "remarks": "",
+                "data": {"orderId": order_id, "orderStatus": order["orderStatus"]}}
+
+    def _fill(self, order: dict, fill_price: float, now: str):
+        """Fill an order completely and update positions, holdings and funds. Lock held."""
+        qty = order["quantity"]
+        sign = 1 if order["transactionType"] == "BUY" else -1
+
+        order.update({
+            "filledQty": qty,
+            "pendingQty": 0,
+            "averageTradedPrice": fill_price,
+            "orderStatus": "TRADED",
+            "updateTime": now,
+        })
+        self._trades.append({
+            "tradeId": str(next(self._trade_ids)),
+            "orderId": order["orderId"],
+            "securityId": order["securityId"],
+            "tradingSymbol": order["tradingSymbol"],
+            "exchangeSegment": order["exchangeSegment"],
+            "transactionType": order["transactionType"],
+            "productType": order["productType"],
+            "tradedQuantity": qty,
+            "tradedPrice": fill_price,
+            "exchangeTime": now,
+        })
+
+        cash = fill_price * qty * sign
+        self._balance -= cash
+        self._utilized += cash
+
+        key = (order["securityId"], order["productType"])
+        pos = self._positions.setdefault(key, {
+            "securityId": order["securityId"],
+            "tradingSymbol": order["tradingSymbol"],
+            "exchangeSegment": order["exchangeSegment"],
+            "productType": order["productType"],
+            "buyQty": 0, "sellQty": 0, "buyAvg": 0.0, "sellAvg": 0.0,
+            "netQty": 0, "realizedProfit": 0.0,
+        })
+        if sign > 0:
+            pos["buyAvg"] = (pos["buyAvg"] * pos["buyQty"] + fill_price * qty) / (pos["buyQty"] + qty)
+            pos["buyQty"] += qty
+        else:
+            pos["sellAvg"] = (pos["sellAvg"] * pos["sellQty"] + fill_price * qty) / (pos["sellQty"] + qty)
+            pos["sellQty"] += qty
+            pos["realizedProfit"] += (fill_price - pos["buyAvg"]) * qty
+        pos["netQty"] = pos["buyQty"] - pos["sellQty"]
+
+        if order["productType"] == "CNC":
+            holding = self._holdings.setdefault(order["securityId"], {
+                "securityId": order["securityId"],
+                "tradingSymbol": order["tradingSymbol"],
+                "exchange": "NSE",
+                "isin": "",
+                "totalQty": 0,
+                "avgCostPrice": 0.0,
+            })
+            if sign > 0:
+                total = holding["totalQty"] + qty
+                holding["avgCostPrice"] = (holding["avgCostPrice"] * holding["totalQty"] + fill_price * qty) / total
+                holding["totalQty"] = total
+            else:
+                holding["totalQty"] = max(0, holding["totalQty"] - qty)
+
+    def cancel_order(self, order_id) -> dict:
+        failure = self._simulate_call("cancel_order")
+        if failure:
+            return failure
+        with self._lock:
+            order = self._orders.get(str(order_id))
+            if not order or order["orderStatus"] != "PENDING":
+                return _failure("DH-906", "Order not found or not pending")
+            order["orderStatus"] = "CANCELLED"
+            order["updateTime"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        return {"status": "success", "remarks": "",
+                "data": {"orderId": str(order_id), "orderStatus": "CANCELLED"}}
+
+    def modify_order(self, order_id, order_type=None, leg_name=None, quantity=None,
+                     price=None, trigger_price=None, disclosed_quantity=None,
+                     validity=None) -> dict:
+        failure = self._simulate_call("modify_order")
+        if failure:
+            return failure
+        with self._lock:
+            order = self._orders.get(str(order_id))
+            if not order or order["orderStatus"] != "PENDING":
+                return _failure("DH-906", "Order not found or not pending")
+            for key, value in (("orderType", order_type), ("quantity", quantity),
+                               ("price", price), ("triggerPrice", trigger_price),
+                               ("validity", validity)):
+                if value is not None:
+                    order[key] = value
+            order["pendingQty"] = order["quantity"]
+            order["updateTime"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        return {"status": "success", "remarks": "",
+                "data": {"orderId": str(order_id), "orderStatus": order["orderStatus"]}}
+
+    # ── Queries ───────────────────────────────
+
+    def get_fund_limits(self) -> dict:
+        failure = self._simulate_call("get_fund_limits")
+        if failure:
+            return failure
+        with self._lock:
+            return {"status": "success", "remarks": "", "data": {
+                "availabelBalance": round(self._balance, 2),
+                "utilizedAmount": round(self._utilized, 2),
+                "sodLimit": round(self._balance + self._utilized, 2),
+                "collateralAmount": 0,
+                "receiveableAmount": 0,
+                "blockedPayoutAmount": 0,
+                "withdrawableBalance": round(self._balance, 2),
+            }}
+
+    def get_positions(self) -> dict:
+        failure = self._simulate_call("get_positions")
+        if failure:
+            return failure
+        with self._lock:
+            data = []
+            for pos in self._positions.values():
+                ltp = self.feed.last_price(TICKERS_BY_SECURITY_ID.get(pos["securityId"], pos["securityId"]))
+                net = pos["netQty"]
+                data.append({
+                    **pos,
+                    "positionType": "LONG" if net > 0 else "SHORT" if net < 0 else "CLOSED",
+                    "lastTradedPrice": ltp,
+                    "unrealizedProfit": round((ltp - pos["buyAvg"]) * net, 2) if net else 0.0,
+                    "realizedProfit": round(pos["realizedProfit"], 2),
+                })
+        return {"status": "success", "remarks": "", "data": data}
+
+    def get_holdings(self) -> dict:
+        failure = self._simulate_call("get_holdings")
+        if failure:
+            return failure
+        with self._lock:
+            data = [
+                {**h, "lastTradedPrice": self.feed.last_price(
+                    TICKERS_BY_SECURITY_ID.get(h["securityId"], h["securityId"]))}
+                for h in self._holdings.values() if h["totalQty"] > 0
+            ]
+        if not data:
+            # Real Dhan answers an empty demat with an error code, not an empty list
+            return {"status": "failure", "data": "", "remarks": {
+                "error_code": "DH-1111", "error_type": "Data_Error",
+                "error_message": "No holdings available"}}
+        return {"status": "success", "remarks": "", "data": data}
+
+    def get_order_list(self) -> dict:
+        failure = self._simulate_call("get_order_list")
+        if failure:
+            return failure
+        with self._lock:
+            data = [dict(o) for o in self._orders.values()]
+        return {"status": "success", "remarks": "", "data": data}
+
+    def get_trade_book(self, order_id=None) -> dict:
+        failure = self._simulate_call("get_trade_book")
+        if failure:
+            return failure
+        with self._lock:
+            data = [dict(t) for t in self._trades
+                    if order_id is None or t["orderId"] == str(order_id)]
+        return {"status": "success", "remarks": "", "data": data}
+
+
+def _failure(code: str, message: str) -> dict:
+    return {"status": "failure", "data": "", "remarks": {
+        "error_code": code, "error_type": "Fake_Error", "error_message": message}}
+
+
+def install(feed: TickFeed | None = None, **kwargs) -> FakeDhan:
+    """
+    Create a FakeDhan client and route the engine's and executor's market
+    data through its tick feed, so nothing touches yfinance or Dhan.
+    Keyword arguments are passed to FakeDhan (latency, failure_rate, ...).
+    """
+    import agent_engine
+    import auto_executor
+
+    client = FakeDhan(feed=feed, **kwargs)
+    agent_engine.set_history_source(lambda symbol: client.feed.history(symbol))
+    auto_executor.set_price_source(client.feed.last_price)
+    return client
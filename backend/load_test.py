@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Offline Load Test — Execution Path
+
+Drives auto_executor against the in-process FakeDhan broker and simulated
+tick feed (fake_dhan.py), so no Dhan account or network is needed.
+
+  python load_test.py --orders 2000 --rate 500 --workers 16 --latency 0.01
+
+Trades are written to a temporary data directory, never to data/.
+"""
+
+import argparse
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import trade_store
+import auto_executor
+import fake_dhan
+
+
+def _percentile(values: list, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+def _make_signal(i: int, ticker: str, price: float) -> dict:
+    return {
+        "id": f"LT{i:06d}",
+        "signal_status": "QUALIFIED",
+        "symbol": ticker.replace(".NS", ""),
+        "ticker": ticker,
+        "sector": "LOADTEST",
+        "entry_price": price,
+        "stop_loss": round(price * 0.985, 2),
+        "target_price": round(price * 1.03, 2),
+        "risk_reward_ratio": 2.0,
+        "execution_instruction": "FORWARD_TO_EXECUTION_ENGINE",
+    }
+
+
+def run(orders: int, rate: float, workers: int, latency: float,
+        failure_rate: float, reject_rate: float) -> bool:
+    client = fake_dhan.install(latency=latency, failure_rate=failure_rate,
+                               reject_rate=reject_rate, seed=42)
+    tickers = list(auto_executor.SECURITY_IDS.keys())
+    config = {
+        "trading_mode": "LIVE",
+        "capital_available": 10_000_000,
+        "max_capital_per_trade": 1,
+    }
+
+    latencies = []
+    results = {"ok": 0, "failed": 0}
+    lock = threading.Lock()
+
+    def place(i: int):
+        ticker = tickers[i % len(tickers)]
+        signal = _make_signal(i, ticker, client.feed.last_price(ticker))
+        start = time.perf_counter()
+        trade = auto_executor.execute_signal(signal, config, client)
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies.append(elapsed)
+            results["ok" if trade else "failed"] += 1
+
+    print("=" * 60)
+    print(f"EXECUTION LOAD TEST: {orders} orders @ {rate:.0f}/s, {workers} workers")
+    print(f"Injected latency={latency * 1000:.1f}ms failure_rate={failure_rate} reject_rate={reject_rate}")
+    print("=" * 60)
+
+    interval = 1.0 / rate if rate > 0 else 0
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for i in range(orders):
+            # Open-loop pacing: submit on schedule regardless of completions
+            target = started + i * interval
+            delay = target - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(place, i)
+    wall = time.perf_counter() - started
+
+    print(f"Placed:      {results['ok']} ok, {results['failed']} failed")
+    print(f"Throughput:  {orders / wall:.1f} orders/s over {wall:.2f}s")
+    print(f"Latency:     p50={_percentile(latencies, 50) * 1000:.2f}ms "
+          f"p99={_percentile(latencies, 99) * 1000:.2f}ms "
+          f"mean={statistics.mean(latencies) * 1000:.2f}ms")
+
+    start = time.perf_counter()
+    reconciled = auto_executor.reconcile_orders(client)
+    print(f"Reconcile:   {len(reconciled)} trades updated in {time.perf_counter() - start:.2f}s "
+          f"({len(trade_store.get_open_trades())} open after rejections)")
+
+    # Move the feed far enough that every open trade hits target or stop-loss
+    for ticker in tickers:
+        client.feed.set_price(ticker, client.feed.last_price(ticker) * 1.05)
+    start = time.perf_counter()
+    closed = auto_executor.check_and_exit_positions(client, config)
+    print(f"Monitoring:  closed {len(closed)} positions in {time.perf_counter() - start:.2f}s")
+    print(f"Broker calls: {client.call_counts}")
+    return results["ok"] > 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--orders", type=int, default=1000)
+    parser.add_argument("--rate", type=float, default=200, help="target orders per second (0 = unpaced)")
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--latency", type=float, default=0.0, help="injected broker latency in seconds")
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--reject-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        trade_store.configure(data_dir=tmp)
+        success = run(args.orders, args.rate, args.workers, args.latency,
+                      args.failure_rate, args.reject_rate)
+    sys.exit(0 if success else 1)
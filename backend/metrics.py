@@ -0,0 +1,281 @@
+"""
+Autonomous Trading Agent — Metrics Registry
+
+In-process counters, gauges and histograms, rendered in the Prometheus
+text exposition format (0.0.4) by the app's /metrics endpoint.  There
+is no client library and no push gateway: a Prometheus server (or curl)
+scrapes the app directly.
+
+  counter(name, help, labels).inc(**labels)
+  gauge(name, help, labels).set(value, **labels)   or gauge(..., fn=callable),
+                                                   sampled at scrape time
+  histogram(name, help, labels).observe(seconds, **labels)
+  with histogram(...).time(**labels): ...
+
+  upstream(provider, call)      context manager counting calls, errors
+                                and latency of one upstream API call
+  instrument(client, provider)  proxy that does the same for every
+                                method call on an API client (dhanhq)
+
+Metrics are created once at module import (counter() etc. return the
+existing metric for a name), and updating one is a dict update under a
+lock, cheap enough for per-symbol and per-call use.
+"""
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Latency buckets in seconds: sub-millisecond store reads up to minute-long cycles
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                   0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_registry = {}       # name → metric, in registration order
+_registry_lock = threading.Lock()
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", r"\\").replace("\n", r"\n").replace('"', r'\"')
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: tuple = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _labels(self, key: tuple, extra: str = "") -> str:
+        pairs = [f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, key)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def samples(self) -> list:
+        """(suffix, labels, value) lines of the metric."""
+        with self._lock:
+            return [("", self._labels(key), value) for key, value in self._values.items()]
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {_escape(self.help)}", f"# TYPE {self.name} {self.kind}"]
+        for suffix, labels, value in self.samples():
+            lines.append(f"{self.name}{suffix}{labels} {_number(value)}")
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    """Monotonically increasing count (per label set)."""
+
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+
+class Gauge(_Metric):
+    """Value that goes up and down; with fn, sampled by calling fn() at scrape time."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labelnames: tuple = (), fn=None):
+        super().__init__(name, help, labelnames)
+        self.fn = fn
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def samples(self) -> list:
+        if self.fn is None:
+            return super().samples()
+        try:
+            return [("", "", float(self.fn()))]
+        except Exception as e:
+            print(f"[Metrics] Could not sample {self.name}: {e}")
+            return []
+
+
+class Histogram(_Metric):
+    """Distribution of observed values in cumulative buckets, with sum and count."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][i] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of the with-block."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def timed(self, **labels):
+        """Decorator observing the duration of every call."""
+        def decorator(fn):
+            @wraps(fn)
+            def run(*args, **kwargs):
+                with self.time(**labels):
+                    return fn(*args, **kwargs)
+            return run
+        return decorator
+
+    def snapshot(self, **labels) -> tuple:
+        """(count, sum) observed for a label set."""
+        with self._lock:
+            entry = self._values.get(self._key(labels))
+            return (entry[2], entry[1]) if entry else (0, 0.0)
+
+    def samples(self) -> list:
+        result = []
+        with self._lock:
+            entries = [(key, list(counts), total, count) for key, (counts, total, count) in self._values.items()]
+        for key, counts, total, count in entries:
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                result.append(("_bucket", self._labels(key, f'le="{_number(float(bound))}"'), cumulative))
+            result.append(("_sum", self._labels(key), total))
+            result.append(("_count", self._labels(key), count))
+        return result
+
+
+def _register(cls, name: str, *args, **kwargs):
+    with _registry_lock:
+        metric = _registry.get(name)
+        if metric is None:
+            metric = _registry[name] = cls(name, *args, **kwargs)
+        elif not isinstance(metric, cls):
+            raise ValueError(f"{name} is already registered as a {metric.kind}")
+        return metric
+
+
+def counter(name: str, help: str, labelnames: tuple = ()) -> Counter:
+    return _register(Counter, name, help, labelnames)
+
+
+def gauge(name: str, help: str, labelnames: tuple = (), fn=None) -> Gauge:
+    return _register(Gauge, name, help, labelnames, fn=fn)
+
+
+def histogram(name: str, help: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS) -> Histogram:
+    return _register(Histogram, name, help, labelnames, buckets=buckets)
+
+
+def render() -> str:
+    """Every registered metric in the Prometheus text format."""
+    with _registry_lock:
+        metrics = list(_registry.values())
+    return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+# ── Upstream APIs ─────────────────────────────
+
+UPSTREAM_CALLS = counter("agent_upstream_calls_total", "Calls to upstream market-data and broker APIs",
+                         ("provider", "call"))
+UPSTREAM_ERRORS = counter("agent_upstream_errors_total", "Upstream calls that raised or reported failure",
+                          ("provider", "call"))
+UPSTREAM_SECONDS = histogram("agent_upstream_seconds", "Latency of upstream API calls",
+                             ("provider", "call"))
+
+
+class _Call:
+    failed = False
+
+    def fail(self):
+        """Count the call as an error even though it returned."""
+        self.failed = True
+
+
+@contextmanager
+def upstream(provider: str, call: str):
+    """Count and time one upstream call; an exception (or handle.fail()) counts as an error."""
+    handle = _Call()
+    start = time.perf_counter()
+    try:
+        yield handle
+    except Exception:
+        handle.failed = True
+        raise
+    finally:
+        UPSTREAM_SECONDS.observe(time.perf_counter() - start, provider=provider, call=call)
+        UPSTREAM_CALLS.inc(provider=provider, call=call)
+        if handle.failed:
+            UPSTREAM_ERRORS.inc(provider=provider, call=call)
+
+
+class _Instrumented:
+    """Proxy for an API client: every public method call goes through upstream()."""
+
+    def __init__(self, client, provider: str):
+        self._client = client
+        self._provider = provider
+
+    def __getattr__(self, name: str):
+        attr = getattr(self._client, name)
+        if name.startswith("_") or not callable(attr):
+            return attr
+
+        @wraps(attr)
+        def call(*args, **kwargs):
+            with upstream(self._provider, name) as handle:
+                result = attr(*args, **kwargs)
+                # dhanhq reports errors as {"status": "failure", ...} instead of raising
+                if isinstance(result, dict) and result.get("status") == "failure":
+                    handle.fail()
+                return result
+        return call
+
+
+def instrument(client, provider: str):
+    """Wrap an API client so its calls are counted and timed (None stays None)."""
+    return None if client is None else _Instrumented(client, provider)
@@ -0,0 +1,269 @@
+"""
+AI Market Intelligence Agent — Rule Parameter Optimizer
+
+Grid or random search over the agent's rule parameters: the stop-loss
+and target percents of the config, and the RSI band, ATR stop multiple
+and minimum R:R of agent_engine (see backtest_engine.RULES).  Every
+combination is backtested with backtest_engine.score() and the results
+come back ranked by Sharpe ratio (or total P&L, win rate or drawdown).
+
+  SPACE           default values tried per parameter (4,800 combinations)
+  combinations()  the grid product, or a random sample of it
+  optimize()      download and prepare once, score every combination
+
+History is downloaded and indicators computed once per run.  With more
+than one worker, the panel's OHLC and the prepared indicator arrays are
+copied once into multiprocessing.shared_memory blocks.  Each worker maps
+them as NumPy arrays when it starts (the pool initializer), so a task
+carries only its parameter dict and the result numbers.  Workers are
+spawned, not forked: the app process runs scheduler and request threads.
+They start with this module as their main module, so a worker never
+re-imports the app's entry script (app.py builds the Flask app, the
+broker client and its feed at import).
+"""
+
+import itertools
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+import agent_engine
+import backtest_engine
+
+SPACE = {
+    "stop_loss_percent": (1, 1.5, 2, 2.5, 3),
+    "target_percent": (2, 3, 4, 5, 6),
+    "rsi_low": (30, 35, 40, 45),
+    "rsi_high": (65, 70, 75, 80),
+    "atr_multiplier": (1, 1.5, 2, 2.5),
+    "min_risk_reward": (1, 1.5, 2),
+}
+MAX_COMBINATIONS = 20_000
+WORKERS = int(os.getenv("OPTIMIZER_WORKERS", str(os.cpu_count() or 1)))
+HTTP_WORKERS = min(WORKERS, int(os.getenv("OPTIMIZER_HTTP_WORKERS", "4")))  # default for API requests
+SORT_KEYS = ("sharpe_ratio", "total_pnl", "win_rate", "max_drawdown")
+MIN_TRADES = 30          # fewer closed trades than this are not ranked (too noisy)
+
+# Arrays a worker needs, from the panel and from prepare()
+_PANEL_ARRAYS = ("open", "high", "low")
+_PREPARED_ARRAYS = ("close", "atr", "rsi", "trend")
+
+_worker = {}             # per worker process: panel, prepared arrays and run settings
+_spawn_lock = threading.Lock()
+
+
+def _check_space(space: dict) -> dict:
+    checked = {}
+    for name, values in space.items():
+        if name not in SPACE:
+            raise ValueError(f"Unknown parameter '{name}'; parameters are {', '.join(SPACE)}")
+        if not isinstance(values, (list, tuple)) or not values:
+            raise ValueError(f"{name} must be a non-empty list of numbers")
+        for value in values:
+            if isinstance(value, bool) or not isinstance(value, (int, float)) or value <= 0:
+                raise ValueError(f"{name} values must be positive numbers")
+            if name.startswith("rsi_") and value > 100:
+                raise ValueError(f"{name} values must be at most 100")
+        checked[name] = tuple(sorted(set(values)))
+    return checked
+
+
+def combinations(space: dict | None = None, samples: int | None = None, seed: int | None = None) -> list:
+    """
+    Parameter dicts of the grid over `space` (parameters left out use
+    SPACE), or `samples` of them drawn at random without replacement.
+    Combinations with rsi_low >= rsi_high are dropped.
+    """
+    space = {**SPACE, **_check_space(space or {})}
+    names = list(space)
+    sizes = [len(space[name]) for name in names]
+    total = int(np.prod(sizes))
+    if samples is not None and samples < total:
+        if samples < 1:
+            raise ValueError("samples must be at least 1")
+        picks = np.random.default_rng(seed).choice(total, size=samples, replace=False)
+        indices = zip(*np.unravel_index(np.sort(picks), sizes))
+    else:
+        if total > MAX_COMBINATIONS:
+            raise ValueError(f"The grid has {total} combinations; at most {MAX_COMBINATIONS} "
+                             f"(pass samples for a random search)")
+        indices = itertools.product(*(range(n) for n in sizes))
+    result = []
+    for index in indices:
+        params = {name: space[name][int(i)] for name, i in zip(names, index)}
+        if params["rsi_low"] < params["rsi_high"]:
+            result.append(params)
+    return result
+
+
+def _score(panel, prepared: dict, config: dict, params: dict, capital, start, end) -> dict:
+    """Backtest summary of one parameter combination."""
+    config = {
+        **config,
+        "stop_loss_rule": {**config["stop_loss_rule"], "value": params["stop_loss_percent"]},
+        "profit_booking_rule": {**config["profit_booking_rule"], "value": params["target_percent"]},
+    }
+    rules = {name: params[name] for name in backtest_engine.RULES}
+    return {**params, **backtest_engine.score(panel, prepared, config, capital, start, end, rules)}
+
+
+# ── Shared memory ─────────────────────────────
+
+def _share(arrays: dict) -> tuple:
+    """Copy arrays into new shared memory blocks: (blocks, layout for _attach)."""
+    blocks, layout = [], {}
+    try:
+        for name, array in arrays.items():
+            block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            blocks.append(block)
+            np.ndarray(array.shape, array.dtype, buffer=block.buf)[...] = array
+            layout[name] = (block.name, array.shape, array.dtype.str)
+    except Exception:
+        _release(blocks)
+        raise
+    return blocks, layout
+
+
+def _release(blocks: list):
+    for block in blocks:
+        block.close()
+        block.unlink()
+
+
+def _attach(layout: dict, pairs: list, days: list, config: dict, capital, start, end):
+    """Pool initializer: map the shared arrays and keep the run settings."""
+    blocks, arrays = [], {}
+    for name, (block_name, shape, dtype) in layout.items():
+        # Spawned workers share the parent's resource tracker, which
+        # forgets the block when the parent unlinks it after the run
+        block = shared_memory.SharedMemory(name=block_name)
+        blocks.append(block)
+        arrays[name] = np.ndarray(shape, np.dtype(dtype), buffer=block.buf)
+    _worker.update(
+        blocks=blocks,
+        panel=backtest_engine.Panel.from_arrays(pairs, days, arrays),
+        prepared={name: arrays[name] for name in _PREPARED_ARRAYS},
+        config=config, capital=capital, start=start, end=end,
+    )
+
+
+def _evaluate(params: dict) -> dict:
+    w = _worker
+    return _score(w["panel"], w["prepared"], w["config"], params, w["capital"], w["start"], w["end"])
+
+
+@contextmanager
+def _spawning_as_main():
+    """
+    Make this module the __main__ that spawned workers re-import while
+    the pool starts them, instead of the parent's entry script.
+    """
+    with _spawn_lock:
+        main = sys.modules["__main__"]
+        sys.modules["__main__"] = sys.modules[__name__]
+        try:
+            yield
+        finally:
+            sys.modules["__main__"] = main
+
+
+# ── Search ────────────────────────────────────
+
+def _rank(results: list, sort_by: str, min_trades: int) -> list:
+    ranked = [r for r in results if r["total_trades"] >= min_trades]
+    if sort_by == "max_drawdown":
+        ranked.sort(key=lambda r: (r["max_drawdown"], -r["total_pnl"]))
+    else:
+        ranked.sort(key=lambda r: (-r[sort_by], -r["total_pnl"]))
+    return ranked
+
+
+def optimize(config: dict, space: dict | None = None, samples: int | None = None, seed: int | None = None,
+             period: str = "5y", lookback: int = backtest_engine.LOOKBACK, capital: float | None = None,
+             start: str | None = None, end: str | None = None, symbols: list | None = None,
+             sort_by: str = "sharpe_ratio", top: int = 20, min_trades: int = MIN_TRADES,
+             workers: int | None = None) -> dict:
+    """
+    Backtest every parameter combination of `space` (or a random sample)
+    over the config's universe and rank them by `sort_by` (lowest first
+    for max_drawdown).  Returns the `top` rows, the current parameters'
+    scores as the baseline, and run details.
+    """
+    if sort_by not in SORT_KEYS:
+        raise ValueError(f"sort_by must be one of {SORT_KEYS}")
+    combos = combinations(space, samples, seed)
+    if not combos:
+        raise ValueError("No combinations to try (rsi_low must be below rsi_high)")
+    workers = max(1, min(WORKERS if workers is None else workers, len(combos)))
+    if capital is None:
+        capital = config["capital_available"] or backtest_engine.DEFAULT_CAPITAL
+    started = time.perf_counter()
+
+    pairs = agent_engine.universe(config)
+    if symbols:
+        wanted = set(symbols)
+        pairs = [(sector, symbol) for sector, symbol in pairs if symbol in wanted]
+    panel = backtest_engine.load(pairs, period)
+    prepared = backtest_engine.prepare(panel, lookback)
+    loaded = time.perf_counter()
+
+    baseline = _score(panel, prepared, config, {
+        "stop_loss_percent": config["stop_loss_rule"]["value"],
+        "target_percent": config["profit_booking_rule"]["value"],
+        **backtest_engine.RULES,
+    }, capital, start, end)
+
+    shared_bytes = 0
+    if workers == 1:
+        results = [_score(panel, prepared, config, params, capital, start, end) for params in combos]
+    else:
+        arrays = {**{name: getattr(panel, name) for name in _PANEL_ARRAYS},
+                  **{name: prepared[name] for name in _PREPARED_ARRAYS}}
+        blocks, layout = _share(arrays)
+        shared_bytes = sum(array.nbytes for array in arrays.values())
+        try:
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_attach,
+                initargs=(layout, panel.pairs, panel.days, dict(config), capital, start, end),
+            ) as pool:
+                # map() submits every chunk, and so starts every worker, before it returns
+                with _spawning_as_main():
+                    chunks = pool.map(_evaluate, combos, chunksize=max(1, len(combos) // (workers * 8)))
+                results = list(chunks)
+        finally:
+            _release(blocks)
+    finished = time.perf_counter()
+
+    ranked = _rank(results, sort_by, min_trades)
+    print(f"[Optimizer] {len(combos)} combinations over {len(panel.pairs)} symbols "
+          f"in {finished - loaded:.1f}s on {workers} worker(s)")
+    return {
+        "results": ranked[:top],
+        "baseline": baseline,
+        "run": {
+            "period": period,
+            "lookback": lookback,
+            "capital": capital,
+            "start": start or (panel.days[0] if panel.days else None),
+            "end": end or (panel.days[-1] if panel.days else None),
+            "symbols": len(panel.pairs),
+            "bars": panel.shape[1],
+            "combinations": len(combos),
+            "ranked": len(ranked),
+            "sort_by": sort_by,
+            "min_trades": min_trades,
+            "workers": workers,
+            "shared_bytes": shared_bytes,
+            "load_seconds": round(loaded - started, 3),
+            "search_seconds": round(finished - loaded, 3),
+        },
+    }
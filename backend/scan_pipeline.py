@@ -0,0 +1,216 @@
+"""
+Autonomous Trading Agent — Pipelined Scan Cycle
+
+Building blocks that let the scheduler overlap the network-bound parts
+of a cycle instead of running them back to back.  Everything runs as
+asyncio tasks on the scheduler's event loop; blocking calls go through
+async_core.run_blocking:
+
+  fetch    history downloads started up to QUEUE_SIZE symbols ahead of
+           the scanner (prefetch)
+  scan     indicators computed once per symbol as the bars arrive, then
+           levels and rule checks per agent profile
+  execute  orders placed for qualified signals as they are logged, up to
+           ORDER_CONCURRENCY at a time
+  monitor  order reconciliation and exit checks, running alongside all
+           of the above
+
+Stages are connected by bounded asyncio queues: a producer that gets
+QUEUE_SIZE items ahead waits until the consumer catches up
+(backpressure), and the time spent waiting is recorded.  CycleMetrics
+reports each stage's busy time, occupancy (busy / cycle wall time) and
+the overlap factor (total busy time / wall time; above 1 means stages
+ran in parallel).
+"""
+
+import asyncio
+import os
+import threading
+import time
+
+import agent_engine
+import metrics
+from async_core import run_blocking
+
+QUEUE_SIZE = 32      # items a stage may run ahead of its consumer
+ORDER_CONCURRENCY = int(os.getenv("ORDER_CONCURRENCY", "8"))
+
+STAGE_SECONDS = metrics.histogram("agent_stage_seconds", "Busy time per item of each cycle stage", ("stage",))
+STAGE_BLOCKED = metrics.counter("agent_stage_blocked_seconds_total",
+                                "Time cycle stages spent waiting on a full or empty queue", ("stage",))
+
+
+class Stage:
+    """Busy / blocked time and item count of one pipeline stage."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.items = 0
+        self.busy = 0.0
+        self.blocked = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, busy: float = 0.0, blocked: float = 0.0, items: int = 0):
+        with self._lock:
+            self.busy += busy
+            self.blocked += blocked
+            self.items += items
+        if items:
+            STAGE_SECONDS.observe(busy / items, stage=self.name)
+        if blocked:
+            STAGE_BLOCKED.inc(blocked, stage=self.name)
+
+
+class CycleMetrics:
+    """Stages of one cycle, timed against the cycle's wall clock."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages = {}
+
+    def stage(self, name: str) -> Stage:
+        if name not in self.stages:
+            self.stages[name] = Stage(name)
+        return self.stages[name]
+
+    def report(self) -> dict:
+        wall = max(time.perf_counter() - self.started, 1e-9)
+        stages = {
+            s.name: {
+                "items": s.items,
+                "busy_s": round(s.busy, 3),
+                "blocked_s": round(s.blocked, 3),
+                "occupancy": round(s.busy / wall, 3),
+            }
+            for s in self.stages.values()
+        }
+        fetched = self.stages["fetch"].items if "fetch" in self.stages else 0
+        return {
+            "wall_s": round(wall, 3),
+            "overlap": round(sum(s.busy for s in self.stages.values()) / wall, 2),
+            "symbols_per_s": round(fetched / wall, 1),
+            "stages": stages,
+        }
+
+
+def timed(stage: Stage, fn):
+    """Coroutine function fn wrapped to charge each call to `stage` as busy time."""
+    async def run(*args):
+        start = time.perf_counter()
+        try:
+            return await fn(*args)
+        finally:
+            stage.record(busy=time.perf_counter() - start, items=1)
+    return run
+
+
+async def _prefetch(symbols: list, fetch, stage: Stage, window: asyncio.Queue):
+    """
+    Producer: start fetch(symbol) for every symbol, in order, as a task and
+    put (symbol, task) on `window`, then None.  The bounded window keeps
+    it at most QUEUE_SIZE symbols ahead of the scan.
+    """
+    fetch = timed(stage, fetch)
+    for symbol in symbols:
+        task = asyncio.create_task(fetch(symbol))
+        start = time.perf_counter()
+        try:
+            await window.put((symbol, task))
+        except asyncio.CancelledError:
+            task.cancel()
+            raise
+        stage.record(blocked=time.perf_counter() - start)
+    await window.put(None)
+
+
+async def scan_profiles(scans: list, metrics: CycleMetrics, ready=None, stopping=lambda: False) -> list:
+    """
+    Run agent_engine.ProfileScans over one shared data pass: every symbol
+    in any profile's universe is fetched once (prefetched: the bars of
+    upcoming symbols download while the current one is analysed) and
+    analysed once, and each profile then only computes its own levels and
+    rule checks.  Analysis waits for `ready` (e.g. the capital refresh),
+    and ends once every profile is done or stopping() is true.  Fetches
+    not yet needed when the scan ends are cancelled.  Returns `scans`.
+    """
+    fetch_stage = metrics.stage("fetch")
+    scan_stage = metrics.stage("scan")
+    window = asyncio.Queue(maxsize=QUEUE_SIZE)
+
+    async def fetch(symbol):
+        return await run_blocking(agent_engine._fetch_history, symbol)
+
+    symbols = agent_engine.shared_universe(s.config for s in scans)
+    producer = asyncio.create_task(
+        _prefetch(symbols, fetch, fetch_stage, window))
+    analyses = {}
+    try:
+        if ready is not None:
+            await ready
+        while not stopping() and not all(s.done for s in scans):
+            start = time.perf_counter()
+            item = await window.get()
+            if item is None:
+                break
+            symbol, task = item
+            try:
+                bars = await task
+            except Exception as e:
+                print(f"[AgentEngine] Error scanning {symbol}: {e}")
+                bars = None
+            finally:
+                scan_stage.record(blocked=time.perf_counter() - start)
+
+            start = time.perf_counter()
+            try:
+                analyses[symbol] = agent_engine.analyze(bars)
+            except Exception as e:
+                print(f"[AgentEngine] Error scanning {symbol}: {e}")
+                analyses[symbol] = None
+            for s in scans:
+                s.advance(analyses)
+            scan_stage.record(busy=time.perf_counter() - start, items=1)
+    finally:
+        producer.cancel()
+        while not window.empty():
+            item = window.get_nowait()
+            if item is not None:
+                item[1].cancel()
+
+    return scans
+
+
+async def scan(config: dict, metrics: CycleMetrics, ready=None, stopping=lambda: False) -> list:
+    """agent_engine.scan_markets with history prefetched (scan_profiles for one config)."""
+    scans = await scan_profiles([agent_engine.ProfileScan(config)], metrics, ready, stopping)
+    return scans[0].result()
+
+
+async def consume(work: asyncio.Queue, fn, concurrency: int = ORDER_CONCURRENCY) -> list:
+    """
+    Start fn(item) for every item put on `work`, in order, with at most
+    `concurrency` running at once, until a None sentinel arrives.  Returns
+    the non-None results.  If a call raises, the rest still run and the
+    first error is re-raised at the end.
+    """
+    slots = asyncio.Semaphore(concurrency)
+    tasks = []
+
+    async def run(item):
+        try:
+            return await fn(item)
+        finally:
+            slots.release()
+
+    while True:
+        item = await work.get()
+        if item is None:
+            break
+        await slots.acquire()
+        tasks.append(asyncio.create_task(run(item)))
+
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    for result in results:
+        if isinstance(result, Exception):
+            raise result
+    return [r for r in results if r is not None]
@@ -0,0 +1,166 @@
+"""
+AI Market Intelligence Agent — Signal Journal
+
+Append-only on-disk log behind agent_log.  Every logged signal, user
+action and scan result is one JSON line appended to the current segment:
+
+  {"op": "signal", "entry": {...}}
+  {"op": "action", "id": "...", "action": "APPROVED"}
+  {"op": "scan",   "ids": [...]}
+
+A record's position is (segment, line).  Once the current segment
+reaches SEGMENT_BYTES a new one is started, and only the newest
+RETAIN_SEGMENTS are kept.  Segments other than the current one never
+change, so read() caches a few of them for paging.
+"""
+
+import glob
+import json
+import os
+import shutil
+import threading
+from collections import OrderedDict
+
+import metrics
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data", "agent_log")
+
+SEGMENT_BYTES = 1 << 20     # rotate once the current segment reaches this size
+RETAIN_SEGMENTS = 500       # older segments are deleted
+CACHE_SEGMENTS = 4          # closed segments kept parsed for paging
+
+_lock = threading.Lock()    # guards the open segment and the cache
+_file = None
+_segment = 0
+_lines = 0
+_cache = OrderedDict()      # segment → records
+
+CACHE = metrics.counter("agent_signal_journal_cache_total",
+                        "Signal journal segment reads served from the parsed-segment cache", ("result",))
+
+
+def configure(data_dir: str):
+    """Switch to another directory, closing the current segment."""
+    global DATA_DIR, _file
+    with _lock:
+        if _file is not None:
+            _file.close()
+            _file = None
+        _cache.clear()
+        DATA_DIR = data_dir
+
+
+def _path(segment: int) -> str:
+    return os.path.join(DATA_DIR, f"signals.{segment:06d}.jsonl")
+
+
+def segments() -> list:
+    """Segment numbers on disk, oldest first."""
+    found = []
+    for path in glob.glob(os.path.join(DATA_DIR, "signals.*.jsonl")):
+        number = os.path.basename(path).split(".")[1]
+        if number.isdigit():
+            found.append(int(number))
+    return sorted(found)
+
+
+def _open():
+    """Open the newest segment for appending. Caller holds _lock."""
+    global _file, _segment, _lines
+    os.makedirs(DATA_DIR, exist_ok=True)
+    existing = segments()
+    _segment = existing[-1] if existing else 1
+    _lines = len(_parse(_segment)) if existing else 0
+    _file = open(_path(_segment), "a")
+    if _file.tell():
+        with open(_path(_segment), "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                _file.write("\n")   # isolate a torn final record from the next append
+
+
+def current_segment() -> int:
+    with _lock:
+        if _file is None:
+            _open()
+        return _segment
+
+
+def append(record: dict) -> tuple:
+    """Append one record; returns its (segment, line) position."""
+    global _file, _segment, _lines
+    line = json.dumps(record, default=str) + "\n"
+    with _lock:
+        if _file is None:
+            _open()
+        if _lines and _file.tell() + len(line) > SEGMENT_BYTES:
+            _file.close()
+            _segment += 1
+            _lines = 0
+            _file = open(_path(_segment), "a")
+            for old in segments()[:-RETAIN_SEGMENTS]:
+                os.remove(_path(old))
+                _cache.pop(old, None)
+        try:
+            _file.write(line)
+            _file.flush()
+        except OSError:
+            # Part of the line may have reached the file: reopen on the next
+            # append, which recounts the lines and ends the torn record
+            try:
+                _file.close()
+            except OSError:
+                pass
+            _file = None
+            raise
+        position = (_segment, _lines)
+        _lines += 1
+    return position
+
+
+def _parse(segment: int) -> list:
+    records = []
+    try:
+        with open(_path(segment), "r") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    print(f"[SignalJournal] Ignoring torn record in segment {segment}")
+    except FileNotFoundError:
+        pass
+    return records
+
+
+def read(segment: int) -> list:
+    """All valid records of one segment, oldest first (position line = list index)."""
+    with _lock:
+        if _file is None:
+            _open()
+        records = _cache.get(segment)
+        if records is not None:
+            _cache.move_to_end(segment)
+            CACHE.inc(result="hit")
+            return records
+        closed = segment != _segment
+    CACHE.inc(result="miss")
+    records = _parse(segment)
+    if closed:
+        with _lock:
+            _cache[segment] = records
+            while len(_cache) > CACHE_SEGMENTS:
+                _cache.popitem(last=False)
+    return records
+
+
+def clear():
+    """Delete every segment (kill switch)."""
+    global _file
+    with _lock:
+        if _file is not None:
+            _file.close()
+            _file = None
+        _cache.clear()
+        shutil.rmtree(DATA_DIR, ignore_errors=True)
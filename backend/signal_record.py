@@ -0,0 +1,185 @@
+"""
+AI Market Intelligence Agent — Compact Signal Records
+
+A signal used to be a dict of ~15 keys holding three nested dicts
+(indicators, trend, rule_checks), copied once more by agent_log.  A
+SignalRecord keeps the same data in fixed __slots__, with the rule
+checks and trend flags packed into integer bitmasks, so a signal is one
+small object instead of five dicts.
+
+Records read like the old dicts — record["indicators"]["rsi"],
+record.get("trend", {}), record["user_action"] = ... — but nested dicts
+are only built when asked for.  to_dict() produces the exact JSON shape
+of the old dict and is meant to be called at the API / journal boundary.
+"""
+
+RULE_CHECKS = (
+    "sector_allowed",
+    "risk_within_limit",
+    "capital_within_limit",
+    "trade_count_ok",
+    "risk_reward_ok",
+)
+TREND_FLAGS = ("bullish_ema", "rsi_ok", "above_vwap", "volume_ok")
+INDICATORS = ("ema9", "ema21", "rsi", "atr", "vwap", "volume")
+
+# Top-level keys in the order the old dicts serialized them
+_FIELDS = (
+    "id", "timestamp", "user_action", "signal_status", "symbol", "ticker",
+    "sector", "entry_price", "stop_loss", "target_price", "risk_reward_ratio",
+)
+_SCALARS = _FIELDS + ("execution_instruction", "rationale")
+_KEYS = _SCALARS + ("rule_checks", "indicators", "trend")
+
+
+def pack_flags(flags: dict, names: tuple) -> int:
+    """Bitmask with bit i set when flags[names[i]] is truthy."""
+    mask = 0
+    for bit, name in enumerate(names):
+        if flags.get(name):
+            mask |= 1 << bit
+    return mask
+
+
+def unpack_flags(mask: int, names: tuple) -> dict:
+    return {name: bool(mask >> bit & 1) for bit, name in enumerate(names)}
+
+
+class SignalRecord:
+    """One generated signal (see module docstring)."""
+
+    __slots__ = (
+        "id", "timestamp", "user_action", "signal_status", "symbol", "ticker",
+        "sector", "entry_price", "stop_loss", "target_price", "risk_reward_ratio",
+        "checks", "execution_instruction", "rationale",
+        "ema9", "ema21", "rsi", "atr", "vwap", "volume",
+        "trend_score", "trend_flags", "extra",
+    )
+
+    def __init__(self, signal_status: str, ticker: str, sector: str,
+                 entry_price: float, stop_loss: float, target_price: float,
+                 risk_reward_ratio: float, checks: int = 0,
+                 execution_instruction: str = "NONE", rationale: str = "",
+                 ema9: float = 0.0, ema21: float = 0.0, rsi: float = 0.0,
+                 atr: float = 0.0, vwap: float = 0.0, volume: int = 0,
+                 trend_score: int = 0, trend_flags: int = 0,
+                 symbol: str | None = None):
+        self.id = None
+        self.timestamp = None
+        self.user_action = None       # None | APPROVED | REJECTED_BY_USER | AUTO_EXECUTED
+        self.signal_status = signal_status
+        self.symbol = symbol if symbol is not None else ticker.replace(".NS", "")
+        self.ticker = ticker
+        self.sector = sector
+        self.entry_price = entry_price
+        self.stop_loss = stop_loss
+        self.target_price = target_price
+        self.risk_reward_ratio = risk_reward_ratio
+        self.checks = checks
+        self.execution_instruction = execution_instruction
+        self.rationale = rationale
+        self.ema9 = ema9
+        self.ema21 = ema21
+        self.rsi = rsi
+        self.atr = atr
+        self.vwap = vwap
+        self.volume = volume
+        self.trend_score = trend_score
+        self.trend_flags = trend_flags
+        self.extra = None             # keys outside the schema, if any
+
+    # ── Conversion ────────────────────────────
+
+    @classmethod
+    def from_dict(cls, signal: dict) -> "SignalRecord":
+        """Build a record from the dict shape (journal replay, other callers)."""
+        indicators = signal.get("indicators") or {}
+        trend = signal.get("trend") or {}
+        record = cls(
+            signal.get("signal_status"), signal.get("ticker") or "", signal.get("sector"),
+            signal.get("entry_price"), signal.get("stop_loss"), signal.get("target_price"),
+            signal.get("risk_reward_ratio"),
+            checks=pack_flags(signal.get("rule_checks") or {}, RULE_CHECKS),
+            execution_instruction=signal.get("execution_instruction", "NONE"),
+            rationale=signal.get("rationale", ""),
+            trend_score=trend.get("score", 0),
+            trend_flags=pack_flags(trend, TREND_FLAGS),
+            symbol=signal.get("symbol"),
+            **{name: indicators.get(name, 0) for name in INDICATORS},
+        )
+        record.id = signal.get("id")
+        record.timestamp = signal.get("timestamp")
+        record.user_action = signal.get("user_action")
+        extra = {k: v for k, v in signal.items() if k not in _KEYS}
+        record.extra = extra or None
+        return record
+
+    def copy(self) -> "SignalRecord":
+        clone = object.__new__(SignalRecord)
+        for name in self.__slots__:
+            setattr(clone, name, getattr(self, name))
+        if self.extra is not None:
+            clone.extra = dict(self.extra)
+        return clone
+
+    def to_dict(self) -> dict:
+        """The JSON-ready dict shape of the signal."""
+        result = {name: getattr(self, name) for name in _FIELDS}
+        if self.id is None:
+            del result["id"], result["timestamp"], result["user_action"]
+        result["rule_checks"] = unpack_flags(self.checks, RULE_CHECKS)
+        result["execution_instruction"] = self.execution_instruction
+        result["rationale"] = self.rationale
+        result["indicators"] = {name: getattr(self, name) for name in INDICATORS}
+        result["trend"] = {"score": self.trend_score, **unpack_flags(self.trend_flags, TREND_FLAGS)}
+        if self.extra:
+            result.update(self.extra)
+        return result
+
+    # ── Dict-compatible access ────────────────
+
+    def __getitem__(self, key: str):
+        if key in _SCALARS:
+            return getattr(self, key)
+        if key == "rule_checks":
+            return unpack_flags(self.checks, RULE_CHECKS)
+        if key == "indicators":
+            return {name: getattr(self, name) for name in INDICATORS}
+        if key == "trend":
+            return {"score": self.trend_score, **unpack_flags(self.trend_flags, TREND_FLAGS)}
+        if self.extra and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key: str, value):
+        if key in _SCALARS:
+            setattr(self, key, value)
+        elif key in ("rule_checks", "indicators", "trend"):
+            raise TypeError(f"SignalRecord field {key!r} is read-only through item access")
+        else:
+            if self.extra is None:
+                self.extra = {}
+            self.extra[key] = value
+
+    def get(self, key: str, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __contains__(self, key) -> bool:
+        if key in ("id", "timestamp", "user_action"):
+            return self.id is not None
+        return key in _KEYS or bool(self.extra and key in self.extra)
+
+    def keys(self) -> list:
+        return list(self.to_dict())
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self) -> int:
+        return len(self.keys())
+
+    def __repr__(self) -> str:
+        return f"SignalRecord({self.id!r}, {self.ticker!r}, {self.signal_status!r})"
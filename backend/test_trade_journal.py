@@ -0,0 +1,69 @@
+"""
+Trade journal restart tests: a torn final record (a crash mid-write) must
+not swallow the events appended after the restart.
+
+  python -m pytest test_trade_journal.py
+"""
+
+import os
+
+import trade_journal
+
+
+def _open_trade(trade_id: str) -> dict:
+    return {"trade_id": trade_id, "symbol": "TCS.NS", "status": "OPEN"}
+
+
+def _append(*trade_ids):
+    trade_journal.wait_durable(trade_journal.append([("open", _open_trade(t)) for t in trade_ids]))
+
+
+def test_restart_after_torn_tail(tmp_path):
+    trade_journal.configure(str(tmp_path))
+    assert trade_journal.load() == []
+    _append("A")
+
+    # Crash mid-write: half of B's record reaches the segment
+    path = trade_journal._segment_path(trade_journal._generation)
+    with open(path, "a") as f:
+        f.write('{"op": "open", "trade": {"trade_')
+
+    trade_journal.configure(str(tmp_path))
+    assert [t["trade_id"] for t in trade_journal.load()] == ["A"]
+    _append("B")
+    _append("C")
+
+    trade_journal.configure(str(tmp_path))
+    assert [t["trade_id"] for t in trade_journal.load()] == ["A", "B", "C"]
+    with open(path, "rb") as f:
+        assert f.read().endswith(b"\n")
+
+
+def test_failed_write_is_not_reported_durable(tmp_path):
+    trade_journal.configure(str(tmp_path))
+    trade_journal.load()
+    _append("A")
+
+    real = trade_journal._file
+
+    class Full:
+        def write(self, data):
+            real.write(data[:10])   # a partial write, then the disk fills up
+            raise OSError("No space left on device")
+
+        def close(self):
+            real.close()
+
+    trade_journal._file = Full()
+    seq = trade_journal.append([("open", _open_trade("B"))])
+    try:
+        trade_journal.wait_durable(seq)
+    except OSError:
+        pass
+    else:
+        raise AssertionError("a failed write was reported durable")
+
+    _append("C")   # the flusher survives and the torn bytes were cut off
+    trade_journal.configure(str(tmp_path))
+    assert [t["trade_id"] for t in trade_journal.load()] == ["A", "C"]
+    assert os.path.exists(trade_journal._segment_path(trade_journal._generation))
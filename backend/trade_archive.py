@@ -0,0 +1,252 @@
+"""
+Autonomous Trading Agent — Time-Partitioned Trade Archive
+
+Cold storage for settled trades (anything no longer OPEN), so that
+trade_store's backend and in-memory index only hold the hot partition:
+open trades plus whatever settled today.
+
+  data/archive/YYYY-MM/YYYY-MM-DD.json   trades settled that day
+  data/archive/manifest.json             per-day trade/closed counts and entry-time range
+
+trade_store.roll_over() moves every trade settled before today into its
+day file (CLOSED trades by exit day, others by entry day).  Day files are
+replaced atomically and a repeat write for the same day merges by
+trade_id.  A crash between archiving and deleting from the hot store
+leaves the trades in both; trade_store drops them from the hot store on
+its next load (archived_ids()), so they are never counted twice.
+Archived trades are final: they are no longer updated.
+
+Month partitions are opened lazily — only when a query reaches their
+date range — as read-only TradeIndex objects, and the most recent
+CACHE_MONTHS of them stay cached.  Summary statistics never need them:
+the incremental aggregates already cover archived trades.
+"""
+
+import glob
+import json
+import os
+import shutil
+import threading
+from collections import OrderedDict
+
+from trade_index import TradeIndex
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data", "archive")
+
+CACHE_MONTHS = 6   # archived month indexes kept in memory
+
+_lock = threading.Lock()     # guards the manifest and the month cache
+_manifest = None             # {"days": {day: {"trades", "closed", "min_entry", "max_entry"}}}
+_cache = OrderedDict()       # month → TradeIndex (LRU)
+
+
+def configure(data_dir: str):
+    """Switch to another archive directory, dropping cached state."""
+    global DATA_DIR, _manifest
+    with _lock:
+        DATA_DIR = data_dir
+        _manifest = None
+        _cache.clear()
+
+
+def settled_day(trade: dict) -> str:
+    """Partition day of a settled trade: exit day if CLOSED, else entry day."""
+    if trade.get("status") == "CLOSED":
+        return (trade.get("exit_time") or "")[:10]
+    return (trade.get("entry_time") or "")[:10]
+
+
+def _manifest_path() -> str:
+    return os.path.join(DATA_DIR, "manifest.json")
+
+
+def _day_path(day: str) -> str:
+    return os.path.join(DATA_DIR, day[:7], f"{day}.json")
+
+
+def _write_json(path: str, data):
+    """Atomically replace `path` (temp file, fsync, rename)."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(data, f, default=str)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def _read_day(day: str) -> list:
+    try:
+        with open(_day_path(day), "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return []
+
+
+def _days() -> dict:
+    """The manifest's per-day entries, loading it on first use. Caller holds _lock."""
+    global _manifest
+    if _manifest is None:
+        try:
+            with open(_manifest_path(), "r") as f:
+                _manifest = json.load(f)
+        except FileNotFoundError:
+            _manifest = {"days": {}}
+    return _manifest["days"]
+
+
+# ── Writes ────────────────────────────────────
+
+def write(trades: list):
+    """Archive settled trades into their day files and update the manifest."""
+    by_day = {}
+    for trade in trades:
+        by_day.setdefault(settled_day(trade), []).append(trade)
+
+    with _lock:
+        days = _days()
+        for day, new in by_day.items():
+            merged = {t["trade_id"]: t for t in _read_day(day)}
+            merged.update((t["trade_id"], t) for t in new)
+            day_trades = sorted(merged.values(), key=lambda t: (t.get("entry_time") or "", t["trade_id"]))
+            _write_json(_day_path(day), day_trades)
+            entry_times = [t.get("entry_time") or "" for t in day_trades]
+            days[day] = {
+                "trades": len(day_trades),
+                "closed": sum(1 for t in day_trades if t.get("status") == "CLOSED"),
+                "min_entry": min(entry_times),
+                "max_entry": max(entry_times),
+            }
+            _cache.pop(day[:7], None)
+        _write_json(_manifest_path(), _manifest)
+
+
+def clear():
+    """Delete the whole archive (kill switch)."""
+    global _manifest
+    with _lock:
+        shutil.rmtree(DATA_DIR, ignore_errors=True)
+        _manifest = {"days": {}}
+        _cache.clear()
+
+
+# ── Reads ─────────────────────────────────────
+
+def archived_ids(trades: list) -> set:
+    """
+    IDs of `trades` already in the archive.  Only day files the manifest
+    lists for the trades' settlement days are read.
+    """
+    with _lock:
+        days = _days()
+        wanted = {settled_day(t) for t in trades if t.get("status") != "OPEN"} & set(days)
+    ids = {t["trade_id"] for t in trades}
+    found = set()
+    for day in wanted:
+        found.update(t["trade_id"] for t in _read_day(day) if t["trade_id"] in ids)
+    return found
+
+
+def closed_count() -> int:
+    """Number of CLOSED trades in the archive."""
+    with _lock:
+        return sum(d["closed"] for d in _days().values())
+
+
+def months() -> list:
+    """(month, min_entry, max_entry, closed) for every archived month, oldest first."""
+    with _lock:
+        summary = {}
+        for day, d in _days().items():
+            month = day[:7]
+            lo, hi, closed = summary.get(month, (d["min_entry"], d["max_entry"], 0))
+            summary[month] = (min(lo, d["min_entry"]), max(hi, d["max_entry"]), closed + d["closed"])
+    return [(month, *summary[month]) for month in sorted(summary)]
+
+
+def _read_month(month: str) -> TradeIndex:
+    trades = []
+    for path in sorted(glob.glob(os.path.join(DATA_DIR, month, f"{month}-*.json"))):
+        if path.endswith(".tmp"):
+            continue
+        with open(path, "r") as f:
+            trades.extend(json.load(f))
+    return TradeIndex(trades)
+
+
+def load_month(month: str) -> TradeIndex:
+    """Read-only index of one archived month, opened on first use and cached."""
+    with _lock:
+        index = _cache.get(month)
+        if index is not None:
+            _cache.move_to_end(month)
+            return index
+    index = _read_month(month)
+    with _lock:
+        _cache[month] = index
+        while len(_cache) > CACHE_MONTHS:
+            _cache.popitem(last=False)
+    return index
+
+
+def iter_closed():
+    """Every archived CLOSED trade in exit order, month by month (not cached)."""
+    for month, _, _, closed in months():
+        if closed:
+            for entry in _read_month(month).exits.after(None):
+                yield entry[2]
+
+
+def entries_before(hot, cursor: tuple | None = None, filters: dict | None = None):
+    """
+    Merge the hot index's entries with archived months, newest entry first,
+    (entry_time, trade_id) strictly before `cursor`.  A month is opened only
+    once the merge reaches its newest entry time, and skipped entirely when
+    all its entries are at or after the cursor.
+    """
+    pending = sorted(
+        ((hi, month) for month, lo, hi, _ in months() if cursor is None or lo <= cursor[0]),
+        reverse=True,
+    )
+    streams = []
+
+    def push(stream):
+        head = next(stream, None)
+        if head is not None:
+            streams.append([head, stream])
+
+    push(hot.iter_entries(cursor, filters))
+    while True:
+        top = max(streams, key=lambda s: s[0][:2]) if streams else None
+        while pending and (top is None or pending[0][0] >= top[0][0]):
+            push(load_month(pending.pop(0)[1]).iter_entries(cursor, filters))
+            top = max(streams, key=lambda s: s[0][:2]) if streams else None
+        if top is None:
+            return
+        yield top[0]
+        head = next(top[1], None)
+        if head is None:
+            streams.remove(top)
+        else:
+            top[0] = head
+
+
+def newest_exits(limit: int) -> list:
+    """Up to `limit` archived CLOSED trades, newest exit first."""
+    result = []
+    for month, _, _, closed in reversed(months()):
+        if len(result) >= limit:
+            break
+        if closed:
+            result.extend(load_month(month).newest_exits(limit - len(result)))
+    return result
+
+
+def exits_between(lo: str, hi: str | None) -> list:
+    """Archived CLOSED trades with lo <= exit_time < hi, newest first."""
+    result = []
+    for month, _, _, closed in reversed(months()):
+        if not closed or month < lo[:7] or (hi is not None and month > hi[:7]):
+            continue
+        result.extend(load_month(month).exits_between(lo, hi))
+    return result
@@ -0,0 +1,158 @@
+"""
+Autonomous Trading Agent — SQLite Trade Storage Engine
+
+Indexed SQLite (WAL mode) storage behind trade_store.  Each trade is one
+row: the full record is kept as a JSON document in `data`, and the fields
+the store filters and sorts on are mirrored into indexed columns.
+
+WAL lets readers run concurrently with the single writer, and every
+mutation touches only the affected rows instead of rewriting history.
+Connections are per-thread (sqlite3 objects cannot be shared).
+"""
+
+import json
+import os
+import sqlite3
+import threading
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+DB_FILE = os.path.join(DATA_DIR, "trades.db")
+
+_local = threading.local()
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS trades (
+    seq         INTEGER PRIMARY KEY AUTOINCREMENT,
+    trade_id    TEXT NOT NULL UNIQUE,
+    status      TEXT,
+    entry_time  TEXT,
+    exit_time   TEXT,
+    sector      TEXT,
+    pnl         REAL,
+    data        TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_trades_status     ON trades(status, exit_time);
+CREATE INDEX IF NOT EXISTS idx_trades_entry_time ON trades(entry_time);
+CREATE INDEX IF NOT EXISTS idx_trades_exit_time  ON trades(exit_time);
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+_UPSERT = """
+INSERT INTO trades (trade_id, status, entry_time, exit_time, sector, pnl, data)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(trade_id) DO UPDATE SET
+    status = excluded.status,
+    entry_time = excluded.entry_time,
+    exit_time = excluded.exit_time,
+    sector = excluded.sector,
+    pnl = excluded.pnl,
+    data = excluded.data
+"""
+
+
+def _connect() -> sqlite3.Connection:
+    """Return this thread's connection, (re)opening it if DB_FILE changed."""
+    conn = getattr(_local, "conn", None)
+    if conn is not None and _local.path == DB_FILE:
+        return conn
+    if conn is not None:
+        conn.close()
+
+    os.makedirs(os.path.dirname(DB_FILE), exist_ok=True)
+    conn = sqlite3.connect(DB_FILE, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(_SCHEMA)
+    _local.conn = conn
+    _local.path = DB_FILE
+    return conn
+
+
+def _row(trade: dict) -> tuple:
+    return (
+        trade["trade_id"],
+        trade.get("status"),
+        trade.get("entry_time"),
+        trade.get("exit_time"),
+        trade.get("sector"),
+        trade.get("pnl"),
+        json.dumps(trade, default=str),
+    )
+
+
+# ── Writes ────────────────────────────────────
+
+def upsert_trade(trade: dict):
+    """Insert a trade, or replace it if the trade_id already exists."""
+    conn = _connect()
+    with conn:
+        conn.execute(_UPSERT, _row(trade))
+
+
+def upsert_trades(trades: list):
+    """Insert or replace many trades in a single transaction."""
+    conn = _connect()
+    with conn:
+        conn.executemany(_UPSERT, [_row(t) for t in trades])
+
+
+def delete_trades(trade_ids: list):
+    """Delete trades by ID in a single transaction (moved to the archive)."""
+    conn = _connect()
+    with conn:
+        conn.executemany("DELETE FROM trades WHERE trade_id = ?", [(tid,) for tid in trade_ids])
+
+
+def delete_all():
+    conn = _connect()
+    with conn:
+        conn.execute("DELETE FROM trades")
+
+
+# ── Reads ─────────────────────────────────────
+
+def fetch(where: str = "", params: tuple = (), order_by: str = "seq",
+          limit: int | None = None) -> list:
+    """Return trade dicts matching an SQL WHERE clause (trusted callers only)."""
+    sql = "SELECT data FROM trades"
+    if where:
+        sql += f" WHERE {where}"
+    sql += f" ORDER BY {order_by}"
+    if limit is not None:
+        sql += " LIMIT ?"
+        params = (*params, limit)
+    return [json.loads(r[0]) for r in _connect().execute(sql, params)]
+
+
+# ── Migration ─────────────────────────────────
+
+def migrate_from_json(json_path: str) -> int:
+    """
+    One-shot import of a legacy trades.json into the database.
+    Runs only once per database (recorded in the meta table) and never
+    modifies the JSON file.  Returns the number of trades imported.
+    """
+    conn = _connect()
+    if conn.execute("SELECT 1 FROM meta WHERE key = 'migrated_from_json'").fetchone():
+        return 0
+
+    trades = []
+    if os.path.exists(json_path):
+        with open(json_path, "r") as f:
+            try:
+                trades = json.load(f)
+            except json.JSONDecodeError:
+                trades = []
+
+    with conn:
+        conn.executemany(_UPSERT, [_row(t) for t in trades if t.get("trade_id")])
+        conn.execute(
+            "INSERT INTO meta (key, value) VALUES ('migrated_from_json', ?)",
+            (str(len(trades)),),
+        )
+    if trades:
+        print(f"[TradeDB] Migrated {len(trades)} trades from {json_path}")
+    return len(trades)
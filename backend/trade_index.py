@@ -0,0 +1,388 @@
+"""
+Autonomous Trading Agent — In-Memory Trade Index
+
+Loaded model of every trade behind trade_store, so no read path touches
+the filesystem.  Maintains:
+
+  by_id        trade_id → trade dict (insertion order)
+  open         trade_id → trade dict, OPEN trades only
+  entries      DayIndex of (entry_time, trade_id) over every trade
+  exits        DayIndex of (exit_time, trade_id) over CLOSED trades
+  by_field     status/sector/symbol → value → DayIndex of (entry_time, trade_id)
+
+A DayIndex buckets its keys by day, so "today", "newest N", "since
+<cutoff>" and keyset-paginated queries are O(1) / O(log n + k) instead of
+full scans.
+
+Published indexes are immutable snapshots.  A writer calls clone() to get
+the next generation, which shares every bucket with the current one,
+applies its changes copy-on-write (each bucket and day list it touches
+is copied once, then edited in place) and then seals and swaps the new
+generation in.  The initial load is one such generation, sealed once.  Readers hold
+no lock and always see exactly one committed state.  Buckets carry the
+trade dicts themselves; by_id is shared between generations and only
+serves writers and single-trade lookups.
+
+Summary statistics (trade_stats.TradeStats) are folded in as trades
+close.  If a closed trade is later edited, the aggregates are marked
+dirty and rebuilt by seal() before the generation is published.  The
+aggregates also cover `archived` closed trades that have been moved out
+of the index (trade_archive.py); a rebuild streams those back in through
+`archived_trades`.
+"""
+
+import bisect
+from itertools import islice
+
+from trade_stats import TradeStats
+
+# Trade fields with a secondary entry-time index, for filtered pages
+PAGE_FILTERS = ("status", "sector", "symbol")
+
+
+def _day(iso: str | None) -> str:
+    return (iso or "")[:10]
+
+
+class DayIndex:
+    """
+    (key, trade_id, trade) entries sorted by (key, trade_id) and bucketed by
+    the key's day.  A copy() shares every bucket and the day list; the
+    first mutation of a shared one replaces it with a private copy, which
+    later mutations of the same generation then edit in place.  seal()
+    gives up that ownership once the generation is published.
+    """
+
+    __slots__ = ("buckets", "days", "size", "_owned", "_own_days")
+
+    def __init__(self):
+        self.buckets = {}   # day → sorted [(key, trade_id, trade)]
+        self.days = []      # sorted days present
+        self.size = 0
+        self._owned = set() # days whose bucket only this generation holds
+        self._own_days = True
+
+    def copy(self) -> "DayIndex":
+        other = DayIndex()
+        other.buckets = dict(self.buckets)
+        other.days = self.days
+        other.size = self.size
+        other._own_days = False
+        return other
+
+    def seal(self):
+        self._owned = set()
+        self._own_days = False
+
+    def _bucket(self, day: str) -> list:
+        """This generation's own bucket for `day` (created if missing)."""
+        bucket = self.buckets.get(day)
+        if bucket is None or day not in self._owned:
+            if bucket is None:
+                if not self._own_days:
+                    self.days = list(self.days)
+                    self._own_days = True
+                bisect.insort(self.days, day)
+            bucket = self.buckets[day] = list(bucket or ())
+            self._owned.add(day)
+        return bucket
+
+    def add(self, key: str, trade_id: str, trade: dict):
+        bucket = self._bucket(_day(key))
+        bucket.insert(bisect.bisect_left(bucket, (key, trade_id)), (key, trade_id, trade))
+        self.size += 1
+
+    def discard(self, key: str, trade_id: str):
+        day = _day(key)
+        bucket = self.buckets.get(day)
+        if not bucket:
+            return
+        i = bisect.bisect_left(bucket, (key, trade_id))
+        if i == len(bucket) or bucket[i][:2] != (key, trade_id):
+            return
+        self.size -= 1
+        if len(bucket) > 1:
+            del self._bucket(day)[i]
+        else:
+            del self.buckets[day]
+            self._owned.discard(day)
+            if not self._own_days:
+                self.days = list(self.days)
+                self._own_days = True
+            del self.days[bisect.bisect_left(self.days, day)]
+
+    def count_on(self, day: str) -> int:
+        return len(self.buckets.get(day, ()))
+
+    def before(self, cursor: tuple | None = None):
+        """Entries sorting strictly before `cursor` ((key, trade_id); None: all), newest first."""
+        days = self.days
+        if cursor is None:
+            last = len(days)
+        else:
+            cursor = tuple(cursor)
+            last = bisect.bisect_right(days, _day(cursor[0]))
+        for d in range(last - 1, -1, -1):
+            bucket = self.buckets[days[d]]
+            end = bisect.bisect_left(bucket, cursor) if cursor is not None and days[d] == _day(cursor[0]) else len(bucket)
+            for i in range(end - 1, -1, -1):
+                yield bucket[i]
+
+    def between(self, lo: str, hi: str | None) -> list:
+        """Entries with lo <= key < hi (hi=None: no upper bound), newest first."""
+        result = []
+        first = bisect.bisect_left(self.days, _day(lo))
+        last = bisect.bisect_right(self.days, _day(hi)) if hi is not None else len(self.days)
+        for d in range(last - 1, first - 1, -1):
+            day = self.days[d]
+            bucket = self.buckets[day]
+            start = bisect.bisect_left(bucket, (lo,)) if day == _day(lo) else 0
+            end = bisect.bisect_left(bucket, (hi,)) if hi is not None and day == _day(hi) else len(bucket)
+            result.extend(reversed(bucket[start:end]))
+        return result
+
+    def after(self, key: tuple | None) -> list:
+        """Entries sorting strictly after `key` ((key, trade_id); None: all), oldest first."""
+        if key is None:
+            return [entry for day in self.days for entry in self.buckets[day]]
+        key = tuple(key)
+        result = []
+        first = bisect.bisect_left(self.days, _day(key[0]))
+        for day in self.days[first:]:
+            bucket = self.buckets[day]
+            start = 0
+            if day == _day(key[0]):
+                start = bisect.bisect_left(bucket, key)
+                if start < len(bucket) and bucket[start][:2] == key:
+                    start += 1
+            result.extend(bucket[start:])
+        return result
+
+
+class TradeIndex:
+    def __init__(self, trades=(), stats: TradeStats | None = None,
+                 archived: int = 0, archived_trades=None):
+        """
+        Index `trades`.  `stats` is an optional checkpoint: it is caught up
+        with any trades closed after it, or discarded if it no longer matches.
+        `archived` closed trades live outside the index; `archived_trades()`
+        yields them in exit order for a rebuild.
+        """
+        self.by_id = {}
+        self.open = {}
+        self.entries = DayIndex()
+        self.exits = DayIndex()
+        self.by_field = {field: {} for field in PAGE_FILTERS}
+        self._owned = set()       # (field, value) DayIndexes private to this generation
+        self.stats = TradeStats()
+        self.stats_dirty = False
+        self.archived = archived
+        self.archived_trades = archived_trades
+        self._loading = True
+        for trade in trades:
+            self.upsert(trade)
+        self._loading = False
+        self._resume_stats(stats)
+        self.seal()
+
+    def __len__(self):
+        return len(self.by_id)
+
+    def clone(self) -> "TradeIndex":
+        """The next, writable generation; shares every untouched bucket with this one."""
+        other = TradeIndex.__new__(TradeIndex)
+        other.by_id = self.by_id
+        other.open = dict(self.open)
+        other.entries = self.entries.copy()
+        other.exits = self.exits.copy()
+        other.by_field = {field: dict(values) for field, values in self.by_field.items()}
+        other._owned = set()
+        other.stats = self.stats.copy()
+        other.stats_dirty = self.stats_dirty
+        other.archived = self.archived
+        other.archived_trades = self.archived_trades
+        other._loading = False
+        return other
+
+    def seal(self):
+        """
+        Finish a generation before publishing it: bring dirty aggregates up
+        to date and stop editing its buckets in place.
+        """
+        if self.stats_dirty:
+            self.rebuild_stats()
+        self.entries.seal()
+        self.exits.seal()
+        for field, value in self._owned:
+            index = self.by_field[field].get(value)
+            if index is not None:
+                index.seal()
+        self._owned = set()
+
+    # ── Maintenance ───────────────────────────
+
+    def upsert(self, trade: dict):
+        """Insert a trade or replace the stored version, keeping every index in sync."""
+        trade_id = trade["trade_id"]
+        old = self.by_id.get(trade_id)
+        if old is not None:
+            self._unindex(old)
+        self.by_id[trade_id] = trade
+        self._index(trade)
+
+        if self._loading:
+            return
+        was_closed = old is not None and old.get("status") == "CLOSED"
+        if trade.get("status") == "CLOSED" and not was_closed:
+            self.stats.add(trade)
+        elif was_closed and any(old.get(k) != trade.get(k) for k in ("status", "pnl", "sector", "exit_time")):
+            self.stats_dirty = True
+
+    def remove(self, trade_id: str) -> dict | None:
+        """Drop a trade from the index (archived); the aggregates keep counting it."""
+        old = self.by_id.pop(trade_id, None)
+        if old is not None:
+            self._unindex(old)
+        return old
+
+    def _field_index(self, field: str, value) -> DayIndex:
+        """This generation's own copy of the by_field index for `value`."""
+        values = self.by_field[field]
+        index = values.get(value)
+        if index is None or (field, value) not in self._owned:
+            index = index.copy() if index is not None else DayIndex()
+            values[value] = index
+            self._owned.add((field, value))
+        return index
+
+    def _index(self, trade: dict):
+        trade_id = trade["trade_id"]
+        key = trade.get("entry_time") or ""
+        if trade.get("status") == "OPEN":
+            self.open[trade_id] = trade
+        self.entries.add(key, trade_id, trade)
+        if trade.get("status") == "CLOSED":
+            self.exits.add(trade.get("exit_time") or "", trade_id, trade)
+        for field in PAGE_FILTERS:
+            self._field_index(field, trade.get(field)).add(key, trade_id, trade)
+
+    def _unindex(self, trade: dict):
+        trade_id = trade["trade_id"]
+        key = trade.get("entry_time") or ""
+        self.open.pop(trade_id, None)
+        self.entries.discard(key, trade_id)
+        if trade.get("status") == "CLOSED":
+            self.exits.discard(trade.get("exit_time") or "", trade_id)
+        for field in PAGE_FILTERS:
+            value = trade.get(field)
+            if value in self.by_field[field]:
+                index = self._field_index(field, value)
+                index.discard(key, trade_id)
+                if not index.size:
+                    del self.by_field[field][value]
+
+    def _resume_stats(self, checkpoint: TradeStats | None):
+        """Adopt a stats checkpoint, folding in newer closes, or rebuild from scratch."""
+        if checkpoint is not None:
+            newer = self.exits.after(checkpoint.last_exit)
+            if checkpoint.count + len(newer) == self.exits.size + self.archived:
+                for entry in newer:
+                    checkpoint.add(entry[2])
+                self.stats = checkpoint
+                return
+        self.rebuild_stats()
+
+    def rebuild_stats(self):
+        """Recompute the aggregates from every closed trade, in close order."""
+        self.stats = TradeStats()
+        if self.archived_trades is not None:
+            for trade in self.archived_trades():
+                self.stats.add(trade)
+        for entry in self.exits.after(None):
+            self.stats.add(entry[2])
+        self.stats_dirty = False
+
+    # ── Queries ───────────────────────────────
+
+    def summary(self) -> dict:
+        """Summary statistics over all closed trades — O(sectors), not O(trades)."""
+        if self.stats_dirty:
+            self.rebuild_stats()
+        return self.stats.summary(len(self.open))
+
+    def get(self, trade_id: str) -> dict | None:
+        return self.by_id.get(trade_id)
+
+    def all(self) -> list:
+        """Every trade in insertion order."""
+        return list(self.by_id.values())
+
+    def open_trades(self) -> list:
+        """OPEN trades, oldest entry first."""
+        return sorted(self.open.values(), key=lambda t: (t.get("entry_time") or "", t["trade_id"]))
+
+    def count_entries_on(self, day: str) -> int:
+        return self.entries.count_on(day)
+
+    def newest_entries(self, limit: int) -> list:
+        """Up to `limit` trades, newest entry_time first."""
+        return [entry[2] for entry in islice(self.entries.before(), limit)]
+
+    def newest_exits(self, limit: int) -> list:
+        """Up to `limit` closed trades, newest exit_time first."""
+        return [entry[2] for entry in islice(self.exits.before(), limit)]
+
+    def exits_since(self, cutoff: str) -> list:
+        """Closed trades with exit_time >= cutoff, newest first."""
+        return self.exits_between(cutoff, None)
+
+    def exits_between(self, lo: str, hi: str | None) -> list:
+        """Closed trades with lo <= exit_time < hi (hi=None: no upper bound), newest first."""
+        return [entry[2] for entry in self.exits.between(lo, hi)]
+
+    def settled_before(self, day: str) -> list:
+        """Trades no longer OPEN whose settlement day (see trade_archive) is before `day`."""
+        result = []
+        for d in self.exits.days[:bisect.bisect_left(self.exits.days, day)]:
+            result.extend(entry[2] for entry in self.exits.buckets[d])
+        for status, index in self.by_field["status"].items():
+            if status not in (None, "OPEN", "CLOSED"):
+                result.extend(entry[2] for entry in index.between("", day))
+        return result
+
+    def iter_entries(self, before: tuple | None = None, filters: dict | None = None):
+        """
+        (entry_time, trade_id, trade) newest entry first, strictly before the
+        `before` cursor (None: from the newest).  `filters` maps PAGE_FILTERS
+        fields to required values; the most selective field's index is walked
+        and the others are checked per trade.
+        """
+        filters = {k: v for k, v in (filters or {}).items() if v is not None}
+        index = self.entries
+        if filters:
+            candidates = [self.by_field[field].get(value) for field, value in filters.items()]
+            if any(c is None for c in candidates):
+                return
+            index = min(candidates, key=lambda c: c.size)
+        for entry in index.before(before):
+            if all(entry[2].get(field) == value for field, value in filters.items()):
+                yield entry
+
+    def page_entries(self, before: tuple | None = None, limit: int = 100,
+                     filters: dict | None = None) -> tuple:
+        """One keyset page of iter_entries(); see take_page()."""
+        return take_page(self.iter_entries(before, filters), limit)
+
+
+def take_page(entries, limit: int) -> tuple:
+    """
+    Take up to `limit` trades from a newest-first (key, trade_id, trade)
+    stream.  Returns (trades, next_cursor); next_cursor is None on the last page.
+    """
+    page = []
+    for key, trade_id, trade in entries:
+        if len(page) == limit:
+            last = page[-1]
+            return page, (last.get("entry_time") or "", last["trade_id"])
+        page.append(trade)
+    return page, None
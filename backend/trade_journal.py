@@ -0,0 +1,322 @@
+"""
+Autonomous Trading Agent — Append-Only Trade Journal
+
+Journal storage backend for trade_store: every mutation is one JSON line
+appended to the current segment ("open", "update", "close" or "archive"
+plus the full trade record), so a write costs O(1) regardless of history size and a
+crash can at worst lose a torn final line — never truncate history.
+
+Durability uses group commit: appends are queued, and a flusher thread
+writes and fsyncs everything that queued up while the previous fsync was
+in flight (optionally lingering GROUP_COMMIT_WINDOW seconds for more) in
+one go; wait_durable() blocks a writer until its events are on disk, and
+raises OSError if their batch could not be written.  A torn record left
+by a crash or a failed write is cut off before the segment is appended
+to again, so it never swallows the next event.
+
+On startup the state is rebuilt from the latest snapshot plus a replay
+of the segments written after it.  Compaction (rotate() + write_snapshot())
+folds the journal into a fresh snapshot and deletes the old segments; it
+is driven in the background by maybe_compact().
+"""
+
+import glob
+import json
+import os
+import threading
+import time
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+
+GROUP_COMMIT_WINDOW = 0.0     # extra seconds to linger for more appends before each fsync
+COMPACT_EVERY = 5000          # events per segment before compaction kicks in
+
+_cond = threading.Condition()     # guards the queue and sequence numbers
+_io_lock = threading.Lock()       # guards the open segment file
+_pending = []
+_next_seq = 0
+_taken_seq = 0                    # newest sequence number handed to the flusher
+_durable_seq = 0                  # newest sequence number written and fsynced
+_failed = {}                      # sequence number → error of a batch that was not written
+_file = None
+_generation = 0
+_segment_events = 0
+_flusher = None
+_compacting = False
+
+
+def _segment_path(generation: int) -> str:
+    return os.path.join(DATA_DIR, f"trades.journal.{generation:06d}")
+
+
+def _snapshot_path() -> str:
+    return os.path.join(DATA_DIR, "trades.snapshot.json")
+
+
+def _segments() -> list:
+    """(generation, path) of every journal segment on disk, oldest first."""
+    found = []
+    for path in glob.glob(os.path.join(DATA_DIR, "trades.journal.*")):
+        suffix = path.rsplit(".", 1)[-1]
+        if suffix.isdigit():
+            found.append((int(suffix), path))
+    return sorted(found)
+
+
+def configure(data_dir: str):
+    """Switch to another data directory, closing the current segment."""
+    global DATA_DIR, _file
+    with _io_lock:
+        _flush_locked()   # queued events belong to the old directory
+        if _file is not None:
+            _file.close()
+            _file = None
+    DATA_DIR = data_dir
+
+
+# ── Startup ───────────────────────────────────
+
+def load(legacy_json: str | None = None) -> list:
+    """
+    Rebuild the trade list from the snapshot plus a replay of newer segments
+    and open the latest segment for appending.  If no journal state exists
+    yet, `legacy_json` (a trades.json list) seeds the first snapshot.
+    """
+    global _file, _generation, _segment_events
+    os.makedirs(DATA_DIR, exist_ok=True)
+    with _io_lock:
+        _flush_locked()   # a reload replays every event already queued
+
+    snapshot_gen, trades = 0, []
+    if os.path.exists(_snapshot_path()):
+        with open(_snapshot_path(), "r") as f:
+            snapshot = json.load(f)
+        snapshot_gen, trades = snapshot["generation"], snapshot["trades"]
+    elif not _segments() and legacy_json and os.path.exists(legacy_json):
+        with open(legacy_json, "r") as f:
+            try:
+                trades = json.load(f)
+            except json.JSONDecodeError:
+                trades = []
+        write_snapshot(trades, 0)
+        if trades:
+            print(f"[TradeJournal] Seeded snapshot with {len(trades)} trades from {legacy_json}")
+
+    by_id = {t["trade_id"]: t for t in trades}
+    generation, events = snapshot_gen, 0
+    for gen, path in _segments():
+        if gen < snapshot_gen:
+            os.remove(path)   # already folded into the snapshot
+            continue
+        generation, events = gen, 0
+        with open(path, "rb") as f:
+            for line in f:
+                try:
+                    if not line.endswith(b"\n"):
+                        raise ValueError("incomplete line")
+                    event = json.loads(line)
+                except ValueError:
+                    print(f"[TradeJournal] Ignoring torn record in {path}")
+                    continue
+                trade = event["trade"]
+                if event["op"] == "archive":
+                    by_id.pop(trade["trade_id"], None)   # moved to trade_archive
+                else:
+                    by_id[trade["trade_id"]] = trade
+                events += 1
+
+    with _io_lock:
+        if _file is not None:
+            _file.close()
+            _file = None
+        _generation, _segment_events = generation, events
+        _reopen()
+    return list(by_id.values())
+
+
+def _cut_torn_tail(path: str):
+    """Truncate a segment after its last complete line (drops a torn final record)."""
+    try:
+        f = open(path, "rb+")
+    except FileNotFoundError:
+        return
+    with f:
+        end = pos = f.seek(0, os.SEEK_END)
+        while pos > 0:
+            step = min(pos, 1 << 16)
+            f.seek(pos - step)
+            newline = f.read(step).rfind(b"\n")
+            if newline >= 0:
+                pos -= step - newline - 1
+                break
+            pos -= step
+        if pos < end:
+            f.truncate(pos)
+            f.flush()
+            os.fsync(f.fileno())
+            print(f"[TradeJournal] Cut a torn record of {end - pos} bytes from {path}")
+
+
+def _reopen():
+    """Open the current segment for appending, repairing its tail first. Caller holds _io_lock."""
+    global _file
+    path = _segment_path(_generation)
+    _cut_torn_tail(path)
+    _file = open(path, "a")
+
+
+# ── Appends (group commit) ────────────────────
+
+def append(events: list) -> int:
+    """
+    Queue (op, trade) events for the journal.  Returns a sequence number to
+    pass to wait_durable().  Events are written in the order appended.
+    """
+    global _next_seq, _segment_events, _flusher
+    lines = [json.dumps({"op": op, "trade": trade}, default=str) + "\n" for op, trade in events]
+    with _cond:
+        _pending.extend(lines)
+        _next_seq += 1
+        seq = _next_seq
+        _segment_events += len(lines)
+        if _flusher is None:
+            _flusher = threading.Thread(target=_flush_loop, daemon=True)
+            _flusher.start()
+        _cond.notify_all()
+    return seq
+
+
+def wait_durable(seq: int):
+    """
+    Block until every event up to `seq` has been fsynced.  Raises OSError
+    if the batch holding `seq` could not be written.
+    """
+    with _cond:
+        while True:
+            error = _failed.pop(seq, None)
+            if error is not None:
+                raise OSError(f"Trade journal write failed: {error}") from error
+            if _durable_seq >= seq:
+                return
+            _cond.wait()
+
+
+def _flush_loop():
+    while True:
+        with _cond:
+            while _taken_seq == _next_seq:
+                _cond.wait()
+        if GROUP_COMMIT_WINDOW:
+            time.sleep(GROUP_COMMIT_WINDOW)
+        try:
+            with _io_lock:
+                _flush_locked()
+        except Exception as e:   # never let the flusher die: waiters would block forever
+            print(f"[TradeJournal] Flusher error: {e}")
+
+
+def _flush_locked():
+    """
+    Write and fsync everything queued so far; on failure the batch's
+    waiters get the error instead.  Caller holds _io_lock.
+    """
+    global _pending, _taken_seq, _durable_seq, _file
+    with _cond:
+        batch, _pending = _pending, []
+        first, last = _taken_seq + 1, _next_seq
+        _taken_seq = last
+    if first > last:
+        return
+    error = None
+    try:
+        if batch:
+            if _file is None:
+                _reopen()
+            _file.write("".join(batch))
+            _file.flush()
+            os.fsync(_file.fileno())
+    except Exception as e:
+        error = e
+        print(f"[TradeJournal] Write error, {len(batch)} events not written: {e}")
+        # Part of the batch may be on disk: cut it off before the next batch
+        try:
+            if _file is not None:
+                _file.close()
+        except Exception:
+            pass
+        _file = None
+        try:
+            _reopen()
+        except Exception as reopen_error:
+            print(f"[TradeJournal] Could not reopen the journal: {reopen_error}")
+    with _cond:
+        if error is None:
+            _durable_seq = last
+        else:
+            _failed.update((seq, error) for seq in range(first, last + 1))
+        _cond.notify_all()
+
+
+# ── Compaction ────────────────────────────────
+
+def segment_events() -> int:
+    return _segment_events
+
+
+def rotate() -> int:
+    """
+    Flush the current segment and start a new one.  Returns the new
+    generation: a snapshot of the state *now* covers every older segment.
+    Callers must hold their write lock so no append races the rotation.
+    """
+    global _file, _generation, _segment_events
+    with _io_lock:
+        _flush_locked()
+        if _file is not None:
+            _file.close()
+            _file = None
+        _generation += 1
+        _segment_events = 0
+        _file = open(_segment_path(_generation), "a")
+        return _generation
+
+
+def write_snapshot(trades: list, generation: int):
+    """Atomically replace the snapshot, then drop the segments it covers."""
+    os.makedirs(DATA_DIR, exist_ok=True)
+    tmp = _snapshot_path() + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump({"generation": generation, "trades": trades}, f, default=str)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, _snapshot_path())
+    for gen, path in _segments():
+        if gen < generation:
+            os.remove(path)
+
+
+def maybe_compact(take_snapshot):
+    """
+    Start a background compaction once the current segment holds
+    COMPACT_EVERY events.  `take_snapshot()` must, under the caller's write
+    lock, call rotate() and return (generation, trades).
+    """
+    global _compacting
+    with _cond:
+        if _compacting or _segment_events < COMPACT_EVERY:
+            return
+        _compacting = True
+
+    def run():
+        global _compacting
+        try:
+            generation, trades = take_snapshot()
+            write_snapshot(trades, generation)
+            print(f"[TradeJournal] Compacted {len(trades)} trades into snapshot generation {generation}")
+        except Exception as e:
+            print(f"[TradeJournal] Compaction error: {e}")
+        finally:
+            with _cond:
+                _compacting = False
+
+    threading.Thread(target=run, daemon=True).start()
@@ -0,0 +1,296 @@
+"""
+Autonomous Trading Agent — Incremental Trade Statistics
+
+Running aggregates over closed trades, updated in O(1) as each trade
+closes, so get_trades_summary() no longer rescans history:
+
+  - Welford mean/variance of trade P&L (for the simplified Sharpe ratio)
+  - win/loss counts, sums and extremes
+  - running cumulative P&L, peak and max drawdown (in close order)
+  - per-sector trade count and P&L
+  - per-day P&L, trade and win counts as prefix sums (DailyPnl), so any
+    date window is two binary searches and a subtraction
+
+Aggregates round-trip through to_checkpoint()/from_checkpoint() so a
+restart can resume from disk instead of replaying every closed trade.
+"""
+
+import bisect
+import copy
+import math
+
+
+class DailyPnl:
+    """
+    Closed-trade P&L, trade count and win count bucketed by exit day, stored
+    as prefix sums over the sorted days: pnl[i] is the total P&L of
+    days[0..i].  Closes arrive in time order, so adding is O(1) amortized;
+    a close dated before the newest day costs O(days) (only on rebuilds).
+
+    Only the newest day's totals still change, so they are kept apart in
+    `last`; the settled days before it live in append-only lists that
+    copy() shares between trade index generations.  A generation sees the
+    first `n` entries of the lists and only ever appends past them.
+    """
+
+    def __init__(self):
+        self.days = []      # settled days (shared between generations)
+        self.pnl = []
+        self.trades = []
+        self.wins = []
+        self.n = 0          # entries of the lists that belong to this generation
+        self.last = None    # (day, pnl, trades, wins) prefix totals through the newest day
+
+    def add(self, day: str, pnl: float, win: bool):
+        w = 1 if win else 0
+        last = self.last
+        if last is not None and day == last[0]:
+            self.last = (day, last[1] + pnl, last[2] + 1, last[3] + w)
+            return
+        if last is None or day > last[0]:
+            if last is not None:
+                self._settle(last)
+            prev = last or (None, 0.0, 0, 0)
+            self.last = (day, prev[1] + pnl, prev[2] + 1, prev[3] + w)
+            return
+
+        # Out-of-order day: insert (if new) and shift every later prefix
+        days, pnls, trades, wins = self.to_lists()
+        i = bisect.bisect_left(days, day)
+        if days[i] != day:
+            days.insert(i, day)
+            pnls.insert(i, pnls[i - 1] if i else 0.0)
+            trades.insert(i, trades[i - 1] if i else 0)
+            wins.insert(i, wins[i - 1] if i else 0)
+        for j in range(i, len(days)):
+            pnls[j] += pnl
+            trades[j] += 1
+            wins[j] += w
+        self._load(days, pnls, trades, wins)
+
+    def _settle(self, entry: tuple):
+        """Append a day that is no longer the newest to this generation's lists."""
+        if len(self.days) != self.n:
+            # Another generation already appended past our view: stop sharing
+            self.days, self.pnl, self.trades, self.wins = (
+                self.days[:self.n], self.pnl[:self.n], self.trades[:self.n], self.wins[:self.n])
+        self.days.append(entry[0])
+        self.pnl.append(entry[1])
+        self.trades.append(entry[2])
+        self.wins.append(entry[3])
+        self.n += 1
+
+    def _load(self, days: list, pnls: list, trades: list, wins: list):
+        """Take over full prefix lists (newest day included) as this generation's own."""
+        if days:
+            self.last = (days[-1], pnls[-1], trades[-1], wins[-1])
+            self.days, self.pnl, self.trades, self.wins = days[:-1], pnls[:-1], trades[:-1], wins[:-1]
+        else:
+            self.last = None
+            self.days, self.pnl, self.trades, self.wins = [], [], [], []
+        self.n = len(self.days)
+
+    def copy(self) -> "DailyPnl":
+        """The next generation's series: shares the settled-day lists, O(1)."""
+        other = DailyPnl()
+        other.days, other.pnl, other.trades, other.wins = self.days, self.pnl, self.trades, self.wins
+        other.n = self.n
+        other.last = self.last
+        return other
+
+    def to_lists(self) -> tuple:
+        """(days, pnl, trades, wins) as new full lists, newest day included."""
+        n = self.n
+        lists = (self.days[:n], self.pnl[:n], self.trades[:n], self.wins[:n])
+        if self.last is not None:
+            for values, value in zip(lists, self.last):
+                values.append(value)
+        return lists
+
+    @classmethod
+    def from_lists(cls, days: list, pnl: list, trades: list, wins: list) -> "DailyPnl":
+        daily = cls()
+        daily._load(list(days), list(pnl), list(trades), list(wins))
+        return daily
+
+    def __len__(self) -> int:
+        return self.n + (self.last is not None)
+
+    def _day_at(self, i: int) -> str:
+        return self.days[i] if i < self.n else self.last[0]
+
+    def _count_before(self, day: str, inclusive: bool) -> int:
+        """Number of days before `day` (or at it, if inclusive)."""
+        settled = (bisect.bisect_right if inclusive else bisect.bisect_left)(self.days, day, 0, self.n)
+        last = self.last is not None and (self.last[0] <= day if inclusive else self.last[0] < day)
+        return settled + last
+
+    def _bounds(self, start: str | None, end: str | None) -> tuple:
+        """Index range [lo, hi] of days within start..end (inclusive, YYYY-MM-DD)."""
+        lo = self._count_before(start, False) if start else 0
+        hi = (self._count_before(end, True) if end else len(self)) - 1
+        return lo, hi
+
+    def _at(self, i: int) -> tuple:
+        if i < 0:
+            return 0.0, 0, 0
+        if i < self.n:
+            return self.pnl[i], self.trades[i], self.wins[i]
+        return self.last[1:]
+
+    def window(self, start: str | None = None, end: str | None = None) -> dict:
+        """Totals for closes between start and end days (inclusive) in O(log days)."""
+        lo, hi = self._bounds(start, end)
+        if hi < lo:
+            pnl, trades, wins = 0.0, 0, 0
+        else:
+            top, before = self._at(hi), self._at(lo - 1)
+            pnl, trades, wins = top[0] - before[0], top[1] - before[1], top[2] - before[2]
+        return {
+            "pnl": round(pnl, 2),
+            "trades": trades,
+            "wins": wins,
+            "losses": trades - wins,
+            "win_rate": round(wins / trades * 100, 1) if trades else 0,
+        }
+
+    def series(self, start: str | None = None, end: str | None = None) -> list:
+        """One entry per trading day with closes between start and end, oldest first."""
+        lo, hi = self._bounds(start, end)
+        result = []
+        for i in range(lo, hi + 1):
+            prev, at = self._at(i - 1), self._at(i)
+            result.append({
+                "date": self._day_at(i),
+                "pnl": round(at[0] - prev[0], 2),
+                "trades": at[1] - prev[1],
+                "wins": at[2] - prev[2],
+            })
+        return result
+
+
+class TradeStats:
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.total = 0.0
+        self.wins = 0
+        self.win_sum = 0.0
+        self.max_win = None
+        self.losses = 0
+        self.loss_sum = 0.0
+        self.max_loss = None
+        self.cumulative = 0.0
+        self.peak = 0.0
+        self.max_drawdown = 0.0
+        self.sectors = {}          # sector → [trades, pnl]
+        self.daily = DailyPnl()
+        self.last_exit = None      # (exit_time, trade_id) of the newest trade included
+
+    def add(self, trade: dict):
+        """Fold one closed trade into the aggregates."""
+        pnl = trade.get("pnl") or 0
+
+        self.count += 1
+        delta = pnl - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (pnl - self.mean)
+        self.total += pnl
+
+        if pnl > 0:
+            self.wins += 1
+            self.win_sum += pnl
+            self.max_win = pnl if self.max_win is None else max(self.max_win, pnl)
+        else:
+            self.losses += 1
+            self.loss_sum += pnl
+            self.max_loss = pnl if self.max_loss is None else min(self.max_loss, pnl)
+
+        self.cumulative += pnl
+        self.peak = max(self.peak, self.cumulative)
+        self.max_drawdown = max(self.max_drawdown, self.peak - self.cumulative)
+
+        acc = self.sectors.setdefault(trade.get("sector", "Unknown"), [0, 0.0])
+        acc[0] += 1
+        acc[1] += pnl
+
+        self.daily.add((trade.get("exit_time") or "")[:10], pnl, pnl > 0)
+
+        key = (trade.get("exit_time") or "", trade["trade_id"])
+        if self.last_exit is None or key > self.last_exit:
+            self.last_exit = key
+
+    def copy(self) -> "TradeStats":
+        """The next trade index generation's aggregates (settled daily P&L is shared)."""
+        other = copy.copy(self)
+        other.sectors = {k: list(v) for k, v in self.sectors.items()}
+        other.daily = self.daily.copy()
+        return other
+
+    def summary(self, open_count: int) -> dict:
+        """Summary dict in the shape of trade_store.get_trades_summary()."""
+        if not self.count:
+            return {
+                "total_trades": 0,
+                "open_trades": open_count,
+                "wins": 0,
+                "losses": 0,
+                "win_rate": 0,
+                "total_pnl": 0,
+                "avg_pnl": 0,
+                "max_win": 0,
+                "max_loss": 0,
+                "avg_win": 0,
+                "avg_loss": 0,
+                "sharpe_ratio": 0,
+                "max_drawdown": 0,
+                "sector_breakdown": {},
+            }
+
+        # Sharpe ratio (simplified: mean / sample std of trade P&L)
+        std = math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else 1
+        avg = self.total / self.count
+
+        return {
+            "total_trades": self.count,
+            "open_trades": open_count,
+            "wins": self.wins,
+            "losses": self.losses,
+            "win_rate": round(self.wins / self.count * 100, 1),
+            "total_pnl": round(self.total, 2),
+            "avg_pnl": round(avg, 2),
+            "max_win": round(self.max_win, 2) if self.wins else 0,
+            "max_loss": round(self.max_loss, 2) if self.losses else 0,
+            "avg_win": round(self.win_sum / self.wins, 2) if self.wins else 0,
+            "avg_loss": round(self.loss_sum / self.losses, 2) if self.losses else 0,
+            "sharpe_ratio": round(avg / std, 2) if std > 0 else 0,
+            "max_drawdown": round(self.max_drawdown, 2),
+            "sector_breakdown": {
+                sector: {"trades": n, "pnl": round(pnl, 2)}
+                for sector, (n, pnl) in self.sectors.items()
+            },
+        }
+
+    # ── Checkpoints ───────────────────────────
+
+    def to_checkpoint(self) -> dict:
+        state = dict(vars(self))
+        state["sectors"] = {k: list(v) for k, v in self.sectors.items()}
+        state["last_exit"] = list(self.last_exit) if self.last_exit else None
+        state["daily"] = dict(zip(("days", "pnl", "trades", "wins"), self.daily.to_lists()))
+        return state
+
+    @classmethod
+    def from_checkpoint(cls, state: dict) -> "TradeStats":
+        stats = cls()
+        for key in vars(stats):
+            if key in state:
+                setattr(stats, key, state[key])
+        stats.sectors = {k: list(v) for k, v in stats.sectors.items()}
+        stats.last_exit = tuple(stats.last_exit) if stats.last_exit else None
+        lists = [(state.get("daily") or {}).get(key, []) for key in ("days", "pnl", "trades", "wins")]
+        if len({len(v) for v in lists}) > 1 or (lists[2][-1] if lists[2] else 0) != stats.count:
+            raise ValueError("inconsistent daily P&L checkpoint")
+        stats.daily = DailyPnl.from_lists(*lists)
+        return stats
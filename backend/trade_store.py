@@ -1,20 +1,127 @@
 """
 Autonomous Trading Agent — Persistent Trade Store
 
-JSON-file-based storage for all trades placed by the agent.
+Persistent storage for all trades placed by the agent.
 Supports save, update, query, and summary operations.
+
+Backed by SQLite (trade_db.py) by default.  TRADE_STORE_BACKEND=journal
+selects the append-only journal (trade_journal.py) and =json the legacy
+whole-file trades.json store.  On first use the SQLite and journal
+backends import any existing trades.json once.
+
+All trades are loaded once into an in-memory TradeIndex (trade_index.py).
+Writes go through to the backend first, are applied to a copy-on-write
+clone of the index and then published by swapping the module's index
+reference.  Reads are served entirely from memory without locks: each
+reader works on whichever immutable index generation was current when
+it started, so it can never observe a half-applied write.
+
+The backend and index only hold the hot partition: open trades plus
+anything settled today.  roll_over() (run by the scheduler each cycle)
+moves older settled trades into immutable day files (trade_archive.py);
+history queries open archived months lazily, only when their date range
+is reached.
 """
 
 import json
 import os
 import uuid
 import threading
-from datetime import datetime
+from datetime import datetime, timedelta
+
+import columnar_store
+import metrics
+import trade_archive
+import trade_db
+import trade_journal
+from trade_index import TradeIndex, take_page
+from trade_stats import TradeStats
 
 DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
 TRADES_FILE = os.path.join(DATA_DIR, "trades.json")
+STATS_FILE = os.path.join(DATA_DIR, "trade_stats.json")
+
+# Checkpoint the summary aggregates after this many new closes
+CHECKPOINT_EVERY = 20
+
+# Storage backend: "sqlite" (indexed, WAL — default), "journal" (append-only
+# JSON lines + snapshots) or "json" (legacy whole-file)
+BACKEND = os.getenv("TRADE_STORE_BACKEND", "sqlite").lower()
 
+# _lock serializes writers (read-modify-write + disk I/O + publish).
+# Readers take no lock: they read the published _index generation.
 _lock = threading.Lock()
+_load_lock = threading.Lock()
+_index = None   # TradeIndex, loaded from the backend on first use; replaced on every commit
+_checkpointed = 0   # stats.count at the last checkpoint
+
+LATENCY = metrics.histogram(
+    "trade_store_seconds", "Latency of trade store reads and writes", ("op",),
+    buckets=(0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0),
+)
+
+
+def configure(data_dir: str | None = None, backend: str | None = None):
+    """Point the store at another data directory and/or backend (benchmarks, load tests)."""
+    global DATA_DIR, TRADES_FILE, STATS_FILE, BACKEND, _index
+    if data_dir is not None:
+        DATA_DIR = data_dir
+        TRADES_FILE = os.path.join(data_dir, "trades.json")
+        STATS_FILE = os.path.join(data_dir, "trade_stats.json")
+        trade_db.DATA_DIR = data_dir
+        trade_db.DB_FILE = os.path.join(data_dir, "trades.db")
+        trade_journal.configure(data_dir)
+        trade_archive.configure(os.path.join(data_dir, "archive"))
+    if backend is not None:
+        if backend not in ("sqlite", "journal", "json"):
+            raise ValueError("backend must be 'sqlite', 'journal' or 'json'")
+        BACKEND = backend
+    _index = None
+
+
+def _get_index() -> TradeIndex:
+    """Return the in-memory index, loading it from the backend on first use."""
+    global _index, _checkpointed
+    index = _index
+    if index is None:
+        with _load_lock:
+            if _index is None:
+                if BACKEND == "sqlite":
+                    # One-shot import of a legacy trades.json
+                    trade_db.migrate_from_json(TRADES_FILE)
+                    trades = trade_db.fetch()
+                elif BACKEND == "journal":
+                    # Snapshot + replay; seeds from a legacy trades.json once
+                    trades = trade_journal.load(TRADES_FILE)
+                else:
+                    trades = _read_trades()
+                trades = _drop_archived(trades)
+                _index = TradeIndex(trades, stats=_read_stats_checkpoint(),
+                                    archived=trade_archive.closed_count(),
+                                    archived_trades=trade_archive.iter_closed)
+                _checkpointed = _index.stats.count
+            index = _index
+    return index
+
+
+def _drop_archived(trades: list) -> list:
+    """
+    Finish a roll-over interrupted between writing the archive and deleting
+    from the backend: remove trades the archive already holds from the hot
+    store, so they are not counted both in the index and in the archive.
+    """
+    ids = trade_archive.archived_ids(trades)
+    if not ids:
+        return trades
+    kept = [t for t in trades if t["trade_id"] not in ids]
+    if BACKEND == "sqlite":
+        trade_db.delete_trades(list(ids))
+    elif BACKEND == "journal":
+        trade_journal.wait_durable(trade_journal.append([("archive", t) for t in trades if t["trade_id"] in ids]))
+    else:
+        _write_trades(kept)
+    print(f"[TradeStore] Dropped {len(ids)} trades already archived from the hot store")
+    return kept
 
 
 def _ensure_file():
@@ -34,11 +141,158 @@ def _read_trades() -> list:
 
 
 def _write_trades(trades: list):
+    """Atomically replace trades.json (write a temp file, fsync, rename)."""
     _ensure_file()
-    with open(TRADES_FILE, "w") as f:
+    tmp = TRADES_FILE + ".tmp"
+    with open(tmp, "w") as f:
         json.dump(trades, f, indent=2, default=str)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, TRADES_FILE)
 
 
+def _read_stats_checkpoint() -> TradeStats | None:
+    if not os.path.exists(STATS_FILE):
+        return None
+    try:
+        with open(STATS_FILE, "r") as f:
+            return TradeStats.from_checkpoint(json.load(f))
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def _write_stats_checkpoint(stats: TradeStats):
+    """Atomically replace the stats checkpoint. Caller holds _lock."""
+    global _checkpointed
+    os.makedirs(DATA_DIR, exist_ok=True)
+    tmp = STATS_FILE + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(stats.to_checkpoint(), f)
+    os.replace(tmp, STATS_FILE)
+    _checkpointed = stats.count
+
+
+def _commit(index: TradeIndex, changed: list) -> int:
+    """
+    Write-through: persist new/changed trade dicts, then apply them to a
+    clone of `index` (the current generation) and publish the clone.
+    Caller holds _lock.  Stored dicts are never mutated in place — changes
+    always arrive as new dicts — so a failed write leaves the index untouched.
+
+    The journal backend only queues its events here; the caller passes the
+    returned ticket to _finish() after releasing _lock, so concurrent writers
+    share one group-commit fsync instead of queueing behind each other.
+    """
+    ticket = 0
+    if BACKEND == "sqlite":
+        trade_db.upsert_trades(changed)
+    elif BACKEND == "journal":
+        events = []
+        for trade in changed:
+            old = index.get(trade["trade_id"])
+            if old is None:
+                op = "open"
+            elif trade.get("status") == "CLOSED" and old.get("status") != "CLOSED":
+                op = "close"
+            else:
+                op = "update"
+            events.append((op, trade))
+        ticket = trade_journal.append(events)
+    else:
+        by_id = {t["trade_id"]: t for t in changed}
+        trades = [by_id.pop(t["trade_id"], t) for t in index.all()]
+        _write_trades(trades + list(by_id.values()))
+
+    global _index
+    closes = [
+        t for t in changed
+        if t.get("status") == "CLOSED" and (index.get(t["trade_id"]) or {}).get("status") != "CLOSED"
+    ]
+    index = index.clone()
+    for trade in changed:
+        index.upsert(trade)
+    rebuilt = index.stats_dirty
+    index.seal()
+    _index = index   # publish: one reference swap
+    columnar_store.append("trades", closes)
+
+    # An edited closed trade rebuilt the aggregates: the old checkpoint has the
+    # right count but stale sums, so replace it now rather than CHECKPOINT_EVERY closes later
+    if rebuilt or index.stats.count - _checkpointed >= CHECKPOINT_EVERY:
+        _write_stats_checkpoint(index.stats)
+    return ticket
+
+
+def _finish(ticket: int):
+    """
+    Wait for a journal commit to become durable; compact in the background
+    and write out buffered columnar rows if due.  Called without _lock.
+    """
+    global _index
+    if ticket:
+        try:
+            trade_journal.wait_durable(ticket)
+        except OSError:
+            # The published index holds events that never reached the disk:
+            # drop it so the next read reloads what the journal really has
+            with _lock:
+                _index = None
+            raise
+        trade_journal.maybe_compact(_journal_snapshot)
+    columnar_store.flush_if_due()
+
+
+def _journal_snapshot() -> tuple:
+    """Rotate the journal and capture the matching state (used by compaction)."""
+    with _lock:
+        generation = trade_journal.rotate()
+        return generation, _get_index().all()
+
+
+@LATENCY.timed(op="roll_over")
+def roll_over() -> int:
+    """
+    Move trades settled before today out of the hot partition into the
+    archive: day files first, then delete from the backend, then publish
+    an index without them.  Returns the number of trades archived.
+    """
+    global _index
+    today = datetime.now().strftime("%Y-%m-%d")
+    ticket = 0
+    with _lock:
+        index = _get_index()
+        due = index.settled_before(today)
+        if not due:
+            return 0
+        trade_archive.write(due)
+
+        ids = {t["trade_id"] for t in due}
+        if BACKEND == "sqlite":
+            trade_db.delete_trades(list(ids))
+        elif BACKEND == "journal":
+            ticket = trade_journal.append([("archive", t) for t in due])
+        else:
+            _write_trades([t for t in index.all() if t["trade_id"] not in ids])
+
+        index = index.clone()
+        for trade_id in ids:
+            index.remove(trade_id)
+        index.archived += sum(1 for t in due if t.get("status") == "CLOSED")
+        index.seal()
+        _index = index
+        # A fresh checkpoint lets the next load resume without reading archives
+        _write_stats_checkpoint(index.stats)
+    _finish(ticket)
+    print(f"[TradeStore] Archived {len(due)} settled trades")
+    return len(due)
+
+
+def _read(fn):
+    """Run a query against the current index generation; return copies."""
+    return [dict(t) for t in fn(_get_index())]
+
+
+@LATENCY.timed(op="save_trade")
 def save_trade(trade: dict) -> dict:
     """Save a new trade record. Returns the saved trade with generated ID."""
     trade["trade_id"] = str(uuid.uuid4())[:8]
@@ -51,168 +305,168 @@ def save_trade(trade: dict) -> dict:
     trade["pnl_percent"] = None
 
     with _lock:
-        trades = _read_trades()
-        trades.append(trade)
-        _write_trades(trades)
+        ticket = _commit(_get_index(), [dict(trade)])
+    _finish(ticket)
 
     return trade
 
 
+@LATENCY.timed(op="update_trade")
 def update_trade(trade_id: str, updates: dict) -> dict | None:
     """Update an existing trade by ID. Returns updated trade or None."""
     with _lock:
-        trades = _read_trades()
-        for trade in trades:
-            if trade["trade_id"] == trade_id:
-                trade.update(updates)
-                _write_trades(trades)
-                return trade
-    return None
-
-
+        index = _get_index()
+        trade = index.get(trade_id)
+        if trade is None:
+            return None
+        trade = {**trade, **updates}
+        ticket = _commit(index, [trade])
+    _finish(ticket)
+    return dict(trade)
+
+
+@LATENCY.timed(op="update_trades")
+def update_trades(updates: dict, expect_status: str | None = None) -> list:
+    """
+    Apply many updates in one write.
+    `updates` maps trade_id → dict of fields. With `expect_status`, a trade
+    is only updated if it still has that status (changes computed from an
+    earlier read never overwrite a trade closed since).  Returns the
+    updated trades.
+    """
+    if not updates:
+        return []
+    with _lock:
+        index = _get_index()
+        updated = []
+        for trade_id, change in updates.items():
+            trade = index.get(trade_id)
+            if not change or trade is None:
+                continue
+            if expect_status is not None and trade.get("status") != expect_status:
+                continue
+            updated.append({**trade, **change})
+        ticket = _commit(index, updated) if updated else 0
+    _finish(ticket)
+    return [dict(t) for t in updated]
+
+
+def _apply_close(trade: dict, exit_price: float, exit_reason: str):
+    """Fill exit fields and P&L on an open trade dict in place."""
+    entry = trade["entry_price"]
+    qty = trade.get("quantity", 1)
+    pnl = (exit_price - entry) * qty
+    pnl_pct = ((exit_price - entry) / entry) * 100 if entry > 0 else 0
+
+    trade["exit_price"] = round(exit_price, 2)
+    trade["exit_time"] = datetime.now().isoformat()
+    trade["exit_reason"] = exit_reason
+    trade["pnl"] = round(pnl, 2)
+    trade["pnl_percent"] = round(pnl_pct, 2)
+    trade["status"] = "CLOSED"
+
+
+@LATENCY.timed(op="close_trade")
 def close_trade(trade_id: str, exit_price: float, exit_reason: str) -> dict | None:
     """Close a trade with exit price and reason. Calculates P&L."""
     with _lock:
-        trades = _read_trades()
-        for trade in trades:
-            if trade["trade_id"] == trade_id and trade["status"] == "OPEN":
-                entry = trade["entry_price"]
-                qty = trade.get("quantity", 1)
-                pnl = (exit_price - entry) * qty
-                pnl_pct = ((exit_price - entry) / entry) * 100 if entry > 0 else 0
-
-                trade["exit_price"] = round(exit_price, 2)
-                trade["exit_time"] = datetime.now().isoformat()
-                trade["exit_reason"] = exit_reason
-                trade["pnl"] = round(pnl, 2)
-                trade["pnl_percent"] = round(pnl_pct, 2)
-                trade["status"] = "CLOSED"
-                _write_trades(trades)
-                return trade
-    return None
-
-
+        index = _get_index()
+        trade = index.get(trade_id)
+        if trade is None or trade["status"] != "OPEN":
+            return None
+        trade = dict(trade)
+        _apply_close(trade, exit_price, exit_reason)
+        ticket = _commit(index, [trade])
+    _finish(ticket)
+    return dict(trade)
+
+
+@LATENCY.timed(op="get_open_trades")
 def get_open_trades() -> list:
     """Get all trades with status OPEN."""
-    trades = _read_trades()
-    return [t for t in trades if t.get("status") == "OPEN"]
+    return _read(lambda index: index.open_trades())
 
 
 def get_all_trades(limit: int = 100) -> list:
     """Get all trades, newest first."""
-    trades = _read_trades()
-    trades.sort(key=lambda t: t.get("entry_time", ""), reverse=True)
-    return trades[:limit]
+    return get_trades_page(None, limit)[0]
 
 
+@LATENCY.timed(op="get_trades_page")
+def get_trades_page(cursor: tuple | None = None, limit: int = 100,
+                    status: str | None = None, sector: str | None = None,
+                    symbol: str | None = None) -> tuple:
+    """
+    Keyset-paginated trade history, newest entry first.  `cursor` is the
+    (entry_time, trade_id) returned with the previous page.
+    Returns (trades, next_cursor); next_cursor is None on the last page.
+    """
+    filters = {"status": status, "sector": sector, "symbol": symbol}
+    entries = trade_archive.entries_before(_get_index(), cursor, filters)
+    trades, next_cursor = take_page(entries, limit)
+    return [dict(t) for t in trades], next_cursor
+
+
+@LATENCY.timed(op="get_closed_trades")
 def get_closed_trades(limit: int = 100) -> list:
     """Get closed trades, newest first."""
-    trades = _read_trades()
-    closed = [t for t in trades if t.get("status") == "CLOSED"]
-    closed.sort(key=lambda t: t.get("exit_time", ""), reverse=True)
-    return closed[:limit]
+    trades = _read(lambda index: index.newest_exits(limit))
+    if len(trades) < limit:
+        trades += [dict(t) for t in trade_archive.newest_exits(limit - len(trades))]
+    return trades
 
 
+@LATENCY.timed(op="get_trades_by_date_range")
 def get_trades_by_date_range(days: int = 7) -> list:
     """Get closed trades within the last N days."""
-    from datetime import timedelta
     cutoff = (datetime.now() - timedelta(days=days)).isoformat()
-    trades = _read_trades()
-    filtered = [
-        t for t in trades
-        if t.get("status") == "CLOSED" and t.get("exit_time", "") >= cutoff
-    ]
-    filtered.sort(key=lambda t: t.get("exit_time", ""), reverse=True)
-    return filtered
+    return _read(lambda index: index.exits_since(cutoff) + trade_archive.exits_between(cutoff, None))
+
+
+@LATENCY.timed(op="get_trades_between")
+def get_trades_between(start_date: str, end_date: str) -> list:
+    """Closed trades that exited between two YYYY-MM-DD dates (inclusive), newest first."""
+    after_end = (datetime.strptime(end_date, "%Y-%m-%d") + timedelta(days=1)).strftime("%Y-%m-%d")
+    return _read(lambda index: index.exits_between(start_date, after_end)
+                 + trade_archive.exits_between(start_date, after_end))
+
+
+@LATENCY.timed(op="get_window_stats")
+def get_window_stats(start_date: str | None = None, end_date: str | None = None) -> dict:
+    """P&L, trade, win and loss totals for closes between two dates — O(log days)."""
+    return _get_index().stats.daily.window(start_date, end_date)
+
+
+@LATENCY.timed(op="get_daily_pnl")
+def get_daily_pnl(start_date: str | None = None, end_date: str | None = None) -> list:
+    """Per-day P&L, trades and wins for closes between two dates, oldest first."""
+    return _get_index().stats.daily.series(start_date, end_date)
 
 
+@LATENCY.timed(op="get_trades_summary")
 def get_trades_summary() -> dict:
-    """Compute summary statistics from all closed trades."""
-    trades = _read_trades()
-    closed = [t for t in trades if t.get("status") == "CLOSED"]
-    open_trades = [t for t in trades if t.get("status") == "OPEN"]
-
-    if not closed:
-        return {
-            "total_trades": 0,
-            "open_trades": len(open_trades),
-            "wins": 0,
-            "losses": 0,
-            "win_rate": 0,
-            "total_pnl": 0,
-            "avg_pnl": 0,
-            "max_win": 0,
-            "max_loss": 0,
-            "avg_win": 0,
-            "avg_loss": 0,
-            "sharpe_ratio": 0,
-            "max_drawdown": 0,
-            "sector_breakdown": {},
-        }
-
-    pnls = [t.get("pnl", 0) for t in closed]
-    wins = [p for p in pnls if p > 0]
-    losses = [p for p in pnls if p <= 0]
-    total_pnl = sum(pnls)
-
-    # Sharpe ratio (simplified: mean / std of trade returns)
-    import statistics
-    avg_pnl = total_pnl / len(pnls) if pnls else 0
-    std_pnl = statistics.stdev(pnls) if len(pnls) > 1 else 1
-    sharpe = round(avg_pnl / std_pnl, 2) if std_pnl > 0 else 0
-
-    # Max drawdown from cumulative P&L
-    cumulative = []
-    running = 0
-    for p in pnls:
-        running += p
-        cumulative.append(running)
-    peak = 0
-    max_dd = 0
-    for val in cumulative:
-        if val > peak:
-            peak = val
-        dd = peak - val
-        if dd > max_dd:
-            max_dd = dd
-
-    # Sector breakdown
-    sector_pnl = {}
-    for t in closed:
-        sector = t.get("sector", "Unknown")
-        if sector not in sector_pnl:
-            sector_pnl[sector] = {"trades": 0, "pnl": 0}
-        sector_pnl[sector]["trades"] += 1
-        sector_pnl[sector]["pnl"] += t.get("pnl", 0)
-    for s in sector_pnl:
-        sector_pnl[s]["pnl"] = round(sector_pnl[s]["pnl"], 2)
-
-    return {
-        "total_trades": len(closed),
-        "open_trades": len(open_trades),
-        "wins": len(wins),
-        "losses": len(losses),
-        "win_rate": round(len(wins) / len(closed) * 100, 1) if closed else 0,
-        "total_pnl": round(total_pnl, 2),
-        "avg_pnl": round(avg_pnl, 2),
-        "max_win": round(max(wins), 2) if wins else 0,
-        "max_loss": round(min(losses), 2) if losses else 0,
-        "avg_win": round(sum(wins) / len(wins), 2) if wins else 0,
-        "avg_loss": round(sum(losses) / len(losses), 2) if losses else 0,
-        "sharpe_ratio": sharpe,
-        "max_drawdown": round(max_dd, 2),
-        "sector_breakdown": sector_pnl,
-    }
+    """Summary statistics over all closed trades, maintained incrementally."""
+    return _get_index().summary()
 
 
+@LATENCY.timed(op="get_today_trade_count")
 def get_today_trade_count() -> int:
-    """Count trades opened today."""
+    """Count trades opened today (always in the hot partition)."""
     today = datetime.now().strftime("%Y-%m-%d")
-    trades = _read_trades()
-    return sum(1 for t in trades if t.get("entry_time", "").startswith(today))
+    return _get_index().count_entries_on(today)
 
 
 def clear_all():
     """Clear all trade data (used by kill switch for paper mode)."""
+    global _index
+    _get_index()
     with _lock:
-        _write_trades([])
+        if BACKEND == "sqlite":
+            trade_db.delete_all()
+        elif BACKEND == "journal":
+            trade_journal.write_snapshot([], trade_journal.rotate())
+        else:
+            _write_trades([])
+        trade_archive.clear()
+        _index = TradeIndex()
+        _write_stats_checkpoint(_index.stats)
@@ -0,0 +1,136 @@
+"""
+Autonomous Trading Agent — NSE Trading Calendar
+
+When NSE is open.  Regular sessions run 09:15 - 15:30 IST on weekdays;
+data/nse_holidays.json lists the exchange holidays, and the special
+sessions (Muhurat trading on Diwali, budget-day weekend sessions) that
+replace a day's hours or open the market on a day it would be closed.
+The file is refreshed from NSE's circular each year.
+
+Sessions are precomputed HORIZON_DAYS ahead into a sorted list, so
+next_session() is a binary search, and the scheduler can compute its
+next tick across nights, weekends and holidays in one step and sleep
+until then.
+"""
+
+import bisect
+import json
+import os
+import threading
+from datetime import date, datetime, time, timedelta, timezone
+
+IST = timezone(timedelta(hours=5, minutes=30))
+
+MARKET_OPEN = time(9, 15)
+MARKET_CLOSE = time(15, 30)
+HORIZON_DAYS = 400   # sessions precomputed ahead of the queried date
+REBUILD_MARGIN = 30  # rebuild when a query comes within this many days of the horizon
+
+HOLIDAYS_FILE = os.path.join(os.path.dirname(__file__), "data", "nse_holidays.json")
+
+_lock = threading.Lock()
+_holidays = None     # date → holiday name (None: file not loaded yet)
+_special = {}        # date → (open time, close time, name)
+_sessions = []       # (open, close, name) with IST datetimes, in order
+_closes = []         # close of each session in _sessions (search key)
+_span = None         # (first, last) date covered by _sessions
+
+
+def configure(path: str):
+    """Load holidays from another file (tests)."""
+    global HOLIDAYS_FILE, _holidays
+    with _lock:
+        HOLIDAYS_FILE = path
+        _holidays = None
+
+
+def _load():
+    """Read the holiday file (first use only; caller holds _lock)."""
+    global _holidays, _special, _span
+    if _holidays is not None:
+        return
+    holidays, special = {}, {}
+    try:
+        with open(HOLIDAYS_FILE) as f:
+            data = json.load(f)
+        for day, name in data.get("holidays", {}).items():
+            holidays[date.fromisoformat(day)] = name
+        for day, s in data.get("special_sessions", {}).items():
+            special[date.fromisoformat(day)] = (
+                time.fromisoformat(s["open"]),
+                time.fromisoformat(s["close"]),
+                s.get("name", "Special session"),
+            )
+    except (OSError, ValueError, KeyError) as e:
+        print(f"[Calendar] Could not load {HOLIDAYS_FILE} ({e}), treating every weekday as a trading day")
+        holidays, special = {}, {}
+    _holidays, _special = holidays, special
+    _span = None
+
+
+def _session(day: date) -> tuple | None:
+    """(open, close, name) of `day`'s session, or None (caller holds _lock)."""
+    if day in _special:
+        market_open, market_close, name = _special[day]
+    elif day.weekday() >= 5 or day in _holidays:
+        return None
+    else:
+        market_open, market_close, name = MARKET_OPEN, MARKET_CLOSE, "Regular"
+    return (
+        datetime.combine(day, market_open, IST),
+        datetime.combine(day, market_close, IST),
+        name,
+    )
+
+
+def _ensure(day: date):
+    """Precompute sessions so that `day` is well inside the covered span."""
+    global _span
+    _load()
+    if _span is not None and _span[0] <= day <= _span[1] - timedelta(days=REBUILD_MARGIN):
+        return
+    _sessions.clear()
+    for offset in range(HORIZON_DAYS):
+        session = _session(day + timedelta(days=offset))
+        if session is not None:
+            _sessions.append(session)
+    _closes[:] = [close for _, close, _ in _sessions]
+    _span = (day, day + timedelta(days=HORIZON_DAYS - 1))
+
+
+def session(day: date) -> tuple | None:
+    """(open, close, name) of the session on `day` (IST datetimes), or None if closed."""
+    with _lock:
+        _load()
+        return _session(day)
+
+
+def next_session(after: datetime | None = None) -> tuple | None:
+    """
+    The session in progress at `after` (default: now), else the next one
+    to open, as (open, close, name).  None if there is none within the
+    calendar horizon.
+    """
+    after = (after or datetime.now(IST)).astimezone(IST)
+    with _lock:
+        _ensure(after.date())
+        i = bisect.bisect_right(_closes, after)
+        return _sessions[i] if i < len(_sessions) else None
+
+
+def is_open(now: datetime | None = None) -> bool:
+    """Whether the market is in session at `now` (default: now)."""
+    now = (now or datetime.now(IST)).astimezone(IST)
+    current = next_session(now)
+    return current is not None and current[0] <= now
+
+
+def is_trading_day(day: date) -> bool:
+    return session(day) is not None
+
+
+def holiday(day: date) -> str | None:
+    """Name of the exchange holiday on `day`, if it is one."""
+    with _lock:
+        _load()
+        return _holidays.get(day)
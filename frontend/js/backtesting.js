@@ -23,7 +23,7 @@ async function apiGet(path) {
 async function loadBacktestData() {
     try {
         const [tradesRes, summaryRes] = await Promise.all([
-            apiGet('/agent/trades?limit=200'),
+            apiGet('/agent/trades?limit=200&status=CLOSED'),
             apiGet('/agent/trades/summary'),
         ]);
 